@@ -3,101 +3,414 @@
 
 __doc__ = '\nPKCE OAuth implementation for Claude Max authentication.\nHandles the complete OAuth flow with security best practices.\n'
 import base64
+import errno
+import gzip
 import hashlib
+import hmac
+import html
 import json
 import logging
 import os
+import random
+import re
 import secrets
+import selectors
 import socket
 import threading
 import time
-import urllib.parse as urllib
+import urllib.parse
 import webbrowser
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait as futures_wait
 from dataclasses import dataclass
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from typing import Dict, Optional, Tuple, Any
+from itertools import takewhile
+from typing import Dict, NamedTuple, Optional, Tuple, Any
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+    
+    def json_dumps(obj):
+        return json.dumps(obj, separators = (',', ':')).encode('utf-8')
+
 logger = logging.getLogger(__name__)
-OAuthConfig = <NODE:12>()
-
-class OAuthCallbackHandler(BaseHTTPRequestHandler):
-    '''HTTP request handler for OAuth callback'''
-    
-    def do_GET(self):
-        '''Handle GET request with authorization code'''
-        query = urllib.parse.urlparse(self.path).query
-        params = urllib.parse.parse_qs(query)
-        if 'code' in params:
-            self.server.auth_code = params['code'][0]
-            self.server.state = params.get('state', [
-                None])[0]
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/html')
-            self.end_headers()
-            success_html = '\n            <!DOCTYPE html>\n            <html>\n            <head>\n                <title>Authentication Successful</title>\n                <style>\n                    body {\n                        font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;\n                        display: flex;\n                        justify-content: center;\n                        align-items: center;\n                        height: 100vh;\n                        margin: 0;\n                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);\n                    }\n                    .container {\n                        background: white;\n                        padding: 2rem;\n                        border-radius: 10px;\n                        box-shadow: 0 10px 25px rgba(0,0,0,0.1);\n                        text-align: center;\n                    }\n                    .success-icon {\n                        font-size: 48px;\n                        color: #48bb78;\n                        margin-bottom: 1rem;\n                    }\n                    h1 {\n                        color: #2d3748;\n                        margin-bottom: 0.5rem;\n                    }\n                    p {\n                        color: #718096;\n                    }\n                </style>\n            </head>\n            <body>\n                <div class="container">\n                    <div class="success-icon">✓</div>\n                    <h1>Authentication Successful!</h1>\n                    <p>You can now close this window and return to the terminal.</p>\n                </div>\n            </body>\n            </html>\n            '
-            self.wfile.write(success_html.encode())
+CODE_EXCHANGE_CACHE_TTL = 30
+VALIDATE_CACHE_TTL = 60
+VALIDATE_CACHE_MAX_SIZE = 128
+MAX_ERROR_DESCRIPTION_LENGTH = 256
+CALLBACK_POLL_INTERVAL = 0.5
+# Each callback connection must send its request within this many seconds
+CALLBACK_CONNECTION_TIMEOUT = 5
+_CALLBACK_POOL = ThreadPoolExecutor(max_workers = 2, thread_name_prefix = 'oauth-callback')
+_callback_listeners = { }
+_busy_callback_ports = set()
+_callback_listeners_lock = threading.Lock()
+_b64 = base64.urlsafe_b64encode
+_sha256 = hashlib.sha256
+_token_urlsafe = secrets.token_urlsafe
+RETRY_BACKOFF_MAX = 30
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+class JitteredRetry(Retry):
+    '''
+    Retry policy for the token endpoint that spreads concurrent clients apart.
+    
+    Exponential backoff is capped at RETRY_BACKOFF_MAX and stretched by up to
+    50% random jitter; a Retry-After header is honoured as a lower bound and
+    jittered the same way so clients released together do not retry in lockstep.
+    '''
+    
+    def _jitter(self, seconds):
+        return seconds * (1 + random.random() * 0.5)
+
+    
+    def get_backoff_time(self):
+        consecutive_errors = len(list(takewhile(lambda x: x.redirect_location is None, reversed(self.history))))
+        if consecutive_errors <= 1:
+            return 0
+        return self._jitter(min(RETRY_BACKOFF_MAX, self.backoff_factor * 2 ** (consecutive_errors - 1)))
+
+    
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
             return None
-        if 'error' in params:
-            self.server.error = params['error'][0]
-            self.server.error_description = params.get('error_description', [
-                'Unknown error'])[0]
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/html')
-            self.end_headers()
-            error_html = f'''\n            <!DOCTYPE html>\n            <html>\n            <head>\n                <title>Authentication Failed</title>\n                <style>\n                    body {{\n                        font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;\n                        display: flex;\n                        justify-content: center;\n                        align-items: center;\n                        height: 100vh;\n                        margin: 0;\n                        background: linear-gradient(135deg, #f56565 0%, #c53030 100%);\n                    }}\n                    .container {{\n                        background: white;\n                        padding: 2rem;\n                        border-radius: 10px;\n                        box-shadow: 0 10px 25px rgba(0,0,0,0.1);\n                        text-align: center;\n                        max-width: 400px;\n                    }}\n                    .error-icon {{\n                        font-size: 48px;\n                        color: #f56565;\n                        margin-bottom: 1rem;\n                    }}\n                    h1 {{\n                        color: #2d3748;\n                        margin-bottom: 0.5rem;\n                    }}\n                    p {{\n                        color: #718096;\n                    }}\n                    .error-details {{\n                        background: #fed7d7;\n                        color: #742a2a;\n                        padding: 0.5rem;\n                        border-radius: 5px;\n                        margin-top: 1rem;\n                        font-size: 0.875rem;\n                    }}\n                </style>\n            </head>\n            <body>\n                <div class="container">\n                    <div class="error-icon">✗</div>\n                    <h1>Authentication Failed</h1>\n                    <p>There was an error during authentication.</p>\n                    <div class="error-details">\n                        {params.get('error_description', [
-                'Unknown error'])[0]}\n                    </div>\n                </div>\n            </body>\n            </html>\n            '''
-            self.wfile.write(error_html.encode())
+        return self._jitter(retry_after)
+
+
+class _NoPlaintextAdapter(HTTPAdapter):
+    '''Adapter mounted on http:// so a token can never be sent in plaintext'''
+    
+    def __init__(self):
+        super().__init__(pool_connections = 1, pool_maxsize = 1)
+
+    
+    def send(self, request, **kwargs):
+        raise ValueError(f'''Plaintext HTTP is not allowed for OAuth requests: {request.url}''')
+
+
+def _build_retry():
+    '''Retry policy shared by all token endpoint calls'''
+    return JitteredRetry(total = 5, backoff_factor = 1, status_forcelist = [
+        429,
+        500,
+        502,
+        503,
+        504], allowed_methods = frozenset([
+        'GET',
+        'POST']), respect_retry_after_header = True, raise_on_status = False)
+
+
+def _get_shared_session():
+    '''
+    Return the process-wide requests session used by every ClaudeOAuth.
+
+    Sharing one pooled session lets token exchange, refresh and validation
+    reuse keep-alive connections instead of paying a TLS handshake per client.
+    '''
+    global _shared_session
+    if _shared_session is not None:
+        return _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections = 10, pool_maxsize = 20, max_retries = _build_retry())
+            session.mount('https://', adapter)
+            session.mount('http://', _NoPlaintextAdapter())
+            _shared_session = session
+    return _shared_session
+
+
+@dataclass
+class OAuthConfig:
+    '''OAuth configuration for Claude Max authentication'''
+    client_id: str = '9d1c250a-e61b-44d9-88ed-5944d1962f5e'
+    auth_url: str = 'https://claude.ai/oauth/authorize'
+    token_url: str = 'https://console.anthropic.com/v1/oauth/token'
+    redirect_uri: str = 'http://localhost:8765/callback'
+    scope: str = 'org:create_api_key user:profile user:inference'
+    callback_port: int = 8765
+    callback_timeout: int = 300
+
+
+SUCCESS_TEMPLATE = '\n            <!DOCTYPE html>\n            <html>\n            <head>\n                <title>Authentication Successful</title>\n                <style>\n                    body {\n                        font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;\n                        display: flex;\n                        justify-content: center;\n                        align-items: center;\n                        height: 100vh;\n                        margin: 0;\n                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);\n                    }\n                    .container {\n                        background: white;\n                        padding: 2rem;\n                        border-radius: 10px;\n                        box-shadow: 0 10px 25px rgba(0,0,0,0.1);\n                        text-align: center;\n                    }\n                    .success-icon {\n                        font-size: 48px;\n                        color: #48bb78;\n                        margin-bottom: 1rem;\n                    }\n                    h1 {\n                        color: #2d3748;\n                        margin-bottom: 0.5rem;\n                    }\n                    p {\n                        color: #718096;\n                    }\n                </style>\n            </head>\n            <body>\n                <div class="container">\n                    <div class="success-icon">✓</div>\n                    <h1>Authentication Successful!</h1>\n                    <p>You can now close this window and return to the terminal.</p>\n                </div>\n            </body>\n            </html>\n            '
+ERROR_TEMPLATE = '\n            <!DOCTYPE html>\n            <html>\n            <head>\n                <title>Authentication Failed</title>\n                <style>\n                    body {\n                        font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;\n                        display: flex;\n                        justify-content: center;\n                        align-items: center;\n                        height: 100vh;\n                        margin: 0;\n                        background: linear-gradient(135deg, #f56565 0%, #c53030 100%);\n                    }\n                    .container {\n                        background: white;\n                        padding: 2rem;\n                        border-radius: 10px;\n                        box-shadow: 0 10px 25px rgba(0,0,0,0.1);\n                        text-align: center;\n                        max-width: 400px;\n                    }\n                    .error-icon {\n                        font-size: 48px;\n                        color: #f56565;\n                        margin-bottom: 1rem;\n                    }\n                    h1 {\n                        color: #2d3748;\n                        margin-bottom: 0.5rem;\n                    }\n                    p {\n                        color: #718096;\n                    }\n                    .error-details {\n                        background: #fed7d7;\n                        color: #742a2a;\n                        padding: 0.5rem;\n                        border-radius: 5px;\n                        margin-top: 1rem;\n                        font-size: 0.875rem;\n                    }\n                </style>\n            </head>\n            <body>\n                <div class="container">\n                    <div class="error-icon">✗</div>\n                    <h1>Authentication Failed</h1>\n                    <p>There was an error during authentication.</p>\n                    <div class="error-details">\n                        {err}\n                    </div>\n                </div>\n            </body>\n            </html>\n            '
+_SUCCESS_HTML = SUCCESS_TEMPLATE.encode('utf-8')
+(_ERR_PREFIX, _ERR_SUFFIX) = (part.encode('utf-8') for part in ERROR_TEMPLATE.split('{err}'))
+
+
+class ValidatedOAuthConfig(NamedTuple):
+    '''OAuth endpoints parsed and checked once when a client is constructed'''
+    token_url: str
+    token_url_parts: urllib.parse.SplitResult
+    token_host: str
+    auth_url: str
+    auth_url_parts: urllib.parse.SplitResult
+    
+    @classmethod
+    def from_config(cls, config: OAuthConfig) -> 'ValidatedOAuthConfig':
+        '''
+        Validate the endpoints of an OAuthConfig.
+        
+        Raises:
+            ValueError: If token_url or auth_url is not an absolute HTTPS URL
+        '''
+        token_parts = _split_https_url('token_url', config.token_url)
+        auth_parts = _split_https_url('auth_url', config.auth_url)
+        return cls(token_url = config.token_url, token_url_parts = token_parts, token_host = token_parts.hostname, auth_url = config.auth_url, auth_url_parts = auth_parts)
+
+
+def _split_https_url(name, url):
+    '''Split a URL, rejecting anything that is not absolute HTTPS'''
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme != 'https' or not parts.hostname:
+        raise ValueError(f'''OAuth {name} must be an absolute https:// URL, got {url!r}''')
+    return parts
+
+
+def _http_response(status, body, extra_headers = b''):
+    '''Build a complete HTTP/1.1 response for the one-shot callback listener'''
+    return b'HTTP/1.1 %s\r\nContent-Type: text/html; charset=utf-8\r\n%sContent-Length: %d\r\nConnection: close\r\n\r\n' % (status, extra_headers, len(body)) + body
+
+_SUCCESS_RESPONSE = _http_response(b'200 OK', _SUCCESS_HTML)
+# The success page is constant, so it is compressed once for clients that accept gzip
+_SUCCESS_RESPONSE_GZIP = _http_response(b'200 OK', gzip.compress(_SUCCESS_HTML, mtime = 0), b'Content-Encoding: gzip\r\nVary: Accept-Encoding\r\n')
+_ACCEPTS_GZIP = re.compile(rb'^accept-encoding:[^\r\n]*\bgzip\b', re.IGNORECASE | re.MULTILINE)
+_BAD_REQUEST_RESPONSE = _http_response(b'400 Bad Request', b'Missing authorization code or error parameter')
+
+def _read_request_head(conn, limit = 8192):
+    '''Read from a client socket until the end of the HTTP request head'''
+    data = b''
+    while b'\r\n\r\n' not in data and len(data) < limit:
+        chunk = conn.recv(limit - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _handle_callback_request(conn):
+    '''
+    Parse one callback request and answer it.
+    
+    Returns:
+        Tuple of (auth_code, state, error, error_description); all None if the
+        request carried neither a code nor an error
+    '''
+    head = _read_request_head(conn)
+    request_line = head.split(b'\r\n', 1)[0]
+    parts = request_line.split(b' ')
+    target = parts[1].decode('latin-1') if len(parts) >= 2 and parts[0] == b'GET' else ''
+    params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(target).query, keep_blank_values = True))
+    code = params.get('code')
+    if code:
+        conn.sendall(_SUCCESS_RESPONSE_GZIP if _ACCEPTS_GZIP.search(head) else _SUCCESS_RESPONSE)
+        return (code, params.get('state'), None, None)
+    error = params.get('error')
+    if error:
+        error_description = params.get('error_description', 'Unknown error')[:MAX_ERROR_DESCRIPTION_LENGTH]
+        body = _ERR_PREFIX + html.escape(error_description).encode('utf-8') + _ERR_SUFFIX
+        conn.sendall(_http_response(b'200 OK', body))
+        return (None, None, error, error_description)
+    conn.sendall(_BAD_REQUEST_RESPONSE)
+    return (None, None, None, None)
+
+
+class CallbackCancellation:
+    '''
+    Cancellation flag for the callback wait that also wakes its selector.
+    
+    set() writes to a socketpair registered alongside the listener, so the
+    accept loop blocks until a connection, a cancel or the deadline instead
+    of waking up periodically to poll a flag.
+    '''
+    
+    def __init__(self):
+        self._event = threading.Event()
+        (self._reader, self._writer) = socket.socketpair()
+
+    
+    def set(self):
+        if self._event.is_set():
             return None
-        self.send_response(400)
-        self.end_headers()
-        self.wfile.write(b'Missing authorization code or error parameter')
+        self._event.set()
+        try:
+            self._writer.send(b'\x00')
+        except OSError:
+            pass
+
+    
+    def is_set(self):
+        return self._event.is_set()
 
     
-    def log_message(self, *args):
-        '''Suppress default HTTP server logging'''
-        pass
+    def fileno(self):
+        return self._reader.fileno()
 
+    
+    def close(self):
+        self._reader.close()
+        self._writer.close()
+
+
+def _acquire_callback_listener(port):
+    '''
+    Return the process-wide listening socket for a callback port.
+    
+    The socket is bound on first use and kept open for later logins. Only one
+    wait may use a port at a time; connections left queued by an earlier login
+    are discarded so they cannot be mistaken for the new callback.
+    
+    Raises:
+        OSError: If the port cannot be bound or another login is waiting on it
+    '''
+    with _callback_listeners_lock:
+        if port in _busy_callback_ports:
+            raise OSError(errno.EADDRINUSE, f'''Callback port {port} is already waiting for a login''')
+        listener = _callback_listeners.get(port)
+        if listener is None:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                listener.bind(('127.0.0.1', port))
+                listener.listen(1)
+                listener.setblocking(False)
+            except OSError:
+                listener.close()
+                raise
+            _callback_listeners[port] = listener
+        _busy_callback_ports.add(port)
+    while True:
+        try:
+            (stale, _) = listener.accept()
+        except (BlockingIOError, InterruptedError):
+            break
+        stale.close()
+    return listener
+
+
+def _release_callback_listener(port):
+    '''Mark a callback port as free for the next login'''
+    with _callback_listeners_lock:
+        _busy_callback_ports.discard(port)
+
+
+def _accept_callback(listener, port, timeout, cancelled):
+    '''
+    Accept connections on a bound listener until the OAuth callback arrives.
+    
+    Stray requests (e.g. favicon) are answered with 400 and the wait continues,
+    as it does when a connection stays idle, resets or fails. The listener stays
+    open for reuse; the port is released before returning.
+    
+    Returns:
+        Tuple of (auth_code, state, error)
+    '''
+    selector = selectors.DefaultSelector()
+    try:
+        selector.register(listener, selectors.EVENT_READ)
+        selector.register(cancelled, selectors.EVENT_READ)
+        deadline = time.monotonic() + timeout
+        while not cancelled.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error('Timed out waiting for OAuth callback')
+                return (None, None, None)
+            # Sleeps in the kernel until a connection, a cancel or the deadline
+            ready = [key.fileobj for (key, _) in selector.select(remaining)]
+            if listener not in ready:
+                continue
+            try:
+                (conn, _) = listener.accept()
+            except (BlockingIOError, InterruptedError, ConnectionAbortedError):
+                continue
+            with conn:
+                conn.setblocking(True)
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                # There is only one accept loop, so an idle or preconnected socket
+                # may hold it for a few seconds, not for the whole login
+                conn.settimeout(min(remaining, CALLBACK_CONNECTION_TIMEOUT))
+                try:
+                    (auth_code, state, error, error_description) = _handle_callback_request(conn)
+                except OSError as e:
+                    logger.debug(f'''Dropped callback connection: {e}''')
+                    continue
+            if error:
+                error_msg = f'''{error}: {error_description}'''
+                logger.error(f'''OAuth error: {error_msg}''')
+                return (None, None, error_msg)
+            if auth_code:
+                return (auth_code, state, None)
+        return (None, None, 'cancelled')
+    finally:
+        selector.close()
+        cancelled.close()
+        _release_callback_listener(port)
 
 
 class ClaudeOAuth:
     '''Main OAuth client for Claude Max authentication'''
     
-    def __init__(self = None, config = None):
-        '''Initialize OAuth client with configuration'''
-        pass
-    # WARNING: Decompyle incomplete
+    def __init__(self, config: Optional[OAuthConfig] = None, session: Optional[requests.Session] = None):
+        '''
+        Initialize OAuth client with configuration.
+        
+        Args:
+            config: OAuth configuration (defaults to Claude Max settings)
+            session: requests session to use instead of the process-wide pool
+        '''
+        self.config = config or OAuthConfig()
+        self.endpoints = ValidatedOAuthConfig.from_config(self.config)
+        # Everything but code_challenge and state is fixed per config, so encode it once
+        self._auth_url_prefix = f'''{self.endpoints.auth_url}?''' + urllib.parse.urlencode({
+            'client_id': self.config.client_id,
+            'redirect_uri': self.config.redirect_uri,
+            'response_type': 'code',
+            'code_challenge_method': 'S256',
+            'scope': self.config.scope })
+        # Static token-endpoint form fields, merged with the per-call values
+        self._exchange_form = {
+            'grant_type': 'authorization_code',
+            'redirect_uri': self.config.redirect_uri,
+            'client_id': self.config.client_id }
+        self._refresh_form = {
+            'grant_type': 'refresh_token',
+            'client_id': self.config.client_id }
+        self._code_cache = { }
+        self._code_cache_lock = threading.Lock()
+        self._validate_cache = OrderedDict()
+        self._validate_cache_lock = threading.Lock()
+        self._validate_key_locks = { }
+        self._setup_session(session)
 
     
-    def _setup_session(self):
-        '''Setup requests session with retry logic'''
-        self.session = requests.Session()
-        retry_strategy = Retry(total = 3, backoff_factor = 1, status_forcelist = [
-            429,
-            500,
-            502,
-            503,
-            504])
-        adapter = HTTPAdapter(max_retries = retry_strategy)
-        self.session.mount('https://', adapter)
-        self.session.mount('http://', adapter)
+    def _setup_session(self, session = None):
+        '''Attach the given session, or the shared pooled one'''
+        self.session = session if session is not None else _get_shared_session()
 
     
-    def generate_pkce(self = None):
+    def generate_pkce(self):
         '''
         Generate PKCE code verifier and challenge.
         
         Returns:
             Tuple of (verifier, challenge)
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        verifier = _b64(os.urandom(32)).rstrip(b'=').decode('ascii')
+        challenge = _b64(_sha256(verifier.encode('ascii')).digest()).rstrip(b'=').decode('ascii')
+        return (verifier, challenge)
 
     
     def generate_state(self = None):
         '''Generate random state parameter for CSRF protection'''
-        return secrets.token_urlsafe(32)
+        return _token_urlsafe(32)
 
     
     def get_authorization_url(self = None, code_challenge = None, state = None):
@@ -111,15 +424,35 @@ class ClaudeOAuth:
         Returns:
             Complete authorization URL
         '''
-        params = {
-            'client_id': self.config.client_id,
-            'redirect_uri': self.config.redirect_uri,
-            'response_type': 'code',
-            'code_challenge': code_challenge,
-            'code_challenge_method': 'S256',
-            'scope': self.config.scope,
-            'state': state }
-        return f'''{self.config.auth_url}?{urllib.parse.urlencode(params)}'''
+        # Both values are URL-safe base64, so they need no further quoting
+        return f'''{self._auth_url_prefix}&code_challenge={code_challenge}&state={state}'''
+
+    
+    def start_callback_listener(self, cancelled = None):
+        '''
+        Wait for the OAuth redirect on a pooled thread.
+        
+        The callback port is bound once per process and reused by later logins;
+        it is listening before this returns, so the browser can be opened as
+        soon as this call completes.
+        
+        Args:
+            cancelled: Optional CallbackCancellation that stops the wait early
+                when set; the wait takes ownership and closes it, also when
+                the port cannot be acquired
+            
+        Returns:
+            Future resolving to a tuple of (auth_code, state, error)
+        '''
+        if cancelled is None:
+            cancelled = CallbackCancellation()
+        try:
+            listener = _acquire_callback_listener(self.config.callback_port)
+        except BaseException:
+            cancelled.close()
+            raise
+        logger.info(f'''Starting callback server on port {self.config.callback_port}''')
+        return _CALLBACK_POOL.submit(_accept_callback, listener, self.config.callback_port, self.config.callback_timeout, cancelled)
 
     
     def start_callback_server(self = None):
@@ -129,22 +462,26 @@ class ClaudeOAuth:
         Returns:
             Tuple of (auth_code, state, error)
         '''
-        server = HTTPServer(('localhost', self.config.callback_port), OAuthCallbackHandler)
-        server.auth_code = None
-        server.state = None
-        server.error = None
-        server.error_description = None
-        server.timeout = self.config.callback_timeout
-        logger.info(f'''Starting callback server on port {self.config.callback_port}''')
-        server.handle_request()
-        if server.error:
-            error_msg = f'''{server.error}: {server.error_description}'''
-            logger.error(f'''OAuth error: {error_msg}''')
-            return (None, None, error_msg)
-        return (None.auth_code, server.state, None)
+        cancelled = CallbackCancellation()
+        callback = self.start_callback_listener(cancelled)
+        try:
+            return self._wait_for_callback(callback)
+        finally:
+            # An interrupted caller must not leave the pooled thread waiting out the timeout
+            if not callback.done():
+                cancelled.set()
+
+    
+    def _wait_for_callback(self, callback):
+        '''Block for the callback result in short slices so Ctrl+C is delivered promptly on every platform'''
+        # futures.wait reports the poll timeout by returning, so an exception raised
+        # by the wait itself (socket.timeout is TimeoutError) surfaces from result()
+        while not callback.done():
+            futures_wait((callback,), timeout = CALLBACK_POLL_INTERVAL)
+        return callback.result()
 
     
-    def exchange_code(self = None, code = None, code_verifier = None):
+    def exchange_code(self, code, code_verifier):
         '''
         Exchange authorization code for access token.
         
@@ -158,26 +495,53 @@ class ClaudeOAuth:
         Raises:
             requests.HTTPError: If token exchange fails
         '''
+        # Authorization codes are single-use, so a repeated callback for the same
+        # code shares the in-flight or recent result instead of a doomed second
+        # POST. The lock only guards the cache; the request itself runs outside
+        # it so exchanges of different codes never wait on each other.
+        with self._code_cache_lock:
+            now = time.monotonic()
+            self._code_cache = {cached_code: hit for cached_code, hit in self._code_cache.items() if hit[0] is None or now - hit[0] < CODE_EXCHANGE_CACHE_TTL}
+            hit = self._code_cache.get(code)
+            if hit is None:
+                result = Future()
+                self._code_cache[code] = (None, result)
+        if hit is not None:
+            logger.info('Reusing token exchange result for repeated authorization code')
+            return dict(hit[1].result())
+        try:
+            tokens = self._request_code_exchange(code, code_verifier)
+        except BaseException as e:
+            with self._code_cache_lock:
+                self._code_cache.pop(code, None)
+            result.set_exception(e)
+            raise
+        with self._code_cache_lock:
+            self._code_cache[code] = (time.monotonic(), result)
+        result.set_result(tokens)
+        return dict(tokens)
+
+    
+    def _request_code_exchange(self, code, code_verifier):
+        '''POST the authorization code to the token endpoint'''
         data = {
-            'grant_type': 'authorization_code',
+            **self._exchange_form,
             'code': code,
-            'code_verifier': code_verifier,
-            'redirect_uri': self.config.redirect_uri,
-            'client_id': self.config.client_id }
+            'code_verifier': code_verifier }
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded',
             'Accept': 'application/json' }
         logger.info('Exchanging authorization code for tokens')
-        logger.debug(f'''Token URL: {self.config.token_url}''')
+        logger.debug(f'''Token URL: {self.endpoints.token_url}''')
         logger.debug(f'''Request data: {data}''')
-        response = self.session.post(self.config.token_url, data = data, headers = headers)
+        response = self.session.post(self.endpoints.token_url, data = data, headers = headers)
         logger.debug(f'''Response status: {response.status_code}''')
         logger.debug(f'''Response headers: {response.headers}''')
         if response.status_code == 403:
             logger.error('403 Forbidden - Client may not be authorized for token exchange')
             logger.error(f'''Response body: {response.text}''')
         response.raise_for_status()
-        tokens = response.json()
+        tokens = json_loads(response.content)
         if 'expires_in' in tokens:
             tokens['expires_at'] = time.time() + tokens['expires_in']
         logger.info('Successfully obtained access token')
@@ -198,13 +562,12 @@ class ClaudeOAuth:
             requests.HTTPError: If token refresh fails
         '''
         data = {
-            'grant_type': 'refresh_token',
-            'refresh_token': refresh_token,
-            'client_id': self.config.client_id }
+            **self._refresh_form,
+            'refresh_token': refresh_token }
         logger.info('Refreshing access token')
-        response = self.session.post(self.config.token_url, data = data)
+        response = self.session.post(self.endpoints.token_url, data = data)
         response.raise_for_status()
-        tokens = response.json()
+        tokens = json_loads(response.content)
         if 'expires_in' in tokens:
             tokens['expires_at'] = time.time() + tokens['expires_in']
         logger.info('Successfully refreshed access token')
@@ -227,38 +590,81 @@ class ClaudeOAuth:
         (code_verifier, code_challenge) = self.generate_pkce()
         state = self.generate_state()
         auth_url = self.get_authorization_url(code_challenge, state)
-        if open_browser:
-            logger.info(f'''Opening browser for authentication: {auth_url}''')
-            webbrowser.open(auth_url)
-        else:
-            print(f'''Please visit this URL to authenticate:\n{auth_url}''')
-        (auth_code, returned_state, error) = self.start_callback_server()
+        cancelled = CallbackCancellation()
+        callback = self.start_callback_listener(cancelled)
+        try:
+            if open_browser:
+                logger.info(f'''Opening browser for authentication: {auth_url}''')
+                webbrowser.open(auth_url)
+            else:
+                print(f'''Please visit this URL to authenticate:\n{auth_url}''')
+            (auth_code, returned_state, error) = self._wait_for_callback(callback)
+        finally:
+            if not callback.done():
+                cancelled.set()
         if error:
             raise Exception(f'''Authentication failed: {error}''')
-        if not None:
+        if not auth_code:
             raise Exception('No authorization code received')
-        if None != state:
+        if not hmac.compare_digest(returned_state or '', state):
             raise Exception('State parameter mismatch - possible CSRF attack')
-        tokens = None.exchange_code(auth_code, code_verifier)
+        tokens = self.exchange_code(auth_code, code_verifier)
         return tokens
 
     
-    def validate_token(self = None, access_token = None):
+    def validate_token(self, access_token):
         '''
         Validate if an access token is still valid.
         
+        Results are cached per token for VALIDATE_CACHE_TTL seconds, and
+        concurrent checks of the same token share a single request.
+        
         Args:
             access_token: Token to validate
             
         Returns:
             True if token is valid
         '''
-        headers = {
-            'Authorization': f'''Bearer {access_token}''',
-            'anthropic-beta': 'oauth-2025-04-20' }
-        response = self.session.get('https://api.anthropic.com/v1/models', headers = headers, timeout = 5)
-        return response.status_code == 200
-    # WARNING: Decompyle incomplete
+        cached = self._cached_validation(access_token)
+        if cached is not None:
+            return cached
+        with self._validate_cache_lock:
+            key_lock = self._validate_key_locks.setdefault(access_token, threading.Lock())
+        with key_lock:
+            cached = self._cached_validation(access_token)
+            if cached is not None:
+                return cached
+            headers = {
+                'Authorization': f'''Bearer {access_token}''',
+                'anthropic-beta': 'oauth-2025-04-20' }
+            try:
+                response = self.session.get('https://api.anthropic.com/v1/models', headers = headers, timeout = 5)
+            except requests.RequestException as e:
+                # Network failures say nothing about the token, so they are not cached
+                logger.warning(f'''Token validation request failed: {e}''')
+                with self._validate_cache_lock:
+                    self._validate_key_locks.pop(access_token, None)
+                return False
+            is_valid = response.status_code == 200
+            with self._validate_cache_lock:
+                self._validate_cache[access_token] = (is_valid, time.monotonic() + VALIDATE_CACHE_TTL)
+                self._validate_cache.move_to_end(access_token)
+                while len(self._validate_cache) > VALIDATE_CACHE_MAX_SIZE:
+                    self._validate_cache.popitem(last = False)
+                self._validate_key_locks.pop(access_token, None)
+            return is_valid
+
+    
+    def _cached_validation(self, access_token):
+        '''Return the cached validation result for a token, or None if absent or stale'''
+        with self._validate_cache_lock:
+            hit = self._validate_cache.get(access_token)
+            if hit is None:
+                return None
+            if time.monotonic() >= hit[1]:
+                del self._validate_cache[access_token]
+                return None
+            return hit[0]
 
 
 # WARNING: Decompyle incomplete
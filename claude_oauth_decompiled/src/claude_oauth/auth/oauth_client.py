@@ -7,6 +7,7 @@ import hashlib
 import secrets
 import urllib.parse as urllib
 from typing import Dict, Any, Tuple, Optional
+import aiohttp
 from aiohttp import web, ClientSession
 import logging
 from config.settings import Settings
@@ -20,6 +21,29 @@ class OAuthClient:
         self._callback_server = None
         self._callback_result = None
         self._callback_event = None
+        self._http = None
+
+    
+    async def __aenter__(self):
+        return self
+
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    
+    def _get_http(self):
+        '''Return the shared HTTP session, creating it on first use inside the event loop.'''
+        if self._http is None or self._http.closed:
+            self._http = ClientSession(connector = aiohttp.TCPConnector(limit = 20, limit_per_host = 10, ttl_dns_cache = 300, keepalive_timeout = 30))
+        return self._http
+
+    
+    async def close(self):
+        '''Close the shared HTTP session.'''
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
 
     
     async def start_auth_flow(self = None):
@@ -63,8 +87,15 @@ class OAuthClient:
         Returns:
             Token data dictionary
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        data = {
+            'grant_type': 'authorization_code',
+            'code': auth_code,
+            'redirect_uri': self.settings.oauth.redirect_uri,
+            'client_id': self.settings.oauth.client_id,
+            'client_secret': self.settings.oauth.client_secret }
+        async with self._get_http().post(self.settings.oauth.token_url, data = data, timeout = aiohttp.ClientTimeout(total = 10)) as response:
+            response.raise_for_status()
+            return await response.json()
 
     
     async def refresh_access_token(self = None, refresh_token = None):
@@ -77,7 +108,13 @@ class OAuthClient:
         Returns:
             New token data dictionary
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        data = {
+            'grant_type': 'refresh_token',
+            'refresh_token': refresh_token,
+            'client_id': self.settings.oauth.client_id,
+            'client_secret': self.settings.oauth.client_secret }
+        async with self._get_http().post(self.settings.oauth.token_url, data = data, timeout = aiohttp.ClientTimeout(total = 10)) as response:
+            response.raise_for_status()
+            return await response.json()
 
 
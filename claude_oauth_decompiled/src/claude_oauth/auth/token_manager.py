@@ -2,20 +2,19 @@
 # File: token_manager.cpython-312.pyc (Python 3.12)
 
 __doc__ = '\nToken management with automatic refresh and secure storage.\n'
-import json
 import logging
 import os
 import time
 from pathlib import Path
 from threading import Lock
 from typing import Dict, Optional, Any
-from oauth import ClaudeOAuth, OAuthConfig
+from oauth import ClaudeOAuth, OAuthConfig, json_dumps, json_loads
 logger = logging.getLogger(__name__)
 
 class TokenManager:
     '''Manages OAuth tokens with automatic refresh and persistence'''
     
-    def __init__(self = None, oauth_client = None, token_file = None, auto_refresh = (None, None, True, 300), refresh_buffer = ('oauth_client', Optional[ClaudeOAuth], 'token_file', Optional[str], 'auto_refresh', bool, 'refresh_buffer', int)):
+    def __init__(self, oauth_client: Optional[ClaudeOAuth] = None, token_file: Optional[str] = None, auto_refresh: bool = True, refresh_buffer: int = 300):
         '''
         Initialize token manager.
         
@@ -25,22 +24,62 @@ class TokenManager:
             auto_refresh: Enable automatic token refresh
             refresh_buffer: Seconds before expiry to trigger refresh
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        self.oauth_client = oauth_client or ClaudeOAuth()
+        self.token_file = Path(token_file) if token_file else Path.home() / '.claude' / 'oauth_tokens.json'
+        self.auto_refresh = auto_refresh
+        self.refresh_buffer = refresh_buffer
+        self._tokens = None
+        self._deadline_mono = None
+        self._deadline_wall = None
+        self._refresh_lock = Lock()
+        self.load_tokens()
 
     
     def load_tokens(self = None):
         '''Load tokens from storage file'''
-        if not self.token_file.exists():
+        try:
+            tokens = json_loads(self.token_file.read_bytes())
+        except FileNotFoundError:
             logger.debug('No existing token file found')
             return None
-    # WARNING: Decompyle incomplete
+        except (OSError, ValueError) as e:
+            logger.error(f'''Failed to load tokens: {e}''')
+            return None
+        self._set_tokens(tokens)
+        logger.debug(f'''Loaded tokens from {self.token_file}''')
+        return self._tokens
+
+    
+    def _set_tokens(self, tokens):
+        '''
+        Publish a new token dict together with its refresh deadlines.
+        
+        The monotonic deadline is immune to wall-clock jumps but does not
+        advance while the system is suspended, so the wall-clock deadline from
+        expires_at is checked as well.
+        '''
+        expires_at = tokens.get('expires_at', 0)
+        remaining = max(0, expires_at - time.time())
+        self._deadline_mono = time.monotonic() + remaining - self.refresh_buffer
+        self._deadline_wall = expires_at - self.refresh_buffer
+        self._tokens = tokens
 
     
     def save_tokens(self = None, tokens = None):
         '''Save tokens to storage file with secure permissions'''
-        pass
-    # WARNING: Decompyle incomplete
+        # Publish a fresh dict so lock-free readers never see a half-updated mapping
+        self._set_tokens(dict(tokens))
+        self.token_file.parent.mkdir(parents = True, exist_ok = True)
+        # Write-then-rename so a crash never leaves a truncated credentials file;
+        # the temp file is created 0600 so there is no chmod window
+        tmp_file = self.token_file.with_suffix(self.token_file.suffix + '.tmp')
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 384)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json_dumps(self._tokens))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.token_file)
+        logger.debug(f'''Saved tokens to {self.token_file}''')
 
     
     def get_access_token(self = None):
@@ -53,17 +92,38 @@ class TokenManager:
         Raises:
             Exception: If unable to obtain valid token
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        tokens = self._tokens
+        if tokens and 'access_token' in tokens and not (self.auto_refresh and self._should_refresh()):
+            return tokens['access_token']
+        if not self.auto_refresh:
+            if not tokens or 'access_token' not in tokens:
+                raise Exception('No access token available')
+            return tokens['access_token']
+        with self._refresh_lock:
+            # Another caller may have refreshed while we waited for the lock
+            if self._should_refresh():
+                return self._refresh_token()
+            return self._tokens['access_token']
+
+    
+    def force_refresh(self):
+        '''
+        Refresh the access token even if the current one is still valid.
+        
+        Returns:
+            New access token
+        '''
+        with self._refresh_lock:
+            return self._refresh_token()
 
     
     def _should_refresh(self = None):
         '''Check if token should be refreshed'''
-        if not self._tokens:
+        if not self._tokens or self._deadline_mono is None:
             return True
-        expires_at = self._tokens.get('expires_at', 0)
-        current_time = time.time()
-        return current_time >= expires_at - self.refresh_buffer
+        if time.monotonic() >= self._deadline_mono:
+            return True
+        return time.time() >= self._deadline_wall
 
     
     def _refresh_token(self = None):
@@ -76,7 +136,7 @@ class TokenManager:
         Raises:
             Exception: If refresh fails
         '''
-        if self._tokens or 'refresh_token' not in self._tokens:
+        if not self._tokens or 'refresh_token' not in self._tokens:
             logger.warning('No refresh token available, re-authenticating')
             tokens = self.oauth_client.authenticate()
             self.save_tokens(tokens)
@@ -125,7 +185,7 @@ class TokenManager:
         Returns:
             True if token is valid
         '''
-        if self._tokens or 'access_token' not in self._tokens:
+        if not self._tokens or 'access_token' not in self._tokens:
             return False
         return self.oauth_client.validate_token(self._tokens['access_token'])
 
@@ -8,39 +8,29 @@ CLI Commands Implementation
 Command handlers for the Claude OAuth CLI interface.
 '''
 import json
+import socket
+import sys
+import time
 import webbrowser
 from pathlib import Path
 from typing import Dict, Any, Optional
 import logging
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
-import threading
-import time
 from auth import OAuthClient, TokenManager
 from storage import SecureTokenStorage
 logger = logging.getLogger(__name__)
+_SUCCESS_HTML = '\n            <!DOCTYPE html>\n            <html>\n            <head>\n                <title>Claude OAuth - Success</title>\n                <style>\n                    body { font-family: Arial, sans-serif; text-align: center; padding: 50px; }\n                    .success { color: green; font-size: 24px; margin-bottom: 20px; }\n                    .message { color: #666; }\n                </style>\n            </head>\n            <body>\n                <div class="success">✓ Authentication Successful!</div>\n                <div class="message">\n                    <p>You have successfully authenticated with Claude OAuth.</p>\n                    <p>You can close this window and return to your terminal.</p>\n                </div>\n            </body>\n            </html>\n            '.encode('utf-8')
+_HTTP_RESPONSE_BYTES = b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\nContent-Length: ' + str(len(_SUCCESS_HTML)).encode('ascii') + b'\r\nConnection: close\r\n\r\n' + _SUCCESS_HTML
+_HTTP_NOT_FOUND_BYTES = b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+_MAX_REQUEST_HEAD = 8192
+# Each callback connection must send its request within this many seconds
+_CONNECTION_TIMEOUT = 5
 
-class CallbackHandler(BaseHTTPRequestHandler):
-    '''HTTP handler for OAuth callback.'''
-    
-    def do_GET(self):
-        '''Handle GET request to callback endpoint.'''
-        if self.path.startswith('/callback'):
-            self.server.callback_url = f'''http://localhost:{self.server.server_port}{self.path}'''
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            html_response = '\n            <!DOCTYPE html>\n            <html>\n            <head>\n                <title>Claude OAuth - Success</title>\n                <style>\n                    body { font-family: Arial, sans-serif; text-align: center; padding: 50px; }\n                    .success { color: green; font-size: 24px; margin-bottom: 20px; }\n                    .message { color: #666; }\n                </style>\n            </head>\n            <body>\n                <div class="success">✓ Authentication Successful!</div>\n                <div class="message">\n                    <p>You have successfully authenticated with Claude OAuth.</p>\n                    <p>You can close this window and return to your terminal.</p>\n                </div>\n            </body>\n            </html>\n            '
-            self.wfile.write(html_response.encode())
-            return None
-        self.send_response(404)
-        self.end_headers()
-
-    
-    def log_message(self, format, *args):
-        '''Suppress default HTTP server logging.'''
-        pass
 
+def _split_scopes(scope):
+    '''Normalize an OAuth scope value (space-separated string or list) to a list'''
+    if isinstance(scope, str):
+        return scope.split()
+    return list(scope)
 
 
 class AuthCommands:
@@ -77,6 +67,9 @@ class AuthCommands:
             return 1
         print('Exchanging authorization code for access token...')
         token_data = self.oauth_client.exchange_code_for_token(callback_url)
+        if 'scope' in token_data:
+            # Persist the split form so status/info never re-split the scope string
+            token_data['scopes'] = _split_scopes(token_data['scope'])
         token_manager = TokenManager(self.oauth_client, self.storage, args.user_id)
         token_manager.store_token(token_data)
         print(f'''✓ Login successful for user: {args.user_id}''')
@@ -117,33 +110,79 @@ class AuthCommands:
     # WARNING: Decompyle incomplete
 
     
-    def _wait_for_callback(self = None, port = None, timeout = None):
+    def _wait_for_callback(self, port, timeout = 300):
         '''Wait for OAuth callback.'''
-        server = HTTPServer(('localhost', port), CallbackHandler)
-        server.timeout = 1
-        server.callback_url = None
         print(f'''Waiting for authorization callback on port {port}...''')
         print('Please complete the authorization in your browser.')
-        start_time = time.time()
-    # WARNING: Decompyle incomplete
+        path = None
+        deadline = time.monotonic() + timeout
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind(('127.0.0.1', port))
+            listener.listen(1)
+            while path is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout
+                # settimeout(0) would make the socket non-blocking, so only positive values are passed
+                listener.settimeout(remaining)
+                (conn, _) = listener.accept()
+                with conn:
+                    try:
+                        path = self._read_callback_path(conn, deadline)
+                    except OSError:
+                        # One slow or dropped request does not end the wait
+                        continue
+        except socket.timeout:
+            logger.warning('No authorization callback received within %s seconds', timeout)
+            return None
+        finally:
+            listener.close()
+        return f'''http://localhost:{port}{path}'''
+
+    
+    def _read_callback_path(self, conn, deadline):
+        '''Read one request head and answer it; return the path only for /callback.'''
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise socket.timeout
+        # An idle connection must not hold the single accept loop until the deadline
+        conn.settimeout(min(remaining, _CONNECTION_TIMEOUT))
+        buf = b''
+        while b'\r\n\r\n' not in buf and len(buf) < _MAX_REQUEST_HEAD:
+            chunk = conn.recv(4096)
+            if not chunk:
+                break
+            buf += chunk
+        parts = buf.split(b' ', 2)
+        if len(parts) == 3 and parts[0] == b'GET' and parts[1].split(b'?', 1)[0] == b'/callback':
+            conn.sendall(_HTTP_RESPONSE_BYTES)
+            return parts[1].decode('latin-1')
+        conn.sendall(_HTTP_NOT_FOUND_BYTES)
+        return None
 
     
     def _show_user_status(self = None, user_id = None, indent = None):
         '''Show status for a specific user.'''
         token_manager = TokenManager(self.oauth_client, self.storage, user_id)
         token_info = token_manager.get_token_info()
+        logger.debug('Status for user %s: valid=%s needs_refresh=%s', user_id, token_info['valid'], token_info.get('needs_refresh'))
         if token_info['valid']:
-            print(f'''{indent}✓ Authenticated''')
+            lines = [
+                f'''{indent}✓ Authenticated''']
             if token_info['expires_in_seconds']:
                 minutes = token_info['expires_in_seconds'] // 60
-                print(f'''{indent}  Token expires in: {minutes} minutes''')
+                lines.append(f'''{indent}  Token expires in: {minutes} minutes''')
             if token_info['scopes']:
-                print(f'''{indent}  Scopes: {', '.join(token_info['scopes'])}''')
+                lines.append(f'''{indent}  Scopes: {', '.join(token_info['scopes'])}''')
             if token_info['needs_refresh']:
-                print(f'''{indent}  ⚠ Token needs refresh soon''')
-            return 0
-        print(f'''{indent}✗ Not authenticated or token expired''')
-        print(f'''{indent}  Reason: {token_info.get('message', 'Unknown')}''')
+                lines.append(f'''{indent}  ⚠ Token needs refresh soon''')
+        else:
+            lines = [
+                f'''{indent}✗ Not authenticated or token expired''',
+                f'''{indent}  Reason: {token_info.get('message', 'Unknown')}''']
+        sys.stdout.write('\n'.join(lines) + '\n')
         return 0
     # WARNING: Decompyle incomplete
 
@@ -177,28 +216,35 @@ class TokenCommands:
         if not token_data:
             print(f'''No token found for user: {args.user_id}''')
             return 1
-        print(f'''Token information for user: {args.user_id}''')
-        print(f'''  Has access token: {'Yes' if 'access_token' in token_data else 'No'}''')
-        print(f'''  Has refresh token: {'Yes' if 'refresh_token' in token_data else 'No'}''')
+        lines = [
+            f'''Token information for user: {args.user_id}''',
+            f'''  Has access token: {'Yes' if 'access_token' in token_data else 'No'}''',
+            f'''  Has refresh token: {'Yes' if 'refresh_token' in token_data else 'No'}''']
         if 'expires_at' in token_data:
-            print(f'''  Expires at: {token_data['expires_at']}''')
-        if 'scope' in token_data:
-            scopes = token_data['scope'].split() if isinstance(token_data['scope'], str) else token_data['scope']
-            print(f'''  Scopes: {', '.join(scopes)}''')
+            lines.append(f'''  Expires at: {token_data['expires_at']}''')
+        scopes = token_data.get('scopes')
+        if scopes is None and 'scope' in token_data:
+            scopes = _split_scopes(token_data['scope'])
+        if scopes is not None:
+            lines.append(f'''  Scopes: {', '.join(scopes)}''')
+        sys.stdout.write('\n'.join(lines) + '\n')
         return 0
     # WARNING: Decompyle incomplete
 
     
     def refresh(self = None, args = None):
         '''Refresh access token.'''
-        OAuthConfig = OAuthConfig
-        OAuthClient = OAuthClient
-        import auth
+        from auth import OAuthConfig, OAuthClient
         config = OAuthConfig(client_id = 'refresh')
         oauth_client = OAuthClient(config)
         token_manager = TokenManager(oauth_client, self.storage, args.user_id)
+        force = getattr(args, 'force', False)
+        current = token_manager.get_token_info()
+        if not force and current.get('valid') and not current.get('needs_refresh'):
+            print('✓ Token still valid, refresh not needed')
+            return 0
         print(f'''Refreshing token for user: {args.user_id}''')
-        access_token = token_manager.get_access_token()
+        token_manager.get_access_token()
         print('✓ Token refreshed successfully')
         token_info = token_manager.get_token_info()
         if token_info['expires_in_seconds']:
@@ -5,33 +5,62 @@
 Claude OAuth CLI - Secure OAuth authentication for Claude AI API.
 '''
 import argparse
-import asyncio
-import json
+import functools
+import hmac
 import logging
 import os
 import sys
 import time
 from pathlib import Path
 from typing import Optional
+from urllib.parse import quote_plus
 from auth import ClaudeOAuth, TokenManager
+from config import dumps_pretty
 from storage import SecureTokenStore
-from litellm import LiteLLMProxy
-from  import __version__
 logger = logging.getLogger(__name__)
 
+def get_version():
+    '''Resolve the installed package version (only needed for --version)'''
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version('claude-oauth')
+    except PackageNotFoundError:
+        return 'unknown'
+
+
+class _LazyVersionAction(argparse.Action):
+    '''--version action that looks the version up only when invoked'''
+    
+    def __init__(self, option_strings, dest = argparse.SUPPRESS, default = argparse.SUPPRESS, help = "show program's version number and exit"):
+        super().__init__(option_strings = option_strings, dest = dest, default = default, nargs = 0, help = help)
+
+    
+    def __call__(self, parser, namespace, values, option_string = None):
+        parser.exit(message = f'''{parser.prog} {get_version()}\n''')
+
+
 def setup_logging(verbose = None):
     '''Setup logging configuration'''
     level = logging.DEBUG if verbose else logging.INFO
+    root = logging.getLogger()
+    if root.handlers:
+        # Already configured (e.g. cli() re-entered from tests): only adjust the level
+        root.setLevel(level)
+        return None
     format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s' if verbose else '%(message)s'
     logging.basicConfig(level = level, format = format, handlers = [
         logging.StreamHandler(sys.stdout)])
 
 
+@functools.lru_cache(maxsize = 4)
+def _auth_url_prefix(auth_url, client_id, redirect_uri, scope):
+    '''Authorization URL up to the per-login PKCE/state parameters'''
+    return f'''{auth_url}?code=true&client_id={quote_plus(client_id)}&response_type=code&redirect_uri={quote_plus(redirect_uri)}&scope={quote_plus(scope)}'''
+
+
 def cmd_auth(args):
     '''Perform OAuth authentication'''
-    OAuthConfig = OAuthConfig
-    import auth.oauth
-    import urllib.parse as urllib
+    from auth.oauth import OAuthConfig
     import webbrowser
     config = OAuthConfig(client_id = '9d1c250a-e61b-44d9-88ed-5944d1962f5e', auth_url = 'https://claude.ai/oauth/authorize', token_url = 'https://claude.ai/oauth/token', redirect_uri = 'https://console.anthropic.com/oauth/code/callback', scope = 'org:create_api_key user:profile user:inference', callback_port = 8765)
     oauth = ClaudeOAuth(config)
@@ -39,16 +68,8 @@ def cmd_auth(args):
     print('============================================================')
     (code_verifier, code_challenge) = oauth.generate_pkce()
     state = oauth.generate_state()
-    params = {
-        'code': 'true',
-        'client_id': config.client_id,
-        'response_type': 'code',
-        'redirect_uri': config.redirect_uri,
-        'scope': config.scope,
-        'code_challenge': code_challenge,
-        'code_challenge_method': 'S256',
-        'state': state }
-    auth_url = f'''{config.auth_url}?{urllib.parse.urlencode(params)}'''
+    # code_challenge and state are URL-safe base64, so only the prefix needs quoting
+    auth_url = f'''{_auth_url_prefix(config.auth_url, config.client_id, config.redirect_uri, config.scope)}&code_challenge={code_challenge}&code_challenge_method=S256&state={state}'''
     print('\nOpening browser for authentication...')
     if not args.no_browser:
         webbrowser.open(auth_url)
@@ -62,34 +83,48 @@ def cmd_auth(args):
     paste_code = input('📋 Paste the authorization code here: ').strip()
     if not paste_code:
         raise Exception('No code provided')
-    if None in paste_code:
-        (auth_code, returned_state) = paste_code.split('#', 1)
-    else:
-        auth_code = paste_code
+    (auth_code, sep, returned_state) = paste_code.partition('#')
+    if not sep:
         returned_state = state
-# WARNING: Decompyle incomplete
+    if not hmac.compare_digest(returned_state, state):
+        raise Exception('State parameter mismatch - possible CSRF attack')
+    tokens = oauth.exchange_code(auth_code, code_verifier)
+    TokenManager(oauth_client = oauth).save_tokens(tokens)
+    print('✅ Authentication successful')
+    if args.show_token:
+        print(f'''\nAccess token: {tokens['access_token']}''')
+    return 0
 
 
 def cmd_token(args):
     '''Get or display token information'''
     manager = TokenManager()
     if args.refresh:
-        print('🔄 Refreshing token...')
-        token = manager.get_access_token()
-        print('✅ Token refreshed successfully')
+        current = manager.get_token_info()
+        if args.force:
+            print('🔄 Refreshing token...')
+            token = manager.force_refresh()
+            print('✅ Token refreshed successfully')
+        elif current and not current['needs_refresh'] and not current['is_expired']:
+            print('✅ Token still valid, refresh not needed (use --force to refresh anyway)')
+        else:
+            print('🔄 Refreshing token...')
+            token = manager.get_access_token()
+            print('✅ Token refreshed successfully')
     info = manager.get_token_info()
     if not info:
         print("❌ No tokens found. Run 'claude-oauth auth' first.", file = sys.stderr)
         return 1
     if args.json:
-        print(json.dumps(info, indent = 2))
+        print(dumps_pretty(info).decode('utf-8'))
     else:
-        print('📊 Token Information:')
-        print(f'''  Has access token: {info['has_access_token']}''')
-        print(f'''  Has refresh token: {info['has_refresh_token']}''')
-        print(f'''  Expires in: {info['expires_in']:.0f} seconds''')
-        print(f'''  Is expired: {info['is_expired']}''')
-        print(f'''  Needs refresh: {info['needs_refresh']}''')
+        sys.stdout.write(f'''📊 Token Information:
+  Has access token: {info['has_access_token']}
+  Has refresh token: {info['has_refresh_token']}
+  Expires in: {info['expires_in']:.0f} seconds
+  Is expired: {info['is_expired']}
+  Needs refresh: {info['needs_refresh']}
+''')
     if args.get:
         token = manager.get_access_token()
         print(f'''\n{token}''')
@@ -124,6 +159,8 @@ def cmd_revoke(args):
 
 def cmd_proxy(args):
     '''Start LiteLLM proxy server'''
+    import asyncio
+    from litellm import LiteLLMProxy
     proxy = LiteLLMProxy(port = args.port, host = args.host)
     print(f'''🚀 Starting LiteLLM proxy on {args.host}:{args.port}...''')
     print('Press Ctrl+C to stop\n')
@@ -148,7 +185,7 @@ def cmd_encrypt(args):
         return 0
     if args.action == 'backup':
         if not args.output:
-            args.output = f'''backup_{int(time.time())}.tar.gz'''
+            args.output = f'''backup_{int(time.time())}.tar'''
         print(f'''💾 Creating backup to {args.output}...''')
         store.backup(args.output)
         print('✅ Backup created successfully')
@@ -172,7 +209,7 @@ def cmd_encrypt(args):
 def create_parser():
     '''Create argument parser'''
     parser = argparse.ArgumentParser(prog = 'claude-oauth', description = 'Claude OAuth CLI - Secure OAuth authentication for Claude AI API', formatter_class = argparse.RawDescriptionHelpFormatter)
-    parser.add_argument('--version', action = 'version', version = f'''%(prog)s {__version__}''')
+    parser.add_argument('--version', action = _LazyVersionAction)
     parser.add_argument('-v', '--verbose', action = 'store_true', help = 'Enable verbose output')
     parser.add_argument('-c', '--config', type = str, help = 'Configuration file path')
     subparsers = parser.add_subparsers(dest = 'command', help = 'Available commands')
@@ -182,7 +219,8 @@ def create_parser():
     auth_parser.set_defaults(func = cmd_auth)
     token_parser = subparsers.add_parser('token', help = 'Manage tokens')
     token_parser.add_argument('--get', action = 'store_true', help = 'Get current access token')
-    token_parser.add_argument('--refresh', action = 'store_true', help = 'Force token refresh')
+    token_parser.add_argument('--refresh', action = 'store_true', help = 'Refresh token if it is expired or about to expire')
+    token_parser.add_argument('--force', action = 'store_true', help = 'With --refresh, refresh even if the token is still valid')
     token_parser.add_argument('--json', action = 'store_true', help = 'Output in JSON format')
     token_parser.set_defaults(func = cmd_token)
     validate_parser = subparsers.add_parser('validate', help = 'Validate current token')
@@ -212,17 +250,47 @@ def create_parser():
     return parser
 
 
+_FAST_PATH_COMMANDS = {
+    'validate': (cmd_validate, { }),
+    'revoke': (cmd_revoke, {
+        '-f': 'force',
+        '--force': 'force' }) }
+
+def _parse_fast_path(argv):
+    '''
+    Parse commands that only take boolean flags without building the argparse tree.
+    
+    Returns:
+        Namespace for the command, or None if argparse must handle argv
+        (unknown command, global options, --help or any unexpected argument)
+    '''
+    if not argv or argv[0] not in _FAST_PATH_COMMANDS:
+        return None
+    (func, flags) = _FAST_PATH_COMMANDS[argv[0]]
+    args = argparse.Namespace(command = argv[0], func = func, verbose = False, config = None)
+    for dest in flags.values():
+        setattr(args, dest, False)
+    for arg in argv[1:]:
+        dest = flags.get(arg)
+        if dest is None:
+            return None
+        setattr(args, dest, True)
+    return args
+
+
 def cli():
     '''CLI entry point'''
-    parser = create_parser()
-    args = parser.parse_args()
+    args = _parse_fast_path(sys.argv[1:])
+    if args is None:
+        parser = create_parser()
+        args = parser.parse_args()
+        if not hasattr(args, 'func'):
+            parser.print_help()
+            return 0
     setup_logging(args.verbose if hasattr(args, 'verbose') else False)
     if hasattr(args, 'config') and args.config:
         pass
-    if hasattr(args, 'func'):
-        return args.func(args)
-    None.print_help()
-    return 0
+    return args.func(args)
 
 
 def main():
@@ -231,4 +299,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-    return None
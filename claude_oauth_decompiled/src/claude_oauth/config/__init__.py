@@ -2,10 +2,11 @@
 # File: __init__.cpython-312.pyc (Python 3.12)
 
 '''Configuration module for Claude OAuth.'''
-from settings import Settings, OAuthConfig, SecurityConfig, ProxyConfig, LoggingConfig
+from settings import Settings, OAuthConfig, SecurityConfig, ProxyConfig, LoggingConfig, dumps_pretty
 __all__ = [
     'Settings',
     'OAuthConfig',
     'SecurityConfig',
     'ProxyConfig',
-    'LoggingConfig']
+    'LoggingConfig',
+    'dumps_pretty']
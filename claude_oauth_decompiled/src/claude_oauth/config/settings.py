@@ -6,18 +6,78 @@ import json
 import os
 from pathlib import Path
 from typing import Dict, Any, Optional
-from dataclasses import dataclass, asdict
-OAuthConfig = <NODE:12>()
-SecurityConfig = <NODE:12>()
-ProxyConfig = <NODE:12>()
-LoggingConfig = <NODE:12>()
+from dataclasses import dataclass
+try:
+    import orjson
+    
+    def dumps_pretty(data):
+        '''Serialize to indented, key-sorted JSON bytes'''
+        return orjson.dumps(data, option = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+
+except ImportError:
+    
+    def dumps_pretty(data):
+        '''Serialize to indented, key-sorted JSON bytes'''
+        return json.dumps(data, indent = 2, sort_keys = True, separators = (',', ': ')).encode('utf-8')
+
+
+@dataclass
+class OAuthConfig:
+    '''OAuth client settings'''
+    client_id: str = ''
+    client_secret: str = ''
+    redirect_uri: str = 'http://localhost:8765/callback'
+    auth_url: str = 'https://claude.ai/oauth/authorize'
+    token_url: str = 'https://console.anthropic.com/v1/oauth/token'
+    scope: str = 'org:create_api_key user:profile user:inference'
+
+
+@dataclass
+class SecurityConfig:
+    '''Key and token storage locations'''
+    encryption_key_path: str = '~/.claude-oauth/encryption.key'
+    token_storage_path: str = '~/.claude-oauth/tokens'
+
+
+@dataclass
+class ProxyConfig:
+    '''Defaults for the local proxy server'''
+    default_port: int = 8000
+    default_host: str = 'localhost'
+    default_model: str = 'claude-3-sonnet-20240229'
+
+
+@dataclass
+class LoggingConfig:
+    '''Log level and optional log file'''
+    level: str = 'INFO'
+    file_path: Optional[str] = None
+
+
+_ENV_MAP = (
+    ('CLAUDE_CLIENT_ID', 'oauth', 'client_id', str),
+    ('CLAUDE_CLIENT_SECRET', 'oauth', 'client_secret', str),
+    ('CLAUDE_REDIRECT_URI', 'oauth', 'redirect_uri', str),
+    ('CLAUDE_ENCRYPTION_KEY_PATH', 'security', 'encryption_key_path', str),
+    ('CLAUDE_TOKEN_STORAGE_PATH', 'security', 'token_storage_path', str),
+    ('CLAUDE_PROXY_PORT', 'proxy', 'default_port', int),
+    ('CLAUDE_PROXY_HOST', 'proxy', 'default_host', str),
+    ('CLAUDE_DEFAULT_MODEL', 'proxy', 'default_model', str),
+    ('CLAUDE_LOG_LEVEL', 'logging', 'level', str),
+    ('CLAUDE_LOG_FILE', 'logging', 'file_path', str))
 
 class Settings:
     '''Main settings class that manages all configuration.'''
     
-    def __init__(self = None, config_path = None):
-        pass
-    # WARNING: Decompyle incomplete
+    def __init__(self, config_path = None):
+        self.config_path = Path(config_path) if config_path else Path.home() / '.claude-oauth' / 'config.json'
+        self.oauth = OAuthConfig()
+        self.security = SecurityConfig()
+        self.proxy = ProxyConfig()
+        self.logging = LoggingConfig()
+        self.load_config()
+        # Environment variables override the config file
+        self._load_from_env()
 
     
     def load_config(self = None):
@@ -25,45 +85,29 @@ class Settings:
         if not self.config_path.exists():
             self.save_config()
             return None
-    # WARNING: Decompyle incomplete
+        config_data = json.loads(self.config_path.read_bytes())
+        for (section, values) in config_data.items():
+            target = getattr(self, section, None)
+            if target is None or not isinstance(values, dict):
+                continue
+            for (attr, value) in values.items():
+                if hasattr(target, attr):
+                    setattr(target, attr, value)
 
     
     def save_config(self = None):
         '''Save current configuration to file.'''
         self.config_path.parent.mkdir(parents = True, exist_ok = True)
-        config_data = {
-            'oauth': asdict(self.oauth),
-            'security': asdict(self.security),
-            'proxy': asdict(self.proxy),
-            'logging': asdict(self.logging) }
-    # WARNING: Decompyle incomplete
+        self.config_path.write_bytes(dumps_pretty(self.to_dict()))
 
     
     def _load_from_env(self = None):
         '''Load configuration from environment variables.'''
-        if os.getenv('CLAUDE_CLIENT_ID'):
-            self.oauth.client_id = os.getenv('CLAUDE_CLIENT_ID')
-        if os.getenv('CLAUDE_CLIENT_SECRET'):
-            self.oauth.client_secret = os.getenv('CLAUDE_CLIENT_SECRET')
-        if os.getenv('CLAUDE_REDIRECT_URI'):
-            self.oauth.redirect_uri = os.getenv('CLAUDE_REDIRECT_URI')
-        if os.getenv('CLAUDE_ENCRYPTION_KEY_PATH'):
-            self.security.encryption_key_path = os.getenv('CLAUDE_ENCRYPTION_KEY_PATH')
-        if os.getenv('CLAUDE_TOKEN_STORAGE_PATH'):
-            self.security.token_storage_path = os.getenv('CLAUDE_TOKEN_STORAGE_PATH')
-        if os.getenv('CLAUDE_PROXY_PORT'):
-            self.proxy.default_port = int(os.getenv('CLAUDE_PROXY_PORT'))
-        if os.getenv('CLAUDE_PROXY_HOST'):
-            self.proxy.default_host = os.getenv('CLAUDE_PROXY_HOST')
-        if os.getenv('CLAUDE_DEFAULT_MODEL'):
-            self.proxy.default_model = os.getenv('CLAUDE_DEFAULT_MODEL')
-        if os.getenv('CLAUDE_LOG_LEVEL'):
-            self.logging.level = os.getenv('CLAUDE_LOG_LEVEL')
-        if os.getenv('CLAUDE_LOG_FILE'):
-            self.logging.file_path = os.getenv('CLAUDE_LOG_FILE')
-            return None
-        return None
-    # WARNING: Decompyle incomplete
+        env = os.environ
+        for (name, section, attr, cast) in _ENV_MAP:
+            value = env.get(name)
+            if value:
+                setattr(getattr(self, section), attr, cast(value))
 
     
     def get_expanded_path(self = None, path = None):
@@ -73,15 +117,17 @@ class Settings:
     
     def to_dict(self = None):
         '''Convert settings to dictionary.'''
+        # The section dataclasses are flat, so a shallow __dict__ copy is
+        # equivalent to asdict() without its recursive deep copy
         return {
-            'oauth': asdict(self.oauth),
-            'security': asdict(self.security),
-            'proxy': asdict(self.proxy),
-            'logging': asdict(self.logging) }
+            'oauth': self.oauth.__dict__.copy(),
+            'security': self.security.__dict__.copy(),
+            'proxy': self.proxy.__dict__.copy(),
+            'logging': self.logging.__dict__.copy() }
 
     
     def validate(self = None):
-        '''Validate configuration settings.'''
+        '''Validate configuration settings, returning a list of error messages.'''
         errors = []
         if not self.oauth.client_id:
             errors.append('OAuth client_id is required')
@@ -92,6 +138,11 @@ class Settings:
         required_urls = [
             ('auth_url', self.oauth.auth_url),
             ('token_url', self.oauth.token_url)]
-    # WARNING: Decompyle incomplete
+        for (name, url) in required_urls:
+            if not url or not url.startswith('https://'):
+                errors.append(f'''OAuth {name} must be an https:// URL''')
+        if not 0 < self.proxy.default_port < 65536:
+            errors.append('Proxy default_port must be between 1 and 65535')
+        return errors
 
 
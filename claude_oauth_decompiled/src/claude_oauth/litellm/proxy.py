@@ -5,6 +5,7 @@
 LiteLLM proxy server with Claude OAuth integration.
 '''
 import asyncio
+import hashlib
 import json
 import logging
 import os
@@ -13,60 +14,120 @@ import sys
 import time
 from pathlib import Path
 from typing import Dict, Optional, Any
+from auth.oauth import json_loads
 from auth.token_manager import TokenManager
 from config import LiteLLMConfig
 logger = logging.getLogger(__name__)
+DEFAULT_CONFIG_PATH = Path.home() / '.claude-oauth' / 'litellm_config.json'
+YAML_SUFFIXES = ('.yaml', '.yml')
+# Seconds before retrying a token refresh that failed
+REFRESH_RETRY_INTERVAL = 60
 
 class LiteLLMProxy:
     '''Manage LiteLLM proxy server with Claude OAuth'''
     
-    def __init__(self = None, token_manager = None, config_path = None, port = (None, None, 4000, '0.0.0.0'), host = ('token_manager', Optional[TokenManager], 'config_path', Optional[str], 'port', int, 'host', str)):
+    def __init__(self, token_manager = None, config_path = None, port = 4000, host = '0.0.0.0'):
         '''
         Initialize LiteLLM proxy.
         
         Args:
             token_manager: Token manager instance
-            config_path: Path to LiteLLM config file
+            config_path: Path to LiteLLM config file (a .yaml/.yml suffix writes YAML)
             port: Proxy server port
             host: Proxy server host
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        self.token_manager = token_manager or TokenManager()
+        self.config_path = Path(config_path) if config_path else DEFAULT_CONFIG_PATH
+        self.port = port
+        self.host = host
+        self.process = None
+        self._http = None
+        # Config inputs are read from the environment once per proxy
+        self._env = {
+            'master_key': os.environ.get('LITELLM_MASTER_KEY', 'sk-1234'),
+            'database_url': os.environ.get('DATABASE_URL'),
+            'redis_url': os.environ.get('REDIS_URL') }
+        self._token = None
+        # The proxy reads its access token from this file on each request, so
+        # refreshed tokens reach a running proxy without a restart
+        self.token_file = self.config_path.with_name('claude_access_token')
+        # (inputs key, SHA-256 of the bytes last written to config_path)
+        self._config_cache = None
 
     
-    def generate_config(self = None):
+    def _config_inputs(self):
+        '''Environment inputs that determine the generated configuration'''
+        return self._env
+
+    
+    def generate_config(self):
         '''Generate LiteLLM configuration'''
         config_gen = LiteLLMConfig()
-        return config_gen.generate_config(master_key = os.getenv('LITELLM_MASTER_KEY', 'sk-1234'), database_url = os.getenv('DATABASE_URL'), redis_url = os.getenv('REDIS_URL'))
+        return config_gen.generate_config(**self._config_inputs())
 
     
     def update_token(self = None):
         '''Update access token and return it'''
         token = self.token_manager.get_access_token()
+        if token != self._token:
+            self._write_token_file(token)
+        # The subprocess inherits both variables; CLAUDE_ACCESS_TOKEN_FILE takes precedence
         os.environ['CLAUDE_ACCESS_TOKEN'] = token
+        os.environ['CLAUDE_ACCESS_TOKEN_FILE'] = str(self.token_file)
+        self._token = token
         logger.info('Updated CLAUDE_ACCESS_TOKEN environment variable')
         return token
 
     
-    def save_config(self = None, config = None):
-        '''Save LiteLLM configuration to file'''
-        import yaml
-    # WARNING: Decompyle incomplete
+    def _write_token_file(self, token):
+        '''Atomically replace the token file, readable only by the owner'''
+        self.token_file.parent.mkdir(parents = True, exist_ok = True)
+        tmp_path = self.token_file.with_name(self.token_file.name + '.tmp')
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 384)
+        with os.fdopen(fd, 'w') as f:
+            f.write(token)
+        os.replace(tmp_path, self.token_file)
 
     
-    def start(self = None, detached = None):
+    def save_config(self, config = None):
         '''
-        Start LiteLLM proxy server.
+        Save LiteLLM configuration to file.
         
-        Args:
-            detached: Run in background
-            
-        Returns:
-            Process object if detached, None otherwise
+        A generated config is only rebuilt when its inputs change,
+        and the file is only rewritten when its contents would differ.
         '''
-        self.update_token()
-        self.save_config()
-        cmd = [
+        config_format = 'yaml' if self.config_path.suffix in YAML_SUFFIXES else 'json'
+        key = None
+        if config is None:
+            inputs = self._config_inputs()
+            key = hashlib.blake2b(repr((sorted(inputs.items()), sorted(LiteLLMConfig.CLAUDE_MODELS), config_format)).encode('utf-8')).hexdigest()
+            if self._config_cache is not None and self._config_cache[0] == key and self._config_file_digest() == self._config_cache[1]:
+                logger.debug('LiteLLM config %s is up to date', self.config_path)
+                return self.config_path
+            config = LiteLLMConfig().generate_config(**inputs)
+        data = LiteLLMConfig().serialize_config(config, config_format)
+        digest = hashlib.sha256(data).digest()
+        if self._config_file_digest() != digest:
+            self.config_path.parent.mkdir(parents = True, exist_ok = True)
+            tmp_path = self.config_path.with_name(self.config_path.name + '.tmp')
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, self.config_path)
+            logger.info(f'''Saved LiteLLM config to {self.config_path}''')
+        self._config_cache = (key, digest)
+        return self.config_path
+
+    
+    def _config_file_digest(self):
+        '''SHA-256 of the config file on disk, or None if it does not exist'''
+        try:
+            return hashlib.sha256(self.config_path.read_bytes()).digest()
+        except FileNotFoundError:
+            return None
+
+    
+    def _build_command(self):
+        '''Command line for the LiteLLM proxy subprocess'''
+        return [
             sys.executable,
             '-m',
             'litellm',
@@ -77,54 +138,151 @@ class LiteLLMProxy:
             '--port',
             str(self.port),
             '--detailed_debug']
+
+    
+    def start(self, detached = False):
+        '''
+        Start LiteLLM proxy server.
+        
+        Args:
+            detached: Run in background
+            
+        Returns:
+            Process object if detached, None otherwise
+        '''
+        self.update_token()
+        self.save_config()
+        cmd = self._build_command()
         logger.info(f'''Starting LiteLLM proxy: {' '.join(cmd)}''')
-    # WARNING: Decompyle incomplete
+        if detached:
+            self.process = subprocess.Popen(cmd)
+            return self.process
+        try:
+            subprocess.run(cmd)
+        except KeyboardInterrupt:
+            logger.info('LiteLLM proxy interrupted')
+        return None
 
     
-    def stop(self = None):
+    def stop(self):
         '''Stop the proxy server'''
-        if self.process:
-            logger.info('Stopping LiteLLM proxy')
-            self.process.terminate()
+        if not self.process:
+            return None
+        logger.info('Stopping LiteLLM proxy')
+        self.process.terminate()
+        try:
             self.process.wait(timeout = 5)
-            self.process = None
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+    
+    async def start_async(self):
+        '''
+        Start the LiteLLM proxy as an asyncio subprocess.
+        
+        Returns:
+            asyncio.subprocess.Process for the running proxy
+        '''
+        await asyncio.to_thread(self.update_token)
+        self.save_config()
+        cmd = self._build_command()
+        logger.info(f'''Starting LiteLLM proxy: {' '.join(cmd)}''')
+        self.process = await asyncio.create_subprocess_exec(*cmd)
+        return self.process
+
+    
+    async def stop_async(self):
+        '''Stop a proxy started with start_async without blocking the event loop'''
+        if not self.process:
             return None
-        return None
-    # WARNING: Decompyle incomplete
+        process = self.process
+        self.process = None
+        if process.returncode is not None:
+            return None
+        logger.info('Stopping LiteLLM proxy')
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), 5)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
 
     
-    async def run_with_token_refresh(self = None, refresh_interval = None):
+    async def run_with_token_refresh(self, refresh_interval = 1800):
         '''
         Run proxy with automatic token refresh.
         
+        Refreshed tokens are written to the token file the running proxy reads,
+        so the proxy keeps serving across refreshes. A failed refresh is logged
+        and retried after REFRESH_RETRY_INTERVAL seconds.
+        
         Args:
             refresh_interval: Token refresh interval in seconds
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        process = await self.start_async()
+        interval = refresh_interval
+        try:
+            while True:
+                try:
+                    returncode = await asyncio.wait_for(process.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+                else:
+                    logger.warning(f'''LiteLLM proxy exited with code {returncode}''')
+                    return returncode
+                token = self._token
+                try:
+                    new_token = await asyncio.to_thread(self.update_token)
+                except Exception:
+                    logger.exception('Token refresh failed; keeping the current token')
+                    interval = min(refresh_interval, REFRESH_RETRY_INTERVAL)
+                    continue
+                interval = refresh_interval
+                if new_token != token:
+                    logger.info(f'''Access token changed, updated {self.token_file}''')
+        finally:
+            await self.stop_async()
 
     
-    def health_check(self = None):
-        '''Check if proxy is healthy'''
-        import requests
-        response = requests.get(f'''http://{self.host}:{self.port}/health''', timeout = 5)
+    def _get_http(self):
+        '''Return the pooled client for calls to the local proxy, creating it on first use.'''
+        import httpx
+        if self._http is None or self._http.is_closed:
+            # One local host and sequential callers, so a single kept-alive connection suffices
+            self._http = httpx.Client(base_url = f'''http://{self.host}:{self.port}''', timeout = 5, limits = httpx.Limits(max_connections = 4, max_keepalive_connections = 1))
+        return self._http
+
+    
+    def health_check(self):
+        '''
+        Check if proxy is healthy.
+        
+        Uses LiteLLM's liveness endpoint, which answers without calling the
+        upstream models or requiring the master key, so it is cheap to poll.
+        '''
+        import httpx
+        try:
+            response = self._get_http().get('/health/liveliness', timeout = 1)
+        except httpx.HTTPError:
+            return False
         return response.status_code == 200
-    # WARNING: Decompyle incomplete
 
     
-    def get_models(self = None):
+    def get_models(self):
         '''Get available models from proxy'''
-        import requests
-        response = requests.get(f'''http://{self.host}:{self.port}/v1/models''', timeout = 5)
+        response = self._get_http().get('/v1/models')
         response.raise_for_status()
-        return response.json()
-    # WARNING: Decompyle incomplete
+        return json_loads(response.content)
 
     
-    def test_completion(self = None, model = None):
+    def test_completion(self, model = 'claude-sonnet-4'):
         '''Test a completion request'''
-        import requests
-        response = requests.post(f'''http://{self.host}:{self.port}/v1/chat/completions''', json = {
+        response = self._get_http().post('/v1/chat/completions', json = {
             'model': model,
             'messages': [
                 {
@@ -132,9 +290,8 @@ class LiteLLMProxy:
                     'content': "Say 'Hello, Claude OAuth!'" }],
             'max_tokens': 50 }, timeout = 30)
         response.raise_for_status()
-        result = response.json()
+        result = json_loads(response.content)
         return result['choices'][0]['message']['content']
-    # WARNING: Decompyle incomplete
 
 
 if __name__ == '__main__':
@@ -150,5 +307,3 @@ if __name__ == '__main__':
             result = proxy.test_completion()
         proxy.stop()
         print('Proxy stopped')
-        return None
-    return None
@@ -2,6 +2,9 @@
 # File: __init__.cpython-312.pyc (Python 3.12)
 
 '''Secure token storage modules'''
-from secure_store import SecureTokenStore
+from secure_store import SecureTokenStore, aead_decrypt, aead_encrypt, build_ciphers
 __all__ = [
-    'SecureTokenStore']
+    'SecureTokenStore',
+    'aead_decrypt',
+    'aead_encrypt',
+    'build_ciphers']
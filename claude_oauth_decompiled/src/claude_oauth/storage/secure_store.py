@@ -3,22 +3,84 @@
 
 __doc__ = '\nSecure token storage with encryption and multi-user support.\n'
 import base64
+import functools
 import json
 import logging
 import os
+import secrets
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 from threading import Lock
 from typing import Dict, Optional, Any, List
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 logger = logging.getLogger(__name__)
+PBKDF2_ITERATIONS = 100000
+
+# Token files start with this marker followed by a 12-byte nonce and the
+# AES-GCM ciphertext; files without it are legacy Fernet tokens. CAG1 files were
+# encrypted with the raw Fernet key, CAG2 files with a key derived from it.
+AEAD_MAGIC = b'CAG2'
+LEGACY_AEAD_MAGIC = b'CAG1'
+AEAD_NONCE_SIZE = 12
+AEAD_KEY_INFO = b'claude-oauth-token-aesgcm'
+
+def build_ciphers(fernet_key):
+    '''
+    Build (fernet, aead, legacy_aead) for a Fernet-format key.
+    
+    The AES-GCM key is derived with HKDF so it shares no key material with
+    Fernet; legacy_aead only reads CAG1 data.
+    '''
+    raw_key = base64.urlsafe_b64decode(fernet_key)
+    aead_key = HKDF(algorithm = hashes.SHA256(), length = 32, salt = None, info = AEAD_KEY_INFO).derive(raw_key)
+    return (Fernet(fernet_key), AESGCM(aead_key), AESGCM(raw_key))
+
+
+def aead_encrypt(aead, plaintext, aad):
+    '''Encrypt with AES-GCM, returning marker + nonce + ciphertext as raw bytes'''
+    nonce = secrets.token_bytes(AEAD_NONCE_SIZE)
+    return AEAD_MAGIC + nonce + aead.encrypt(nonce, plaintext, aad)
+
+
+def aead_decrypt(aead, fernet, blob, aad, legacy_aead = None):
+    '''Decrypt bytes from aead_encrypt, falling back to older formats for legacy data'''
+    if blob.startswith(AEAD_MAGIC):
+        cipher = aead
+    elif legacy_aead is not None and blob.startswith(LEGACY_AEAD_MAGIC):
+        cipher = legacy_aead
+    else:
+        return fernet.decrypt(blob)
+    nonce_end = len(AEAD_MAGIC) + AEAD_NONCE_SIZE
+    return cipher.decrypt(blob[len(AEAD_MAGIC):nonce_end], blob[nonce_end:], aad)
+
+
+@functools.lru_cache(maxsize = 8)
+def _derive_fernet_key(password: bytes, salt: bytes) -> bytes:
+    '''
+    Derive a Fernet key from a password with PBKDF2.
+    
+    Memoized so stores opened repeatedly with the same password and salt pay
+    the deliberately slow KDF only once per process.
+    '''
+    kdf = PBKDF2HMAC(algorithm = hashes.SHA256(), length = 32, salt = salt, iterations = PBKDF2_ITERATIONS)
+    return base64.urlsafe_b64encode(kdf.derive(password))
+
 
 class SecureTokenStore:
     '''Secure storage for OAuth tokens with encryption'''
     
-    def __init__(self = None, storage_dir = None, encryption_key = None, namespace = (None, None, 'default')):
+    def __init__(self, storage_dir: Optional[str] = None, encryption_key: Optional[str] = None, namespace: str = 'default'):
         '''
         Initialize secure token store.
         
@@ -27,24 +89,123 @@ class SecureTokenStore:
             encryption_key: Encryption key or password
             namespace: Namespace for multi-user support
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        self.storage_dir = Path(storage_dir) if storage_dir else Path.home() / '.claude-oauth' / 'tokens'
+        self.storage_dir.mkdir(parents = True, exist_ok = True, mode = 448)
+        self.namespace = namespace
+        self._lock = Lock()
+        # token file name -> ((st_ino, st_mtime_ns, st_size), decrypted tokens)
+        self._cache = { }
+        # Files written with durable=False that still need an fsync
+        self._unsynced = set()
+        # User ids with token files in this namespace, stamped with the storage
+        # directory's mtime. It lives in a subdirectory so writing it leaves that
+        # mtime alone, while adding, replacing or removing a token file bumps it.
+        self._index_dir = self.storage_dir / '.index'
+        self._index_dir.mkdir(exist_ok = True, mode = 448)
+        self._index_path = self._index_dir / f'''{self.namespace}.idx'''
+        self._setup_encryption(encryption_key)
 
     
-    def _setup_encryption(self = None, key = None):
+    def _setup_encryption(self, key = None):
         '''Setup Fernet encryption with key derivation'''
-        pass
-    # WARNING: Decompyle incomplete
+        key = key or os.getenv('CLAUDE_OAUTH_ENCRYPTION_KEY')
+        if not key:
+            key_file = self.storage_dir / '.key'
+            if key_file.exists():
+                fernet_key = key_file.read_bytes()
+            else:
+                fernet_key = Fernet.generate_key()
+                self._write_private(key_file, fernet_key)
+            self._set_key(fernet_key)
+            return None
+        self._set_key(_derive_fernet_key(key.encode(), self._get_salt()))
+
+    
+    def _set_key(self, fernet_key):
+        '''Build the ciphers for a Fernet-format key (32 bytes, urlsafe base64)'''
+        # AES-GCM encrypts new data; Fernet and the legacy AES-GCM cipher are
+        # kept only to read files written before the switch
+        (self.fernet, self._aead, self._legacy_aead) = build_ciphers(fernet_key)
+
+    
+    def _get_salt(self):
+        '''Read the namespace-independent KDF salt, creating it on first use'''
+        salt_file = self.storage_dir / '.salt'
+        if salt_file.exists():
+            return salt_file.read_bytes()
+        salt = os.urandom(16)
+        salt_file.write_bytes(salt)
+        os.chmod(salt_file, 384)
+        return salt
+
+    
+    def _write_private(self, path, data, durable = True):
+        '''
+        Atomically replace path with data, readable only by the owner.
+        
+        With durable=False the fsync is deferred to the next flush(), so bulk
+        writers pay for one sync pass instead of one per file.
+        '''
+        tmp_name = self._write_temp(path, data, durable)
+        try:
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok = True)
+            raise
+        if not durable:
+            self._unsynced.add(path)
+
+    
+    def _write_temp(self, path, data, durable = True):
+        '''Write data to a 0600 temporary sibling of path and return its name'''
+        # mkstemp creates the file 0600 with a unique name that never ends in .enc
+        (fd, tmp_name) = tempfile.mkstemp(prefix = '.', suffix = '.tmp', dir = path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok = True)
+            raise
+        return tmp_name
+
+    
+    def flush(self):
+        '''Fsync files written with durable=False, then the storage directory'''
+        with self._lock:
+            self._sync_pending()
+
+    
+    def _sync_pending(self):
+        '''Body of flush(); the caller must hold self._lock'''
+        pending = list(self._unsynced)
+        self._unsynced.clear()
+        for path in pending:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        dir_fd = os.open(self.storage_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
 
     
     def _get_token_file(self = None, user_id = None):
         '''Get path to token file for user'''
         if user_id:
             return self.storage_dir / f'''{self.namespace}_{user_id}.enc'''
-        return None.storage_dir / f'''{self.namespace}.enc'''
+        return self.storage_dir / f'''{self.namespace}.enc'''
 
     
-    def store_tokens(self = None, tokens = None, user_id = None, metadata = (None, None)):
+    def store_tokens(self, tokens: Dict[str, Any], user_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None, durable: bool = True):
         '''
         Store encrypted tokens.
         
@@ -52,9 +213,23 @@ class SecureTokenStore:
             tokens: Token dictionary to store
             user_id: Optional user identifier
             metadata: Additional metadata to store
+            durable: Fsync before returning; pass False for bulk writes and
+                call flush() once afterwards
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        payload = {
+            'tokens': tokens,
+            'metadata': metadata or { },
+            'stored_at': time.time() }
+        token_file = self._get_token_file(user_id)
+        encrypted = aead_encrypt(self._aead, json.dumps(payload).encode(), token_file.name.encode())
+        with self._index_lock():
+            users = self._load_index()
+            self._write_private(token_file, encrypted, durable = durable)
+            self._cache.pop(token_file.name, None)
+            if user_id:
+                users.add(user_id)
+            self._write_index(users)
+        logger.debug(f'''Stored tokens in {token_file}''')
 
     
     def retrieve_tokens(self = None, user_id = None):
@@ -67,8 +242,36 @@ class SecureTokenStore:
         Returns:
             Decrypted token data or None
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        token_file = self._get_token_file(user_id)
+        try:
+            st = os.stat(token_file)
+        except FileNotFoundError:
+            with self._lock:
+                self._cache.pop(token_file.name, None)
+            return None
+        # The inode changes on every atomic replace, so a rewrite within the
+        # mtime granularity that keeps the size is still noticed
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            hit = self._cache.get(token_file.name)
+        if hit is not None and hit[0] == stamp:
+            return dict(hit[1])
+        payload = self._read_payload(token_file)
+        if payload is None:
+            return None
+        tokens = payload['tokens']
+        with self._lock:
+            self._cache[token_file.name] = (stamp, tokens)
+        return dict(tokens)
+
+    
+    def _read_payload(self, token_file):
+        '''Decrypt a token file, returning None if it cannot be read'''
+        try:
+            return json.loads(aead_decrypt(self._aead, self.fernet, token_file.read_bytes(), token_file.name.encode(), self._legacy_aead))
+        except Exception as e:
+            logger.error(f'''Failed to decrypt {token_file.name}: {e}''')
+            return None
 
     
     def delete_tokens(self = None, user_id = None):
@@ -81,28 +284,129 @@ class SecureTokenStore:
         Returns:
             True if deleted successfully
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        token_file = self._get_token_file(user_id)
+        with self._index_lock():
+            users = self._load_index()
+            self._cache.pop(token_file.name, None)
+            try:
+                token_file.unlink()
+            except FileNotFoundError:
+                return False
+            users.discard(user_id)
+            self._write_index(users)
+        logger.info(f'''Deleted tokens in {token_file}''')
+        return True
+
+    
+    def _scan_token_files(self):
+        '''List DirEntry objects for this namespace's token files in one directory scan'''
+        user_prefix = f'''{self.namespace}_'''
+        default_name = f'''{self.namespace}.enc'''
+        with os.scandir(self.storage_dir) as entries:
+            return [entry for entry in entries if entry.name.endswith('.enc') and (entry.name == default_name or entry.name.startswith(user_prefix)) and entry.is_file()]
 
     
-    def list_users(self = None):
+    def list_users(self):
         '''List all users with stored tokens'''
-        users = []
-    # WARNING: Decompyle incomplete
+        with self._index_lock():
+            return sorted(self._load_index())
 
     
-    def rotate_encryption_key(self = None, new_key = None):
+    @contextmanager
+    def _index_lock(self):
+        '''Hold self._lock and, where fcntl is available, an exclusive lock shared with other processes'''
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fd = os.open(self._index_dir / f'''{self.namespace}.lock''', os.O_RDWR | os.O_CREAT, 384)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    
+    def _load_index(self):
+        '''
+        Read the user index; caller holds _index_lock.
+        
+        The index is only a hint: when it is missing, unreadable or stamped
+        with an older directory mtime (token files were changed by something
+        other than this store), it is rebuilt from a directory scan.
+        '''
+        try:
+            index = json.loads(self._index_path.read_bytes())
+            if index['dir_mtime_ns'] == os.stat(self.storage_dir).st_mtime_ns:
+                return set(index['users'])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            pass
+        prefix_len = len(self.namespace) + 1
+        users = {entry.name[prefix_len:-4] for entry in self._scan_token_files() if entry.name[prefix_len - 1] == '_'}
+        self._write_index(users)
+        return users
+
+    
+    def _write_index(self, users):
+        '''Save the user index stamped with the current directory mtime; caller holds _index_lock'''
+        index = {
+            'dir_mtime_ns': os.stat(self.storage_dir).st_mtime_ns,
+            'users': sorted(users) }
+        # The index can always be rebuilt from the token files, so skip the fsync
+        self._write_private(self._index_path, json.dumps(index).encode(), durable = False)
+
+    
+    def rotate_encryption_key(self, new_key = None):
         '''
         Rotate encryption key and re-encrypt all tokens.
         
+        Every file is first written and fsynced to a temporary sibling under
+        the new key, then all token files are replaced, and the new key is
+        saved last. A failure while writing the temporary files leaves the
+        store on the old key with its token files untouched; leftover
+        temporary files are removed on any failure.
+        
         Args:
-            new_key: New encryption key
+            new_key: New encryption key (password); a random key file is
+                generated when omitted
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        with self._lock:
+            token_files = [Path(entry.path) for entry in self._scan_token_files()]
+            (old_fernet, old_aead, old_legacy_aead) = (self.fernet, self._aead, self._legacy_aead)
+            if new_key:
+                fernet_key = None
+                new_fernet_key = _derive_fernet_key(new_key.encode(), self._get_salt())
+            else:
+                fernet_key = new_fernet_key = Fernet.generate_key()
+            new_aead = build_ciphers(new_fernet_key)[1]
+            tmp_names = { }
+            
+            def reencrypt(path):
+                plaintext = aead_decrypt(old_aead, old_fernet, path.read_bytes(), path.name.encode(), old_legacy_aead)
+                tmp_names[path] = self._write_temp(path, aead_encrypt(new_aead, plaintext, path.name.encode()))
+            
+            try:
+                # One cipher object serves every file; the pool overlaps file I/O
+                # with the C-level AES work, which runs without the GIL
+                with ThreadPoolExecutor(max_workers = min(8, len(token_files) or 1)) as pool:
+                    list(pool.map(reencrypt, token_files))
+                self._cache.clear()
+                for path in token_files:
+                    os.replace(tmp_names[path], path)
+                    del tmp_names[path]
+                # The re-encrypted files are durable before the key that decrypts them
+                self._sync_pending()
+                if fernet_key is not None:
+                    self._write_private(self.storage_dir / '.key', fernet_key)
+            except BaseException:
+                for tmp_name in tmp_names.values():
+                    Path(tmp_name).unlink(missing_ok = True)
+                raise
+            self._set_key(new_fernet_key)
+        logger.info(f'''Rotated encryption key for {len(token_files)} token files''')
 
     
-    def cleanup_expired(self = None, max_age_days = None):
+    def cleanup_expired(self, max_age_days = 30):
         '''
         Clean up expired token files.
         
@@ -115,31 +419,95 @@ class SecureTokenStore:
         count = 0
         max_age_seconds = max_age_days * 24 * 3600
         current_time = time.time()
-    # WARNING: Decompyle incomplete
+        for entry in self._scan_token_files():
+            # DirEntry caches its stat result, so each file costs one stat at most
+            if current_time - entry.stat().st_mtime > max_age_seconds:
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    continue
+                count += 1
+        if count:
+            logger.info(f'''Cleaned up {count} token files older than {max_age_days} days''')
+        return count
 
     
-    def backup(self = None, backup_path = None):
+    def cleanup_expired_tokens(self):
+        '''
+        Delete token files whose access token has expired.
+        
+        Files are listed with a single directory scan and decrypted in a small
+        thread pool, since the work is dominated by file reads.
+        
+        Returns:
+            Number of token files removed
+        '''
+        paths = [Path(entry.path) for entry in self._scan_token_files()]
+        if not paths:
+            return 0
+        with ThreadPoolExecutor(max_workers = min(8, len(paths))) as pool:
+            payloads = list(pool.map(self._read_payload, paths))
+        now = time.time()
+        count = 0
+        for (path, payload) in zip(paths, payloads):
+            if payload is None:
+                continue
+            expires_at = payload['tokens'].get('expires_at')
+            if expires_at is not None and expires_at <= now:
+                path.unlink(missing_ok = True)
+                count += 1
+        if count:
+            logger.info(f'''Removed {count} expired token files''')
+        return count
+
+    
+    def backup(self, backup_path):
         '''
         Create encrypted backup of all tokens.
         
+        The token files are already AES-GCM ciphertext, which does not
+        compress, so they are archived as a plain tar. The KDF salt is
+        included; the .key file is not.
+        
         Args:
             backup_path: Path for backup file
         '''
         import tarfile
-        import tempfile
-    # WARNING: Decompyle incomplete
+        entries = self._scan_token_files()
+        fd = os.open(backup_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 384)
+        with os.fdopen(fd, 'wb') as f, tarfile.open(fileobj = f, mode = 'w') as tar:
+            salt_file = self.storage_dir / '.salt'
+            if salt_file.exists():
+                tar.add(salt_file, arcname = salt_file.name)
+            for entry in entries:
+                tar.add(entry.path, arcname = entry.name)
+        logger.info(f'''Backed up {len(entries)} token files to {backup_path}''')
 
     
-    def restore(self = None, backup_path = None):
+    def restore(self, backup_path):
         '''
         Restore tokens from backup.
         
+        Accepts plain and compressed (e.g. older .tar.gz) archives. Only flat
+        .enc and .salt members are restored; reopen the store after restoring
+        a salt so password-derived keys pick it up.
+        
         Args:
             backup_path: Path to backup file
         '''
         import tarfile
-        import tempfile
-    # WARNING: Decompyle incomplete
+        count = 0
+        with tarfile.open(backup_path, mode = 'r:*') as tar, self._lock:
+            for member in tar:
+                name = member.name
+                if not member.isfile() or '/' in name or '\\' in name or not (name.endswith('.enc') or name == '.salt'):
+                    logger.warning(f'''Skipping unexpected backup member {name}''')
+                    continue
+                self._write_private(self.storage_dir / name, tar.extractfile(member).read(), durable = False)
+                count += 1
+            self._sync_pending()
+            self._cache.clear()
+        logger.info(f'''Restored {count} files from {backup_path}''')
 
 
 # WARNING: Decompyle incomplete
@@ -4,10 +4,14 @@
 __doc__ = 'Utilities module for Claude OAuth.'
 from encryption import EncryptionManager
 from validators import TokenValidator
-from proxy_server import LiteLLMProxy
 __all__ = [
     'EncryptionManager',
     'TokenValidator',
     'LiteLLMProxy']
-return None
-# WARNING: Decompyle incomplete
+
+def __getattr__(name):
+    # The proxy server pulls in FastAPI; load it only when it is asked for
+    if name == 'LiteLLMProxy':
+        from proxy_server import LiteLLMProxy
+        return LiteLLMProxy
+    raise AttributeError(f'''module {__name__!r} has no attribute {name!r}''')
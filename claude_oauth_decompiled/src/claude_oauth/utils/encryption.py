@@ -2,6 +2,7 @@
 # File: encryption.cpython-312.pyc (Python 3.12)
 
 '''Encryption utilities for secure token storage.'''
+import asyncio
 import os
 import secrets
 import time
@@ -10,6 +11,7 @@ from typing import Dict, Any
 from cryptography.fernet import Fernet
 import logging
 from config.settings import Settings
+from storage.secure_store import aead_decrypt, aead_encrypt, build_ciphers
 logger = logging.getLogger(__name__)
 
 class EncryptionManager:
@@ -19,18 +21,38 @@ class EncryptionManager:
         self.settings = settings
         self.key_file = self.settings.get_expanded_path(self.settings.security.encryption_key_path)
         self._fernet = None
+        self._aead = None
+        self._legacy_aead = None
+        self._key_lock = asyncio.Lock()
 
     
-    async def _get_fernet(self = None):
+    async def _get_fernet(self):
         '''Get or create Fernet encryption instance.'''
-        pass
-    # WARNING: Decompyle incomplete
+        await self._load_ciphers()
+        return self._fernet
 
     
-    async def _get_or_create_key(self = None):
+    async def _load_ciphers(self):
+        '''Build the AES-GCM and legacy ciphers once per manager.'''
+        if self._aead is None:
+            async with self._key_lock:
+                # Concurrent callers wait here and share the first instances
+                if self._aead is None:
+                    key = await self._get_or_create_key()
+                    (self._fernet, self._aead, self._legacy_aead) = build_ciphers(key)
+
+    
+    async def _get_or_create_key(self):
         '''Get existing encryption key or create new one.'''
-        pass
-    # WARNING: Decompyle incomplete
+        if self.key_file.exists():
+            return self.key_file.read_bytes()
+        key = Fernet.generate_key()
+        self.key_file.parent.mkdir(parents = True, exist_ok = True, mode = 448)
+        fd = os.open(self.key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 384)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+        logger.info(f'''Created encryption key at {self.key_file}''')
+        return key
 
     
     async def generate_key(self = None):
@@ -44,7 +66,7 @@ class EncryptionManager:
     # WARNING: Decompyle incomplete
 
     
-    async def encrypt_data(self = None, data = None):
+    async def encrypt_data(self, data):
         '''
         Encrypt string data.
         
@@ -54,11 +76,11 @@ class EncryptionManager:
         Returns:
             Encrypted data as bytes
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        await self._load_ciphers()
+        return aead_encrypt(self._aead, data.encode('utf-8'), None)
 
     
-    async def decrypt_data(self = None, encrypted_data = None):
+    async def decrypt_data(self, encrypted_data):
         '''
         Decrypt data back to string.
         
@@ -68,8 +90,8 @@ class EncryptionManager:
         Returns:
             Decrypted string data
         '''
-        pass
-    # WARNING: Decompyle incomplete
+        await self._load_ciphers()
+        return aead_decrypt(self._aead, self._fernet, encrypted_data, None, self._legacy_aead).decode('utf-8')
 
     
     async def rotate_key(self = None):
@@ -3,18 +3,49 @@
 
 '''LiteLLM proxy server for Claude API integration.'''
 import asyncio
-import json
 import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
 from typing import Dict, Any, Optional
 from pathlib import Path
 import httpx
-import uvicorn
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response, StreamingResponse
 from config.settings import Settings
+from auth.oauth import json_dumps, json_loads
 from auth.token_manager import TokenManager
+try:
+    import h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 logger = logging.getLogger(__name__)
+CLAUDE_MESSAGES_URL = 'https://api.anthropic.com/v1/messages'
+ANTHROPIC_VERSION = '2023-06-01'
+OAUTH_BETA = 'oauth-2025-04-20'
+DEFAULT_MAX_TOKENS = 4096
+
+
+def _json_response(payload, status_code = 200):
+    '''Serialize a payload once with the fast JSON encoder'''
+    return Response(json_dumps(payload), status_code = status_code, media_type = 'application/json')
+
+
+def _sse_chunk(completion_id, created, model, delta, finish_reason = None):
+    '''Encode one OpenAI chat.completion.chunk as a server-sent event'''
+    return b'data: ' + json_dumps({
+        'id': completion_id,
+        'object': 'chat.completion.chunk',
+        'created': created,
+        'model': model,
+        'choices': [
+            {
+                'index': 0,
+                'delta': delta,
+                'finish_reason': finish_reason }] }) + b'\n\n'
+
 
 class LiteLLMProxy:
     '''LiteLLM-compatible proxy server for Claude API.'''
@@ -25,13 +56,14 @@ class LiteLLMProxy:
         self.host = host
         self.model_name = model_name
         self.token_manager = TokenManager(settings)
+        self._http = None
         self.app = self._create_app()
         self.server = None
 
     
     def _create_app(self = None):
         '''Create FastAPI application.'''
-        app = FastAPI(title = 'Claude OAuth Proxy', description = 'LiteLLM-compatible proxy for Claude API with OAuth authentication', version = '1.0.0')
+        app = FastAPI(title = 'Claude OAuth Proxy', description = 'LiteLLM-compatible proxy for Claude API with OAuth authentication', version = '1.0.0', lifespan = self._lifespan)
         app.add_middleware(CORSMiddleware, allow_origins = [
             '*'], allow_credentials = True, allow_methods = [
             '*'], allow_headers = [
@@ -44,34 +76,164 @@ class LiteLLMProxy:
         return app
 
     
+    @asynccontextmanager
+    async def _lifespan(self, app):
+        '''Close the pooled upstream client when the app shuts down.'''
+        try:
+            yield
+        finally:
+            await self._close_http()
+
+    
+    def _get_http(self):
+        '''Return the pooled upstream client, creating it on first use inside the event loop.'''
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(http2 = HTTP2_AVAILABLE, timeout = 120, limits = httpx.Limits(max_connections = 200, max_keepalive_connections = 50))
+        return self._http
+
+    
+    async def _close_http(self):
+        '''Close the pooled upstream client.'''
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+
+    
     async def _health_check(self):
         '''Health check endpoint.'''
-        pass
-    # WARNING: Decompyle incomplete
+        return _json_response({
+            'status': 'healthy',
+            'model': self.model_name })
 
     
     async def _list_models(self):
         '''List available models endpoint.'''
-        pass
-    # WARNING: Decompyle incomplete
+        return _json_response({
+            'object': 'list',
+            'data': [
+                {
+                    'id': self.model_name,
+                    'object': 'model',
+                    'owned_by': 'anthropic' }] })
 
     
-    async def _chat_completions(self = None, request = None):
+    async def _chat_completions(self, request: Request):
         '''Handle chat completions requests.'''
-        pass
-    # WARNING: Decompyle incomplete
+        try:
+            body = json_loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code = 400, detail = 'Request body must be valid JSON')
+        model = body.get('model') or self.model_name
+        system_parts = []
+        messages = []
+        for message in body.get('messages', []):
+            if message.get('role') == 'system':
+                system_parts.append(message.get('content', ''))
+            else:
+                messages.append({
+                    'role': message.get('role'),
+                    'content': message.get('content') })
+        claude_request = {
+            'model': model,
+            'messages': messages,
+            'max_tokens': body.get('max_tokens') or DEFAULT_MAX_TOKENS }
+        if system_parts:
+            claude_request['system'] = '\n'.join(system_parts)
+        for key in ('temperature', 'top_p', 'stream'):
+            if key in body:
+                claude_request[key] = body[key]
+        if 'stop' in body:
+            stop = body['stop']
+            claude_request['stop_sequences'] = [stop] if isinstance(stop, str) else stop
+        # get_access_token may block on a token refresh, so keep it off the event loop
+        access_token = await asyncio.to_thread(self.token_manager.get_access_token)
+        headers = {
+            'Authorization': f'''Bearer {access_token}''',
+            'anthropic-version': ANTHROPIC_VERSION,
+            'anthropic-beta': OAUTH_BETA,
+            'content-type': 'application/json' }
+        http = self._get_http()
+        # Stream the upstream body so SSE events can be forwarded as they arrive
+        claude_response = await http.send(http.build_request('POST', CLAUDE_MESSAGES_URL, content = json_dumps(claude_request), headers = headers), stream = True)
+        if claude_response.status_code != 200:
+            await claude_response.aread()
+            await claude_response.aclose()
+            logger.error('Claude API error %s: %s', claude_response.status_code, claude_response.text)
+            raise HTTPException(status_code = claude_response.status_code, detail = claude_response.text)
+        if body.get('stream'):
+            return StreamingResponse(self._handle_streaming_response(claude_response, model), media_type = 'text/event-stream')
+        try:
+            await claude_response.aread()
+        finally:
+            await claude_response.aclose()
+        return _json_response(self._convert_to_openai_format(json_loads(claude_response.content), model))
 
     
-    def _convert_to_openai_format(self = None, claude_response = None, model = None):
+    def _convert_to_openai_format(self, claude_response, model):
         '''Convert Claude API response to OpenAI-compatible format.'''
-        content = ''
-    # WARNING: Decompyle incomplete
+        content = ''.join(block.get('text', '') for block in claude_response.get('content', ()) if block.get('type') == 'text')
+        usage = claude_response.get('usage', { })
+        prompt_tokens = usage.get('input_tokens', 0)
+        completion_tokens = usage.get('output_tokens', 0)
+        finish_reason = 'length' if claude_response.get('stop_reason') == 'max_tokens' else 'stop'
+        return {
+            'id': claude_response.get('id') or f'''chatcmpl-{uuid.uuid4().hex}''',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [
+                {
+                    'index': 0,
+                    'message': {
+                        'role': 'assistant',
+                        'content': content },
+                    'finish_reason': finish_reason }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens } }
 
     
-    async def _handle_streaming_response(self = None, claude_response = None):
-        '''Handle streaming response (placeholder - implement if needed).'''
-        pass
-    # WARNING: Decompyle incomplete
+    async def _handle_streaming_response(self, claude_response, model):
+        '''
+        Transcode Claude SSE events into OpenAI chat.completion.chunk frames.
+        
+        Each upstream event is forwarded as soon as it arrives; only the
+        current line is held in memory.
+        '''
+        completion_id = f'''chatcmpl-{uuid.uuid4().hex}'''
+        created = int(time.time())
+        try:
+            async for line in claude_response.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+                event = json_loads(line[5:])
+                event_type = event.get('type')
+                if event_type == 'message_start':
+                    completion_id = event.get('message', { }).get('id') or completion_id
+                    yield _sse_chunk(completion_id, created, model, {
+                        'role': 'assistant' })
+                elif event_type == 'content_block_delta':
+                    delta = event.get('delta', { })
+                    if delta.get('type') == 'text_delta':
+                        yield _sse_chunk(completion_id, created, model, {
+                            'content': delta.get('text', '') })
+                elif event_type == 'message_delta':
+                    stop_reason = event.get('delta', { }).get('stop_reason')
+                    finish_reason = 'length' if stop_reason == 'max_tokens' else 'stop'
+                    yield _sse_chunk(completion_id, created, model, { }, finish_reason)
+                elif event_type == 'error':
+                    error = event.get('error') or { }
+                    logger.error('Claude stream error: %s', error)
+                    # Tell the client the completion was cut short before ending the stream
+                    yield b'data: ' + json_dumps({
+                        'error': {
+                            'message': error.get('message') or 'Claude stream error',
+                            'type': error.get('type') or 'api_error' } }) + b'\n\n'
+                    break
+            yield b'data: [DONE]\n\n'
+        finally:
+            await claude_response.aclose()
 
     
     async def _get_user_info(self):
@@ -94,6 +256,7 @@ class LiteLLMProxy:
     
     def run(self):
         '''Run the proxy server (blocking).'''
+        import uvicorn
         uvicorn.run(self.app, host = self.host, port = self.port, log_level = 'info')
 
 
@@ -8,6 +8,15 @@ from typing import Dict, Any, Tuple
 import logging
 from config.settings import Settings
 logger = logging.getLogger(__name__)
+_PASSED = {
+    'passed': True }
+_REQUIRED_TOKEN_FIELDS = ('access_token', 'token_type')
+_RECOMMENDATION_CHECKS = (
+    ('token_exists', "Run 'claude-oauth auth' to authenticate"),
+    ('has_access_token', 'Access token is missing - re-authenticate'),
+    ('token_expiry', "Token is expired - run 'claude-oauth refresh' to refresh"),
+    ('api_validation', 'Token failed API validation - try refreshing or re-authenticating'),
+    ('has_refresh_token', 'No refresh token available - consider re-authenticating for better token management'))
 
 class TokenValidator:
     '''Validates OAuth tokens and their properties.'''
@@ -16,8 +25,14 @@ class TokenValidator:
         self.settings = settings
         self._token_manager = None
 
-    token_manager = (lambda self: pass# WARNING: Decompyle incomplete
-)()
+    @property
+    def token_manager(self):
+        '''Token manager, created on first use'''
+        if self._token_manager is None:
+            from auth.token_manager import TokenManager
+            self._token_manager = TokenManager()
+        return self._token_manager
+
     
     async def validate_token(self = None):
         '''
@@ -44,7 +59,7 @@ class TokenValidator:
     # WARNING: Decompyle incomplete
 
     
-    def _validate_token_format(self = None, token_info = None):
+    def _validate_token_format(self, token_info):
         '''
         Validate the format and structure of token data.
         
@@ -54,10 +69,11 @@ class TokenValidator:
         Returns:
             True if token format is valid
         '''
-        required_fields = [
-            'access_token',
-            'token_type']
-    # WARNING: Decompyle incomplete
+        for field in _REQUIRED_TOKEN_FIELDS:
+            if field not in token_info:
+                logger.warning('Token data is missing %s', field)
+                return False
+        return True
 
     
     async def get_token_health_score(self = None):
@@ -71,19 +87,9 @@ class TokenValidator:
     # WARNING: Decompyle incomplete
 
     
-    def _generate_recommendations(self = None, validation_details = None, expiry_info = None):
+    def _generate_recommendations(self, validation_details, expiry_info):
         '''Generate recommendations based on validation results.'''
-        recommendations = []
-        if not validation_details.get('token_exists', { }).get('passed', True):
-            recommendations.append("Run 'claude-oauth auth' to authenticate")
-        if not validation_details.get('has_access_token', { }).get('passed', True):
-            recommendations.append('Access token is missing - re-authenticate')
-        if not validation_details.get('token_expiry', { }).get('passed', True):
-            recommendations.append("Token is expired - run 'claude-oauth refresh' to refresh")
-        if not validation_details.get('api_validation', { }).get('passed', True):
-            recommendations.append('Token failed API validation - try refreshing or re-authenticating')
-        if not validation_details.get('has_refresh_token', { }).get('passed', True):
-            recommendations.append('No refresh token available - consider re-authenticating for better token management')
+        recommendations = [message for (check, message) in _RECOMMENDATION_CHECKS if not validation_details.get(check, _PASSED).get('passed', True)]
         if expiry_info.get('buffer_expired', False):
             recommendations.append('Token expires soon - consider refreshing proactively')
         if not recommendations:
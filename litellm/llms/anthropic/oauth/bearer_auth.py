@@ -5,185 +5,227 @@ Handles OAuth bearer token authentication for Claude API requests.
 """
 
 import os
-from typing import Any, Dict, Optional
+import re
+from typing import Any, Dict, Optional, Tuple
 
 from litellm._logging import verbose_logger
 
+_BEARER_PREFIX = "Bearer "
+_BEARER_LEN = len(_BEARER_PREFIX)
+
+_AUTHORIZATION_HEADER = "Authorization"
+_API_KEY_HEADER = "x-api-key"
+_BETA_HEADER = "anthropic-beta"
+_BETA_HEADER_VALUE = "oauth-2025-04-20"
+
+
+# Shared read-only default for responses without an "error" object
+_EMPTY: Dict[str, Any] = {}
+
+# OAuth error indicators in priority order, mapped to user-facing messages
+_OAUTH_ERROR_MESSAGES: Dict[str, str] = {
+    "invalid_token": "OAuth token is invalid or expired",
+    "insufficient_scope": "OAuth token lacks required scopes",
+    "token_expired": "OAuth token has expired",
+    "unauthorized": "OAuth authentication failed",
+}
+_OAUTH_ERROR_RE = re.compile("|".join(_OAUTH_ERROR_MESSAGES))
+# "expired" already covers "token_expired"
+_REFRESH_RE = re.compile(r"expired|invalid_token|unauthorized")
+
+# Token file named by CLAUDE_ACCESS_TOKEN_FILE, valid while (st_ino, st_mtime_ns, st_size)
+# match. A supervisor rewrites the file on refresh, so a running proxy picks up new
+# tokens without a restart.
+_TOKEN_FILE_CACHE: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+
+
+def _get_environment_token() -> Optional[str]:
+    """
+    Return the access token from CLAUDE_ACCESS_TOKEN_FILE, else CLAUDE_ACCESS_TOKEN.
+
+    Returns:
+        The token, or None if neither source has one
+    """
+    token_file = os.environ.get("CLAUDE_ACCESS_TOKEN_FILE")
+    if token_file:
+        try:
+            st = os.stat(token_file)
+            stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+            cached = _TOKEN_FILE_CACHE.get(token_file)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            with open(token_file, encoding="utf-8") as fh:
+                token = fh.read().strip()
+            _TOKEN_FILE_CACHE[token_file] = (stamp, token)
+            if token:
+                return token
+        except OSError as e:
+            verbose_logger.debug(f"Failed to read CLAUDE_ACCESS_TOKEN_FILE: {e}")
+    return os.environ.get("CLAUDE_ACCESS_TOKEN")
+
+
+def _is_oauth_request(
+    api_key: Optional[str],
+    metadata: Optional[Dict[str, Any]]
+) -> bool:
+    """
+    Check if this request should use OAuth authentication.
+
+    Args:
+        api_key: API key from request
+        metadata: Request metadata
+
+    Returns:
+        True if OAuth should be used
+    """
+    # Check metadata flags
+    if metadata and (
+        metadata.get("using_claude_oauth") or metadata.get("claude_oauth_token")
+    ):
+        return True
+
+    # Check if api_key looks like an OAuth token (Bearer token);
+    # OAuth tokens don't start with 'sk-ant-' like Anthropic API keys
+    if (
+        api_key
+        and api_key.startswith(_BEARER_PREFIX)
+        and not api_key.startswith("sk-ant-", _BEARER_LEN)
+    ):
+        return True
+
+    # Check environment variable
+    return bool(_get_environment_token())
+
+
+def _prepare_oauth_headers(
+    headers: Dict[str, str],
+    api_key: Optional[str],
+    metadata: Optional[Dict[str, Any]]
+) -> Dict[str, str]:
+    """
+    Prepare headers for OAuth authentication.
+
+    Args:
+        headers: Existing request headers
+        api_key: API key or OAuth token
+        metadata: Request metadata
+
+    Returns:
+        Modified headers with OAuth authentication
+    """
+    # Get OAuth token from various sources
+    oauth_token = None
+
+    # Priority order: metadata > api_key > environment
+    if metadata and metadata.get("claude_oauth_token"):
+        oauth_token = metadata["claude_oauth_token"]
+    elif api_key and api_key.startswith(_BEARER_PREFIX):
+        oauth_token = api_key[_BEARER_LEN:]
+    elif not api_key or not api_key.startswith("sk-ant-"):
+        # Check environment if no valid API key
+        oauth_token = _get_environment_token()
+
+    if oauth_token:
+        # Use OAuth bearer token instead of x-api-key
+        headers[_AUTHORIZATION_HEADER] = _BEARER_PREFIX + oauth_token
+
+        # Remove x-api-key header if present (OAuth takes precedence)
+        headers.pop(_API_KEY_HEADER, None)
+
+        # Add OAuth beta header - REQUIRED for OAuth
+        headers[_BETA_HEADER] = _BETA_HEADER_VALUE
+
+        verbose_logger.debug("Using OAuth bearer token for Claude API request")
+
+    return headers
+
+
+def _handle_oauth_response_error(
+    error_response: Dict[str, Any]
+) -> Optional[str]:
+    """
+    Handle OAuth-specific error responses.
+
+    Args:
+        error_response: Error response from API
+
+    Returns:
+        Error message if OAuth-related, None otherwise
+    """
+    error = error_response.get("error") or _EMPTY
+    error_type = error.get("type", "")
+    error_message = error.get("message", "")
+
+    # Check for OAuth-specific errors with one scan of the combined text
+    found = set(_OAUTH_ERROR_RE.findall(f"{error_type} {error_message}".lower()))
+    if found:
+        for error_key, message in _OAUTH_ERROR_MESSAGES.items():
+            if error_key in found:
+                return f"{message}: {error_message}"
+
+    # Check for 401 status which often indicates auth issues
+    if "401" in str(error_response.get("status_code", "")):
+        return f"OAuth authentication failed: {error_message}"
+
+    return None
+
+
+def _should_refresh_token(
+    error_response: Dict[str, Any]
+) -> bool:
+    """
+    Check if the error indicates token should be refreshed.
+
+    Args:
+        error_response: Error response from API
+
+    Returns:
+        True if token should be refreshed
+    """
+    # 401 status usually means auth failed; checked first as it needs no text scan
+    if error_response.get("status_code") == 401:
+        return True
+
+    error = error_response.get("error") or _EMPTY
+    error_type = error.get("type", "")
+    error_message = error.get("message", "")
+
+    # Errors that indicate token refresh needed
+    return _REFRESH_RE.search(f"{error_type} {error_message}".lower()) is not None
+
+
+def _extract_token_from_headers(
+    headers: Dict[str, str]
+) -> Optional[str]:
+    """
+    Extract OAuth token from request headers.
+
+    Args:
+        headers: Request headers
+
+    Returns:
+        OAuth token if found
+    """
+    # Check Authorization header
+    auth_header = headers.get(_AUTHORIZATION_HEADER, "")
+    if auth_header.startswith(_BEARER_PREFIX):
+        return auth_header[_BEARER_LEN:]
+
+    # Check custom header
+    return headers.get("X-Claude-OAuth-Token")
+
 
 class ClaudeOAuthBearer:
     """
     Handles OAuth bearer token authentication for Claude API requests.
     
     This class modifies request headers to use OAuth tokens instead of API keys
-    when OAuth authentication is enabled.
+    when OAuth authentication is enabled. The class holds no state; the
+    helpers are module-level functions exposed here as static methods.
     """
-    
-    @staticmethod
-    def is_oauth_request(
-        api_key: Optional[str],
-        metadata: Optional[Dict[str, Any]]
-    ) -> bool:
-        """
-        Check if this request should use OAuth authentication.
-        
-        Args:
-            api_key: API key from request
-            metadata: Request metadata
-            
-        Returns:
-            True if OAuth should be used
-        """
-        # Check metadata flags
-        if metadata:
-            if metadata.get("using_claude_oauth"):
-                return True
-            if metadata.get("claude_oauth_token"):
-                return True
-        
-        # Check if api_key looks like an OAuth token (Bearer token)
-        if api_key and api_key.startswith("Bearer "):
-            token = api_key.replace("Bearer ", "")
-            # OAuth tokens don't start with 'sk-ant-' like Anthropic API keys
-            if not token.startswith("sk-ant-"):
-                return True
-        
-        # Check environment variable
-        if os.getenv("CLAUDE_ACCESS_TOKEN"):
-            return True
-        
-        return False
-    
-    @staticmethod
-    def prepare_oauth_headers(
-        headers: Dict[str, str],
-        api_key: Optional[str],
-        metadata: Optional[Dict[str, Any]]
-    ) -> Dict[str, str]:
-        """
-        Prepare headers for OAuth authentication.
-        
-        Args:
-            headers: Existing request headers
-            api_key: API key or OAuth token
-            metadata: Request metadata
-            
-        Returns:
-            Modified headers with OAuth authentication
-        """
-        # Get OAuth token from various sources
-        oauth_token = None
-        
-        # Priority order: metadata > api_key > environment
-        if metadata and metadata.get("claude_oauth_token"):
-            oauth_token = metadata["claude_oauth_token"]
-        elif api_key and api_key.startswith("Bearer "):
-            oauth_token = api_key.replace("Bearer ", "")
-        elif not api_key or not api_key.startswith("sk-ant-"):
-            # Check environment if no valid API key
-            oauth_token = os.getenv("CLAUDE_ACCESS_TOKEN")
-        
-        if oauth_token:
-            # Use OAuth bearer token instead of x-api-key
-            headers["Authorization"] = f"Bearer {oauth_token}"
-            
-            # Remove x-api-key header if present (OAuth takes precedence)
-            headers.pop("x-api-key", None)
-            
-            # Add OAuth beta header - REQUIRED for OAuth
-            headers["anthropic-beta"] = "oauth-2025-04-20"
-            
-            verbose_logger.debug("Using OAuth bearer token for Claude API request")
-        
-        return headers
-    
-    @staticmethod
-    def handle_oauth_response_error(
-        error_response: Dict[str, Any]
-    ) -> Optional[str]:
-        """
-        Handle OAuth-specific error responses.
-        
-        Args:
-            error_response: Error response from API
-            
-        Returns:
-            Error message if OAuth-related, None otherwise
-        """
-        error_type = error_response.get("error", {}).get("type", "")
-        error_message = error_response.get("error", {}).get("message", "")
-        
-        # Check for OAuth-specific errors
-        oauth_errors = {
-            "invalid_token": "OAuth token is invalid or expired",
-            "insufficient_scope": "OAuth token lacks required scopes",
-            "token_expired": "OAuth token has expired",
-            "unauthorized": "OAuth authentication failed"
-        }
-        
-        for error_key, message in oauth_errors.items():
-            if error_key in error_type.lower() or error_key in error_message.lower():
-                return f"{message}: {error_message}"
-        
-        # Check for 401 status which often indicates auth issues
-        if "401" in str(error_response.get("status_code", "")):
-            return f"OAuth authentication failed: {error_message}"
-        
-        return None
-    
-    @staticmethod
-    def should_refresh_token(
-        error_response: Dict[str, Any]
-    ) -> bool:
-        """
-        Check if the error indicates token should be refreshed.
-        
-        Args:
-            error_response: Error response from API
-            
-        Returns:
-            True if token should be refreshed
-        """
-        error_type = error_response.get("error", {}).get("type", "")
-        error_message = error_response.get("error", {}).get("message", "")
-        status_code = error_response.get("status_code")
-        
-        # Errors that indicate token refresh needed
-        refresh_indicators = [
-            "token_expired",
-            "invalid_token",
-            "expired",
-            "unauthorized"
-        ]
-        
-        error_text = f"{error_type} {error_message}".lower()
-        
-        for indicator in refresh_indicators:
-            if indicator in error_text:
-                return True
-        
-        # 401 status usually means auth failed
-        if status_code == 401:
-            return True
-        
-        return False
-    
-    @staticmethod
-    def extract_token_from_headers(
-        headers: Dict[str, str]
-    ) -> Optional[str]:
-        """
-        Extract OAuth token from request headers.
-        
-        Args:
-            headers: Request headers
-            
-        Returns:
-            OAuth token if found
-        """
-        # Check Authorization header
-        auth_header = headers.get("Authorization", "")
-        if auth_header.startswith("Bearer "):
-            return auth_header.replace("Bearer ", "")
-        
-        # Check custom header
-        return headers.get("X-Claude-OAuth-Token")
\ No newline at end of file
+
+    is_oauth_request = staticmethod(_is_oauth_request)
+    prepare_oauth_headers = staticmethod(_prepare_oauth_headers)
+    handle_oauth_response_error = staticmethod(_handle_oauth_response_error)
+    should_refresh_token = staticmethod(_should_refresh_token)
+    extract_token_from_headers = staticmethod(_extract_token_from_headers)
@@ -8,18 +8,66 @@ Provides a unified interface for Claude authentication that:
 """
 
 import asyncio
-import json
 import os
+import time
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Tuple
 from datetime import datetime, timedelta
 
+import orjson
+
 from litellm._logging import verbose_proxy_logger
 from litellm.proxy.auth.claude_oauth_flow import ClaudeOAuthFlow
 from litellm.proxy.auth.claude_oauth_handler import ClaudeOAuthHandler
 from litellm.proxy.auth.claude_token_manager import ClaudeTokenManager, ClaudeTokenInfo
 
 
+_DEFAULT_TOKEN_FILE = Path.home() / ".litellm" / "claude_tokens.json"
+
+# Matches ClaudeOAuthHandler.is_token_expired, so cached tokens stop being served
+# at the point the handler would refresh them
+_TOKEN_CACHE_BUFFER_SECONDS = 300
+# Per-user tokens are re-checked with the handler this often, so tokens revoked
+# or deleted elsewhere (another worker, the /revoke endpoint) stop being served
+_TOKEN_CACHE_TTL_SECONDS = 60
+
+# Parsed token files keyed by path, valid while (st_ino, st_mtime_ns, st_size) match.
+# _write_token_file always replaces the file, so every rewrite gets a new inode
+# even when the mtime tick and the size are unchanged.
+_TOKEN_FILE_CACHE: Dict[Path, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+
+
+def _read_token_file(path: Path) -> Dict[str, Any]:
+    """
+    Read and parse a JSON token file, reusing the last parse while the file is unchanged.
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    st = os.stat(path)
+    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cached = _TOKEN_FILE_CACHE.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    token_data = orjson.loads(path.read_bytes())
+    _TOKEN_FILE_CACHE[path] = (stamp, token_data)
+    return token_data
+
+
+def _write_token_file(path: Path, data: bytes) -> None:
+    """
+    Atomically replace a token file with data, readable only by the owner.
+    
+    The temporary file is created with mode 0o600, so no separate chmod is needed
+    and readers never observe a partially written file.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+
+
 class ClaudeAuthService:
     """
     Orchestrates Claude authentication by coordinating OAuth flow and token management.
@@ -48,8 +96,7 @@ class ClaudeAuthService:
             cache: Cache client for temporary storage
         """
         # Token storage location
-        self.token_file = token_file or (Path.home() / ".litellm" / "claude_tokens.json")
-        self.token_file.parent.mkdir(parents=True, exist_ok=True)
+        self.token_file = token_file or _DEFAULT_TOKEN_FILE
         
         # Initialize components
         self.oauth_flow = ClaudeOAuthFlow()
@@ -61,6 +108,10 @@ class ClaudeAuthService:
             oauth_flow=self.oauth_flow
         )
         
+        # Per-user access tokens and the time they may be served until, so repeat
+        # requests skip the DB/cache lookup
+        self._token_cache: Dict[str, Tuple[str, float]] = {}
+        
         # Load tokens on initialization
         self._load_tokens()
     
@@ -72,27 +123,27 @@ class ClaudeAuthService:
             True if tokens were loaded successfully
         """
         # Try loading from file first
-        if self.token_file.exists():
-            try:
-                token_data = json.loads(self.token_file.read_text())
-                self.oauth_handler.access_token = token_data.get("accessToken")
-                self.oauth_handler.refresh_token = token_data.get("refreshToken")
-                self.oauth_handler.expires_at = token_data.get("expiresAt")
-                
-                verbose_proxy_logger.info(f"Loaded tokens from {self.token_file}")
-                return True
-            except Exception as e:
-                verbose_proxy_logger.warning(f"Failed to load tokens from file: {e}")
+        try:
+            token_data = _read_token_file(self.token_file)
+            self.oauth_handler.access_token = token_data.get("accessToken")
+            self.oauth_handler.refresh_token = token_data.get("refreshToken")
+            self.oauth_handler.expires_at = token_data.get("expiresAt")
+            
+            verbose_proxy_logger.info(f"Loaded tokens from {self.token_file}")
+            return True
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            verbose_proxy_logger.warning(f"Failed to load tokens from file: {e}")
         
         # Fall back to environment variables
-        if all([
-            os.getenv("CLAUDE_ACCESS_TOKEN"),
-            os.getenv("CLAUDE_REFRESH_TOKEN"),
-            os.getenv("CLAUDE_EXPIRES_AT")
-        ]):
-            self.oauth_handler.access_token = os.getenv("CLAUDE_ACCESS_TOKEN")
-            self.oauth_handler.refresh_token = os.getenv("CLAUDE_REFRESH_TOKEN")
-            self.oauth_handler.expires_at = int(os.getenv("CLAUDE_EXPIRES_AT"))
+        access_token = os.environ.get("CLAUDE_ACCESS_TOKEN")
+        refresh_token = os.environ.get("CLAUDE_REFRESH_TOKEN")
+        expires_at = os.environ.get("CLAUDE_EXPIRES_AT")
+        if access_token and refresh_token and expires_at:
+            self.oauth_handler.access_token = access_token
+            self.oauth_handler.refresh_token = refresh_token
+            self.oauth_handler.expires_at = int(expires_at)
             
             verbose_proxy_logger.info("Loaded tokens from environment variables")
             return True
@@ -108,8 +159,8 @@ class ClaudeAuthService:
             token_data: Token data to save
         """
         try:
-            self.token_file.write_text(json.dumps(token_data, indent=2))
-            self.token_file.chmod(0o600)  # Restrict permissions
+            self.token_file.parent.mkdir(parents=True, exist_ok=True)
+            _write_token_file(self.token_file, orjson.dumps(token_data))
             
             # Update handler with new tokens
             self.oauth_handler.access_token = token_data.get("accessToken")
@@ -120,6 +171,37 @@ class ClaudeAuthService:
         except Exception as e:
             verbose_proxy_logger.error(f"Failed to save tokens: {e}")
     
+    def _fast_valid_token(self) -> Optional[str]:
+        """
+        Return the in-memory access token if it is outside the refresh window.
+        
+        Uses the same buffer as ClaudeOAuthHandler.get_valid_token, so a token
+        returned here is one the handler would also have returned unchanged.
+        """
+        handler = self.oauth_handler
+        if handler.access_token and not handler.is_token_expired():
+            return handler.access_token
+        return None
+    
+    def _remember_token(self, user_id: Optional[str]) -> None:
+        """Cache the handler's current token for user_id."""
+        handler = self.oauth_handler
+        if user_id is not None and handler.access_token and handler.expires_at:
+            serve_until = min(
+                handler.expires_at - _TOKEN_CACHE_BUFFER_SECONDS,
+                time.time() + _TOKEN_CACHE_TTL_SECONDS
+            )
+            self._token_cache[user_id] = (handler.access_token, serve_until)
+    
+    def invalidate_token(self, user_id: str) -> None:
+        """Stop serving the cached token for user_id, e.g. after it was revoked."""
+        self._token_cache.pop(user_id, None)
+    
+    def _reset_token_cache(self) -> None:
+        """Drop cached tokens taken from the handler's previous token and cache its new one."""
+        self._token_cache.clear()
+        self._remember_token("default")
+    
     async def get_access_token(
         self,
         user_id: Optional[str] = None,
@@ -137,6 +219,15 @@ class ClaudeAuthService:
         Returns:
             Valid access token or None if authentication fails
         """
+        # The default token is held by the handler; per-user tokens are cached here
+        if user_id is None:
+            if token := self._fast_valid_token():
+                return token
+        else:
+            cached = self._token_cache.get(user_id)
+            if cached and time.time() < cached[1]:
+                return cached[0]
+        
         # Try to get valid token from handler
         token = await self.oauth_handler.get_valid_token(
             user_id=user_id,
@@ -145,6 +236,7 @@ class ClaudeAuthService:
         )
         
         if token:
+            self._remember_token(user_id)
             return token
         
         # Check if we should initiate OAuth flow
@@ -160,9 +252,12 @@ class ClaudeAuthService:
             try:
                 token_data = await self.oauth_handler.refresh_access_token()
                 self._save_tokens(token_data)
+                self._remember_token(user_id)
                 return self.oauth_handler.access_token
             except Exception as e:
                 verbose_proxy_logger.error(f"Token refresh failed: {e}")
+                if user_id is not None:
+                    self.invalidate_token(user_id)
                 
                 if require_oauth:
                     verbose_proxy_logger.info(
@@ -207,6 +302,7 @@ class ClaudeAuthService:
         
         # Save tokens
         self._save_tokens(token_data)
+        self._reset_token_cache()
         
         # Store in handler's cache if available
         if self.oauth_handler.cache:
@@ -228,6 +324,7 @@ class ClaudeAuthService:
         try:
             token_data = await self.oauth_handler.refresh_access_token()
             self._save_tokens(token_data)
+            self._reset_token_cache()
             return token_data
         except Exception as e:
             verbose_proxy_logger.error(f"Manual token refresh failed: {e}")
@@ -249,6 +346,7 @@ class ClaudeAuthService:
     def clear_tokens(self) -> None:
         """Clear all stored tokens."""
         # Clear from handler
+        self._token_cache.clear()
         self.oauth_handler.access_token = None
         self.oauth_handler.refresh_token = None
         self.oauth_handler.expires_at = None
@@ -346,6 +444,17 @@ def get_auth_service(
     return _auth_service
 
 
+def invalidate_cached_token(user_id: str) -> None:
+    """
+    Drop a user's cached token from the singleton auth service, if one exists.
+    
+    Args:
+        user_id: User whose token was revoked or deleted
+    """
+    if _auth_service is not None:
+        _auth_service.invalidate_token(user_id)
+
+
 async def quick_authenticate() -> Optional[str]:
     """
     Quick authentication helper for simple use cases.
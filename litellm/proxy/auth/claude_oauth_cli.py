@@ -5,7 +5,6 @@ Provides command-line interface for Claude OAuth authentication flow.
 """
 
 import asyncio
-import json
 import os
 import sys
 import time
@@ -14,8 +13,10 @@ from pathlib import Path
 from typing import Optional
 
 import click
+import orjson
 
 from litellm._logging import verbose_proxy_logger
+from litellm.proxy.auth.claude_auth_service import _read_token_file, _write_token_file
 from litellm.proxy.auth.claude_oauth_flow import ClaudeOAuthFlow
 from litellm.proxy.auth.claude_oauth_handler import ClaudeOAuthHandler
 from litellm.proxy.auth.claude_token_manager import ClaudeTokenInfo, ClaudeTokenManager
@@ -24,7 +25,25 @@ from litellm.proxy.auth.claude_token_manager import ClaudeTokenInfo, ClaudeToken
 # Configuration file paths
 CONFIG_DIR = Path.home() / ".litellm"
 TOKEN_FILE = CONFIG_DIR / "claude_tokens.json"
-CONFIG_DIR.mkdir(exist_ok=True)
+_config_dir_ready = False
+
+
+def _ensure_config_dir() -> None:
+    """Create CONFIG_DIR on first write rather than on import."""
+    global _config_dir_ready
+    if not _config_dir_ready:
+        CONFIG_DIR.mkdir(exist_ok=True)
+        _config_dir_ready = True
+
+
+def _read_token_expiry(path: Path) -> int:
+    """
+    Read the top-level expiresAt from a token file.
+    
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    return orjson.loads(path.read_bytes()).get("expiresAt", 0)
 
 
 @click.group()
@@ -88,6 +107,7 @@ def login(no_browser: bool, state_dir: Optional[str]):
         
         # Save state for reference
         state_file = CONFIG_DIR / "oauth_state.txt"
+        _ensure_config_dir()
         state_file.write_text(state)
         click.echo(f"\n✅ State saved. This session expires in 10 minutes.")
     
@@ -128,8 +148,8 @@ def callback(code: str, state_dir: Optional[str]):
             token_data = await flow.complete_flow(code, state)
             
             # Save tokens
-            TOKEN_FILE.write_text(json.dumps(token_data, indent=2))
-            TOKEN_FILE.chmod(0o600)  # Restrict permissions
+            _ensure_config_dir()
+            _write_token_file(TOKEN_FILE, orjson.dumps(token_data, option=orjson.OPT_INDENT_2))
             
             # Clean up state file
             state_file.unlink(missing_ok=True)
@@ -173,19 +193,24 @@ def status():
     """Check Claude OAuth token status."""
     
     # Check environment variables first
-    has_env_tokens = all([
-        os.getenv("CLAUDE_ACCESS_TOKEN"),
-        os.getenv("CLAUDE_REFRESH_TOKEN"),
-        os.getenv("CLAUDE_EXPIRES_AT")
-    ])
+    has_env_tokens = bool(
+        os.getenv("CLAUDE_ACCESS_TOKEN")
+        and os.getenv("CLAUDE_REFRESH_TOKEN")
+        and os.getenv("CLAUDE_EXPIRES_AT")
+    )
     
-    # Check saved token file
-    has_file_tokens = TOKEN_FILE.exists()
+    # Check saved token file (only needed when the environment has no tokens)
+    file_expires_at = None
+    if not has_env_tokens:
+        try:
+            file_expires_at = _read_token_expiry(TOKEN_FILE)
+        except FileNotFoundError:
+            pass
     
     click.echo("🔍 Claude OAuth Status")
     click.echo("=" * 60)
     
-    if not has_env_tokens and not has_file_tokens:
+    if not has_env_tokens and file_expires_at is None:
         click.echo("❌ No tokens found")
         click.echo("\n   Run 'litellm claude login' to authenticate")
         return
@@ -196,8 +221,7 @@ def status():
         expires_at = int(os.getenv("CLAUDE_EXPIRES_AT", 0))
     else:
         click.echo(f"✅ Using tokens from: {TOKEN_FILE}")
-        token_data = json.loads(TOKEN_FILE.read_text())
-        expires_at = token_data.get("expiresAt", 0)
+        expires_at = file_expires_at
     
     # Check expiration
     current_time = int(time.time())
@@ -232,18 +256,19 @@ def refresh():
         click.echo("🔄 Refreshing Claude OAuth tokens...")
         
         # Load current tokens
-        if not TOKEN_FILE.exists():
+        try:
+            token_data = _read_token_file(TOKEN_FILE)
+        except FileNotFoundError:
             # Try environment variables
             access_token = os.getenv("CLAUDE_ACCESS_TOKEN")
             refresh_token = os.getenv("CLAUDE_REFRESH_TOKEN")
             expires_at = os.getenv("CLAUDE_EXPIRES_AT")
             
-            if not all([access_token, refresh_token, expires_at]):
+            if not (access_token and refresh_token and expires_at):
                 click.echo("❌ No tokens found to refresh")
                 click.echo("   Run 'litellm claude login' to authenticate")
                 sys.exit(1)
         else:
-            token_data = json.loads(TOKEN_FILE.read_text())
             access_token = token_data.get("accessToken")
             refresh_token = token_data.get("refreshToken")
             expires_at = token_data.get("expiresAt")
@@ -260,8 +285,8 @@ def refresh():
             new_token_data = await handler.refresh_access_token()
             
             # Save refreshed tokens
-            TOKEN_FILE.write_text(json.dumps(new_token_data, indent=2))
-            TOKEN_FILE.chmod(0o600)
+            _ensure_config_dir()
+            _write_token_file(TOKEN_FILE, orjson.dumps(new_token_data, option=orjson.OPT_INDENT_2))
             
             click.echo("✅ Tokens refreshed successfully!")
             
@@ -290,8 +315,11 @@ def logout():
     click.echo("🗑️  Clearing Claude OAuth tokens...")
     
     # Remove token file
-    if TOKEN_FILE.exists():
+    try:
         TOKEN_FILE.unlink()
+    except FileNotFoundError:
+        pass
+    else:
         click.echo(f"   ✅ Removed: {TOKEN_FILE}")
     
     # Clear OAuth state if exists
@@ -314,13 +342,13 @@ def logout():
 def export():
     """Export tokens as environment variables."""
     
-    if not TOKEN_FILE.exists():
+    try:
+        token_data = _read_token_file(TOKEN_FILE)
+    except FileNotFoundError:
         click.echo("❌ No tokens found")
         click.echo("   Run 'litellm claude login' to authenticate")
         return
     
-    token_data = json.loads(TOKEN_FILE.read_text())
-    
     click.echo("# Claude OAuth Token Environment Variables")
     click.echo("# Add these to your shell profile or .env file")
     click.echo()
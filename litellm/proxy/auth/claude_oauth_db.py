@@ -4,13 +4,42 @@ Claude OAuth Database Storage
 Handles storing and retrieving OAuth tokens from the database.
 """
 
+import asyncio
+import base64
 import json
+import os
 import time
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional, Any
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 
 from litellm._logging import verbose_proxy_logger
+from litellm.caching.in_memory_cache import InMemoryCache
+
+# Decrypted token records are served from memory for this long before re-reading the DB
+TOKEN_CACHE_TTL_SECONDS = 60
+TOKEN_CACHE_MAX_SIZE = 10_000
+# Key prefix for encrypted token rows shared across workers through the proxy cache
+SHARED_TOKEN_CACHE_KEY_PREFIX = "claude_oauth_record:"
+# Users found to have no token are remembered for this long
+ABSENT_TOKEN_CACHE_TTL_SECONDS = 30
+ABSENT_TOKEN_CACHE_MAX_SIZE = 50_000
+# Cached tokens this close to expiry are re-read so callers see refreshed tokens
+TOKEN_CACHE_EXPIRY_SKEW_SECONDS = 60
+# last_used reads are buffered and written in one batch at this interval
+LAST_USED_FLUSH_INTERVAL_SECONDS = 10
+
+# Token ciphertexts are base64(version byte + nonce + AES-GCM output). Fernet
+# tokens always start with 0x80, so legacy rows are told apart by the first byte.
+# Version 0x03 uses an HKDF-derived key and binds the ciphertext to its user and
+# column.
+_AESGCM_VERSION = 0x03
+_FERNET_VERSION = 0x80
+_AESGCM_NONCE_SIZE = 12
+_AESGCM_KEY_INFO = b"litellm-claude-oauth-token-aesgcm"
 
 
 class ClaudeOAuthDatabase:
@@ -18,42 +47,187 @@ class ClaudeOAuthDatabase:
     Handles database operations for Claude OAuth tokens.
     """
     
-    def __init__(self, prisma_client: Any, encryption_key: Optional[str] = None):
+    def __init__(
+        self,
+        prisma_client: Any,
+        encryption_key: Optional[str] = None,
+        cache: Optional[Any] = None
+    ):
         """
         Initialize database handler.
         
         Args:
             prisma_client: Prisma database client
             encryption_key: Optional key for encrypting tokens
+            cache: Optional shared cache (e.g. DualCache with Redis); only ciphertext is stored in it
         """
         self.prisma_client = prisma_client
+        self.cache = cache
         
         # Setup encryption if key provided
+        key = None
         if encryption_key:
             # Use the provided key directly if it's valid, otherwise generate a new one
             try:
                 # Try to use the provided key (Fernet requires base64 encoded 32-byte key)
-                self.fernet = Fernet(encryption_key.encode() if isinstance(encryption_key, str) else encryption_key)
+                key = encryption_key.encode() if isinstance(encryption_key, str) else encryption_key
+                self.fernet = Fernet(key)
             except (ValueError, Exception) as e:
                 # If the key is invalid, generate a new one
                 import logging
                 logging.warning(f"Invalid encryption key provided for database, generating a temporary key: {e}")
-                self.fernet = Fernet(Fernet.generate_key())
-        else:
-            # No key provided, generate one
-            self.fernet = Fernet(Fernet.generate_key())
+                key = None
+        if key is None:
+            # No usable key provided, generate one
+            key = Fernet.generate_key()
+            self.fernet = Fernet(key)
+        
+        # New tokens use AES-256-GCM under a key derived from the Fernet key, so the
+        # two ciphers never share key material; Fernet is kept to read older rows
+        raw_key = base64.urlsafe_b64decode(key)
+        self._aesgcm = AESGCM(
+            HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=_AESGCM_KEY_INFO).derive(raw_key)
+        )
+        
+        # Decrypted token data by user_id; invalidated on every write for that user
+        self._token_cache = InMemoryCache(
+            max_size_in_memory=TOKEN_CACHE_MAX_SIZE,
+            default_ttl=TOKEN_CACHE_TTL_SECONDS,
+        )
+        # user_ids with no token row, so repeated lookups for them skip the DB
+        self._absent_token_cache = InMemoryCache(
+            max_size_in_memory=ABSENT_TOKEN_CACHE_MAX_SIZE,
+            default_ttl=ABSENT_TOKEN_CACHE_TTL_SECONDS,
+        )
+        # Bumped on every invalidation so a read that raced a write does not cache stale data
+        self._token_cache_generation = 0
+        
+        # User IDs read since the last flush; written back as one batched last_used update
+        self._pending_last_used: set = set()
+        self._last_used_flush_task: Optional[asyncio.Task] = None
+    
+    def _invalidate_cached_tokens(self, user_id: str) -> None:
+        """Drop the cached token data for a user ahead of a write."""
+        self._token_cache.delete_cache(user_id)
+        self._absent_token_cache.delete_cache(user_id)
+        self._token_cache_generation += 1
+    
+    async def _get_shared_record(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Read a user's encrypted token row from the shared cache, if configured."""
+        if not self.cache:
+            return None
+        try:
+            return await self.cache.async_get_cache(SHARED_TOKEN_CACHE_KEY_PREFIX + user_id)
+        except Exception as e:
+            verbose_proxy_logger.debug(f"Shared OAuth token cache read failed: {e}")
+            return None
+    
+    async def _set_shared_record(self, user_id: str, record: Dict[str, Any]) -> None:
+        """Write a user's encrypted token row to the shared cache, if configured."""
+        if not self.cache:
+            return
+        try:
+            await self.cache.async_set_cache(
+                SHARED_TOKEN_CACHE_KEY_PREFIX + user_id, record, ttl=TOKEN_CACHE_TTL_SECONDS
+            )
+        except Exception as e:
+            verbose_proxy_logger.debug(f"Shared OAuth token cache write failed: {e}")
+    
+    async def _publish_shared_record(self, user_id: str, record: Dict[str, Any], read_started: float) -> None:
+        """
+        Share a token row read from the DB unless another worker has since written it.
+        
+        A write that finished after this read began leaves a newer marker, and a
+        row another worker published may carry a later updated_at; either way the
+        row read here may be stale and is not published.
+        """
+        current = await self._get_shared_record(user_id)
+        if current is not None and (
+            current.get("invalidated_at", 0) >= read_started
+            or current.get("updated_at", 0) > record["updated_at"]
+        ):
+            return
+        await self._set_shared_record(user_id, record)
+    
+    async def _invalidate_shared_record(self, user_id: str) -> None:
+        """Replace a user's shared token row with a marker recording when it was written."""
+        await self._set_shared_record(user_id, {"invalidated_at": time.time()})
+    
+    def _record_last_used(self, user_id: str) -> None:
+        """Queue a last_used update, starting the background flush on first use."""
+        self._pending_last_used.add(user_id)
+        if self._last_used_flush_task is None or self._last_used_flush_task.done():
+            self._last_used_flush_task = asyncio.create_task(self._flush_last_used_loop())
+    
+    async def _flush_last_used_loop(self) -> None:
+        """Periodically write buffered last_used updates."""
+        while True:
+            await asyncio.sleep(LAST_USED_FLUSH_INTERVAL_SECONDS)
+            await self.flush_last_used()
+    
+    async def flush_last_used(self) -> None:
+        """
+        Write all buffered last_used updates in a single query.
+        
+        Every pending user gets the flush time, which is at most
+        LAST_USED_FLUSH_INTERVAL_SECONDS later than their actual last read.
+        Users whose update did not complete are kept for the next flush.
+        """
+        if not self._pending_last_used:
+            return
+        user_ids = list(self._pending_last_used)
+        self._pending_last_used.clear()
+        try:
+            await self.prisma_client.db.litellm_claudeoauthtokens.update_many(
+                where={"user_id": {"in": user_ids}},
+                data={"last_used": datetime.now(timezone.utc)}
+            )
+        except asyncio.CancelledError:
+            self._pending_last_used.update(user_ids)
+            raise
+        except Exception as e:
+            self._pending_last_used.update(user_ids)
+            verbose_proxy_logger.error(f"Failed to update OAuth token last_used: {e}")
+    
+    async def close(self) -> None:
+        """Stop the background flush and write any buffered last_used updates."""
+        task = self._last_used_flush_task
+        if task is not None:
+            self._last_used_flush_task = None
+            task.cancel()
+            # Let an interrupted flush put its user ids back before the final one
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush_last_used()
     
-    def _encrypt(self, data: str) -> str:
-        """Encrypt a string."""
-        if self.fernet and data:
-            return self.fernet.encrypt(data.encode()).decode()
+    @staticmethod
+    def _associated_data(user_id: str, column: str) -> bytes:
+        """AES-GCM associated data that ties a ciphertext to one user's column."""
+        return f"{user_id}\x00{column}".encode()
+    
+    def _encrypt(self, data: str, user_id: str, column: str) -> str:
+        """Encrypt a string for the given user and token column."""
+        if data:
+            nonce = os.urandom(_AESGCM_NONCE_SIZE)
+            ciphertext = self._aesgcm.encrypt(nonce, data.encode(), self._associated_data(user_id, column))
+            blob = bytes((_AESGCM_VERSION,)) + nonce + ciphertext
+            return base64.urlsafe_b64encode(blob).decode("ascii")
         return data
     
-    def _decrypt(self, data: str) -> str:
-        """Decrypt a string."""
-        if self.fernet and data:
+    def _decrypt(self, data: str, user_id: str, column: str) -> str:
+        """Decrypt a string written by _encrypt or by an older format."""
+        if data:
             try:
-                return self.fernet.decrypt(data.encode()).decode()
+                blob = base64.urlsafe_b64decode(data)
+                if blob[0] == _FERNET_VERSION:
+                    return self.fernet.decrypt(data.encode()).decode()
+                nonce = blob[1:1 + _AESGCM_NONCE_SIZE]
+                ciphertext = blob[1 + _AESGCM_NONCE_SIZE:]
+                if blob[0] == _AESGCM_VERSION:
+                    return self._aesgcm.decrypt(nonce, ciphertext, self._associated_data(user_id, column)).decode()
+                raise ValueError(f"Unknown token format version {blob[0]:#x}")
             except Exception as e:
                 verbose_proxy_logger.error(f"Failed to decrypt token: {e}")
                 return data
@@ -82,57 +256,55 @@ class ClaudeOAuthDatabase:
         Returns:
             True if successful
         """
+        self._invalidate_cached_tokens(user_id)
         try:
             # Encrypt tokens
-            access_token_encrypted = self._encrypt(access_token)
-            refresh_token_encrypted = self._encrypt(refresh_token) if refresh_token else None
+            access_token_encrypted = self._encrypt(access_token, user_id, "access_token_encrypted")
+            refresh_token_encrypted = (
+                self._encrypt(refresh_token, user_id, "refresh_token_encrypted") if refresh_token else None
+            )
             
             # Convert expires_at to datetime
-            expires_datetime = datetime.fromtimestamp(expires_at)
+            expires_datetime = datetime.fromtimestamp(expires_at, timezone.utc)
             
-            # Check if tokens already exist for user
-            existing = await self.prisma_client.db.litellm_claudeoauthtokens.find_unique(
-                where={"user_id": user_id}
-            )
+            actor = created_by or user_id
+            now = datetime.now(timezone.utc)
             
-            if existing:
-                # Update existing tokens
-                await self.prisma_client.db.litellm_claudeoauthtokens.update(
+            # Upsert the token row and mark OAuth as enabled on the user in one
+            # batch, which Prisma sends as a single request and commits atomically
+            async with self.prisma_client.db.batch_() as batcher:
+                batcher.litellm_claudeoauthtokens.upsert(
                     where={"user_id": user_id},
                     data={
-                        "access_token_encrypted": access_token_encrypted,
-                        "refresh_token_encrypted": refresh_token_encrypted,
-                        "expires_at": expires_datetime,
-                        "scopes": scopes,
-                        "refresh_count": existing.refresh_count + 1,
-                        "updated_by": created_by or user_id,
-                        "last_used": datetime.now()
+                        "create": {
+                            "user_id": user_id,
+                            "access_token_encrypted": access_token_encrypted,
+                            "refresh_token_encrypted": refresh_token_encrypted,
+                            "expires_at": expires_datetime,
+                            "scopes": scopes,
+                            "created_by": actor,
+                            "updated_by": actor
+                        },
+                        "update": {
+                            "access_token_encrypted": access_token_encrypted,
+                            "refresh_token_encrypted": refresh_token_encrypted,
+                            "expires_at": expires_datetime,
+                            "scopes": scopes,
+                            "refresh_count": {"increment": 1},
+                            "updated_by": actor,
+                            "last_used": now
+                        }
                     }
                 )
-                verbose_proxy_logger.info(f"Updated OAuth tokens for user {user_id}")
-            else:
-                # Create new token record
-                await self.prisma_client.db.litellm_claudeoauthtokens.create(
+                batcher.litellm_usertable.update(
+                    where={"user_id": user_id},
                     data={
-                        "user_id": user_id,
-                        "access_token_encrypted": access_token_encrypted,
-                        "refresh_token_encrypted": refresh_token_encrypted,
-                        "expires_at": expires_datetime,
-                        "scopes": scopes,
-                        "created_by": created_by or user_id,
-                        "updated_by": created_by or user_id
+                        "claude_oauth_enabled": True,
+                        "claude_oauth_connected_at": now
                     }
                 )
-                verbose_proxy_logger.info(f"Stored new OAuth tokens for user {user_id}")
-            
-            # Update user table to mark OAuth as enabled
-            await self.prisma_client.db.litellm_usertable.update(
-                where={"user_id": user_id},
-                data={
-                    "claude_oauth_enabled": True,
-                    "claude_oauth_connected_at": datetime.now()
-                }
-            )
+            await self._invalidate_shared_record(user_id)
+            verbose_proxy_logger.info(f"Stored OAuth tokens for user {user_id}")
             
             return True
             
@@ -150,35 +322,64 @@ class ClaudeOAuthDatabase:
         Returns:
             Token data dictionary or None
         """
+        cached = self._token_cache.get_cache(user_id)
+        if cached is not None and cached["expiresAt"] > time.time() + TOKEN_CACHE_EXPIRY_SKEW_SECONDS:
+            self._record_last_used(user_id)
+            return dict(cached)
+        if self._absent_token_cache.get_cache(user_id) is not None:
+            return None
+        
+        generation = self._token_cache_generation
         try:
-            token_record = await self.prisma_client.db.litellm_claudeoauthtokens.find_unique(
-                where={"user_id": user_id}
-            )
-            
-            if not token_record:
-                return None
+            # Other workers may already have loaded this row; markers left by
+            # writes and rows close to expiry are read from the DB instead
+            record = await self._get_shared_record(user_id)
+            if record is not None and (
+                "access_token_encrypted" not in record
+                or record["expires_at"] <= time.time() + TOKEN_CACHE_EXPIRY_SKEW_SECONDS
+            ):
+                record = None
+            if record is None:
+                read_started = time.time()
+                token_record = await self.prisma_client.db.litellm_claudeoauthtokens.find_unique(
+                    where={"user_id": user_id}
+                )
+                
+                if not token_record:
+                    if generation == self._token_cache_generation:
+                        self._absent_token_cache.set_cache(user_id, True)
+                    return None
+                
+                record = {
+                    "access_token_encrypted": token_record.access_token_encrypted,
+                    "refresh_token_encrypted": token_record.refresh_token_encrypted,
+                    # Convert expires_at to timestamp
+                    "expires_at": int(token_record.expires_at.timestamp()),
+                    "scopes": token_record.scopes or [],
+                    "refresh_count": token_record.refresh_count,
+                    "updated_at": token_record.updated_at.timestamp()
+                }
+                if generation == self._token_cache_generation:
+                    await self._publish_shared_record(user_id, record, read_started)
             
             # Decrypt tokens
-            access_token = self._decrypt(token_record.access_token_encrypted)
-            refresh_token = (self._decrypt(token_record.refresh_token_encrypted) 
-                           if token_record.refresh_token_encrypted else None)
-            
-            # Convert expires_at to timestamp
-            expires_at = int(token_record.expires_at.timestamp())
+            access_token = self._decrypt(record["access_token_encrypted"], user_id, "access_token_encrypted")
+            refresh_token = (self._decrypt(record["refresh_token_encrypted"], user_id, "refresh_token_encrypted")
+                           if record["refresh_token_encrypted"] else None)
             
             # Update last_used
-            await self.prisma_client.db.litellm_claudeoauthtokens.update(
-                where={"user_id": user_id},
-                data={"last_used": datetime.now()}
-            )
+            self._record_last_used(user_id)
             
-            return {
+            token_data = {
                 "accessToken": access_token,
                 "refreshToken": refresh_token,
-                "expiresAt": expires_at,
-                "scopes": token_record.scopes or [],
-                "refreshCount": token_record.refresh_count
+                "expiresAt": record["expires_at"],
+                "scopes": record["scopes"],
+                "refreshCount": record["refresh_count"]
             }
+            if generation == self._token_cache_generation:
+                self._token_cache.set_cache(user_id, token_data)
+            return dict(token_data)
             
         except Exception as e:
             verbose_proxy_logger.error(f"Failed to retrieve OAuth tokens: {e}")
@@ -194,21 +395,22 @@ class ClaudeOAuthDatabase:
         Returns:
             True if successful
         """
+        self._invalidate_cached_tokens(user_id)
         try:
-            # Delete token record
-            await self.prisma_client.db.litellm_claudeoauthtokens.delete(
-                where={"user_id": user_id}
-            )
-            
-            # Update user table
-            await self.prisma_client.db.litellm_usertable.update(
-                where={"user_id": user_id},
-                data={
-                    "claude_oauth_enabled": False,
-                    "claude_oauth_connected_at": None
-                }
-            )
+            # Delete token record and update user table in one atomic batch
+            async with self.prisma_client.db.batch_() as batcher:
+                batcher.litellm_claudeoauthtokens.delete(
+                    where={"user_id": user_id}
+                )
+                batcher.litellm_usertable.update(
+                    where={"user_id": user_id},
+                    data={
+                        "claude_oauth_enabled": False,
+                        "claude_oauth_connected_at": None
+                    }
+                )
             
+            await self._invalidate_shared_record(user_id)
             verbose_proxy_logger.info(f"Deleted OAuth tokens for user {user_id}")
             return True
             
@@ -227,18 +429,22 @@ class ClaudeOAuthDatabase:
             List of user IDs with expiring tokens
         """
         try:
-            from datetime import timedelta
+            expiry_time = datetime.now(timezone.utc) + timedelta(minutes=minutes)
             
-            expiry_time = datetime.now() + timedelta(minutes=minutes)
-            
-            expiring = await self.prisma_client.db.litellm_claudeoauthtokens.find_many(
-                where={
-                    "expires_at": {"lte": expiry_time},
-                    "refresh_token_encrypted": {"not": None}
-                }
+            # Only user_id is needed; the Prisma client's find_many cannot select
+            # columns, so fetch it directly instead of whole rows with token ciphertexts.
+            # Prisma stores DateTime as UTC, and casting to timestamp keeps the UTC wall time.
+            expiring = await self.prisma_client.db.query_raw(
+                """
+                SELECT user_id
+                FROM "LiteLLM_ClaudeOAuthTokens"
+                WHERE expires_at <= $1::timestamp
+                AND refresh_token_encrypted IS NOT NULL
+                """,
+                expiry_time.isoformat(),
             )
             
-            return [record.user_id for record in expiring]
+            return [record["user_id"] for record in expiring]
             
         except Exception as e:
             verbose_proxy_logger.error(f"Failed to get expiring tokens: {e}")
@@ -261,10 +467,11 @@ class ClaudeOAuthDatabase:
         Returns:
             True if successful
         """
+        self._invalidate_cached_tokens(user_id)
         try:
             # Encrypt new token
-            access_token_encrypted = self._encrypt(new_access_token)
-            expires_datetime = datetime.fromtimestamp(new_expires_at)
+            access_token_encrypted = self._encrypt(new_access_token, user_id, "access_token_encrypted")
+            expires_datetime = datetime.fromtimestamp(new_expires_at, timezone.utc)
             
             # Update record
             await self.prisma_client.db.litellm_claudeoauthtokens.update(
@@ -273,10 +480,11 @@ class ClaudeOAuthDatabase:
                     "access_token_encrypted": access_token_encrypted,
                     "expires_at": expires_datetime,
                     "refresh_count": {"increment": 1},
-                    "last_used": datetime.now()
+                    "last_used": datetime.now(timezone.utc)
                 }
             )
             
+            await self._invalidate_shared_record(user_id)
             verbose_proxy_logger.info(f"Updated token expiry for user {user_id}")
             return True
             
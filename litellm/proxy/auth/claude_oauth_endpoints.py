@@ -4,15 +4,18 @@ Claude OAuth API Endpoints
 FastAPI endpoints for Claude OAuth authentication flow.
 """
 
-from typing import Any, Dict, Optional
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, Body
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse
 from pydantic import BaseModel
 
 from litellm._logging import verbose_proxy_logger
 from litellm.proxy._types import UserAPIKeyAuth
 from litellm.proxy.auth.user_api_key_auth import user_api_key_auth
+from litellm.proxy.auth.claude_auth_service import invalidate_cached_token
 from litellm.proxy.auth.claude_oauth_handler import ClaudeOAuthHandler
 from litellm.proxy.auth.claude_token_manager import ClaudeTokenManager
 from litellm.proxy.auth.claude_oauth_flow import ClaudeOAuthFlow
@@ -31,6 +34,21 @@ oauth_handler: Optional[ClaudeOAuthHandler] = None
 token_manager: Optional[ClaudeTokenManager] = None
 oauth_flow: Optional[ClaudeOAuthFlow] = None
 
+# Health checks are polled, so token stats are reused for a short window
+TOKEN_STATS_CACHE_TTL_SECONDS = 2
+_token_stats_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+
+
+async def _get_cached_token_stats() -> Dict[str, Any]:
+    """Get token manager statistics, recomputing at most every TOKEN_STATS_CACHE_TTL_SECONDS."""
+    global _token_stats_cache
+    now = time.monotonic()
+    if _token_stats_cache is not None and now - _token_stats_cache[0] < TOKEN_STATS_CACHE_TTL_SECONDS:
+        return _token_stats_cache[1]
+    stats = await token_manager.get_token_stats()
+    _token_stats_cache = (now, stats)
+    return stats
+
 
 def initialize_oauth_endpoints(
     prisma_client: Optional[Any] = None,
@@ -38,7 +56,7 @@ def initialize_oauth_endpoints(
     cache: Optional[Any] = None
 ):
     """Initialize OAuth endpoints with database and cache connections."""
-    global oauth_handler, token_manager, oauth_flow
+    global oauth_handler, token_manager, oauth_flow, _token_stats_cache
     
     # Initialize OAuth handler with database support
     oauth_handler = ClaudeOAuthHandler(
@@ -55,10 +73,17 @@ def initialize_oauth_endpoints(
     
     # Initialize OAuth flow
     oauth_flow = ClaudeOAuthFlow()
+    _token_stats_cache = None
     
     verbose_proxy_logger.info("Claude OAuth endpoints initialized")
 
 
+async def close_oauth_endpoints():
+    """Flush buffered OAuth token bookkeeping on proxy shutdown."""
+    if oauth_handler and oauth_handler.db_handler:
+        await oauth_handler.db_handler.close()
+
+
 def get_oauth_handler() -> ClaudeOAuthHandler:
     """Get OAuth handler instance."""
     if not oauth_handler:
@@ -108,7 +133,7 @@ async def start_oauth(
             # Store state temporarily for validation
             await oauth_handler.store_state(state, user_id)
         
-        return JSONResponse({
+        return ORJSONResponse({
             "authorization_url": auth_url,
             "state": state,
             "message": "Visit the authorization URL to complete authentication"
@@ -178,7 +203,7 @@ async def callback(
         )
         
         if success:
-            return JSONResponse({
+            return ORJSONResponse({
                 "success": True,
                 "message": "OAuth authentication successful",
                 "expires_in": token_data.get("expiresIn", 3600),
@@ -228,14 +253,14 @@ async def get_status(
             # Get token expiration info
             expires_in = oauth_handler.get_token_expiry(user_id)
             
-            return JSONResponse({
+            return ORJSONResponse({
                 "authenticated": True,
                 "user_id": user_id,
                 "expires_in": expires_in,
                 "needs_refresh": expires_in < 300 if expires_in else False
             })
         else:
-            return JSONResponse({
+            return ORJSONResponse({
                 "authenticated": False,
                 "user_id": user_id,
                 "message": "No valid OAuth tokens found"
@@ -243,7 +268,7 @@ async def get_status(
     
     except Exception as e:
         verbose_proxy_logger.error(f"Failed to get OAuth status: {e}")
-        return JSONResponse({
+        return ORJSONResponse({
             "authenticated": False,
             "error": str(e)
         })
@@ -270,7 +295,7 @@ async def refresh_token(
         new_token = await oauth_handler.refresh_access_token(user_id=user_id)
         
         if new_token:
-            return JSONResponse({
+            return ORJSONResponse({
                 "success": True,
                 "message": "Token refreshed successfully"
             })
@@ -304,7 +329,7 @@ async def oauth_status(
     user_id = user_api_key_dict.user_id or user_api_key_dict.key_alias
     
     if not user_id:
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "authenticated": False,
                 "message": "User ID not found"
@@ -315,7 +340,7 @@ async def oauth_status(
     token = await manager.get_token(user_id, auto_refresh=False)
     
     if not token:
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "authenticated": False,
                 "user_id": user_id,
@@ -327,12 +352,10 @@ async def oauth_status(
     token_info = manager.active_tokens.get(user_id)
     
     if token_info:
-        from datetime import datetime, timezone
-        
         current_time = datetime.now(timezone.utc)
         time_until_expiry = (token_info.expires_at - current_time).total_seconds()
         
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "authenticated": True,
                 "user_id": user_id,
@@ -345,7 +368,7 @@ async def oauth_status(
             }
         )
     
-    return JSONResponse(
+    return ORJSONResponse(
         content={
             "authenticated": False,
             "user_id": user_id,
@@ -377,16 +400,17 @@ async def revoke_token(
     
     # Revoke token
     success = await manager.revoke_token(user_id)
+    invalidate_cached_token(user_id)
     
     if success:
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "success": True,
                 "message": "OAuth token revoked successfully"
             }
         )
     else:
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "success": False,
                 "message": "No token found to revoke"
@@ -403,7 +427,7 @@ async def health_check():
     token manager statistics.
     """
     if not oauth_handler or not token_manager:
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "status": "unhealthy",
                 "message": "OAuth not configured"
@@ -412,9 +436,9 @@ async def health_check():
         )
     
     try:
-        stats = await token_manager.get_token_stats()
+        stats = await _get_cached_token_stats()
         
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "status": "healthy",
                 "oauth_configured": True,
@@ -423,7 +447,7 @@ async def health_check():
         )
     except Exception as e:
         verbose_proxy_logger.error(f"Health check error: {e}")
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "status": "unhealthy",
                 "message": str(e)
@@ -391,4 +391,4 @@ Claude OAuth Authentication Required
 
 Note: The authorization code expires quickly, so complete this process promptly.
 """
-        return instructions
\ No newline at end of file
+        return instructions
@@ -109,7 +109,7 @@ class ClaudeOAuthHandler:
         
         # Setup database handler if prisma client available
         if self.prisma_client:
-            self.db_handler = ClaudeOAuthDatabase(self.prisma_client, encryption_key)
+            self.db_handler = ClaudeOAuthDatabase(self.prisma_client, encryption_key, cache=self.cache)
         else:
             self.db_handler = None
         
@@ -152,8 +152,8 @@ class ClaudeOAuthHandler:
         if not self.expires_at:
             return True
         
-        current_time = int(time.time())
-        return current_time >= (self.expires_at - buffer_seconds)
+        # expires_at is whole seconds, so comparing the float clock gives the same result as truncating it
+        return time.time() >= self.expires_at - buffer_seconds
     
     async def refresh_access_token(self) -> Dict[str, Any]:
         """
@@ -523,6 +523,12 @@ def cleanup_router_config_variables():
 async def proxy_shutdown_event():
     global prisma_client, master_key, user_custom_auth, user_custom_key_generate
     verbose_proxy_logger.info("Shutting down LiteLLM Proxy Server")
+
+    # flush buffered Claude OAuth last_used updates while the DB is still connected
+    from litellm.proxy.auth.claude_oauth_endpoints import close_oauth_endpoints
+
+    await close_oauth_endpoints()
+
     if prisma_client:
         verbose_proxy_logger.debug("Disconnecting from Prisma")
         await prisma_client.disconnect()
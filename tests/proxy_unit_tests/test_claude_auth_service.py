@@ -12,7 +12,11 @@ import pytest
 
 from litellm.proxy.auth.claude_auth_service import (
     ClaudeAuthService,
+    _read_token_file,
+    _write_token_file,
+    _TOKEN_CACHE_TTL_SECONDS,
     get_auth_service,
+    invalidate_cached_token,
     quick_authenticate
 )
 from litellm.proxy.auth.claude_token_manager import ClaudeTokenInfo
@@ -262,6 +266,118 @@ class TestClaudeAuthService:
             auth_service.get_headers()
 
 
+class TestPerUserTokenCache:
+    """Test the per-user access token cache in ClaudeAuthService."""
+    
+    @pytest.fixture
+    def auth_service(self, tmp_path, monkeypatch):
+        """Auth service with its token manager and OAuth flow mocked out."""
+        for name in ("CLAUDE_ACCESS_TOKEN", "CLAUDE_REFRESH_TOKEN", "CLAUDE_EXPIRES_AT"):
+            monkeypatch.delenv(name, raising=False)
+        with patch('litellm.proxy.auth.claude_auth_service.ClaudeTokenManager'), \
+                patch('litellm.proxy.auth.claude_auth_service.ClaudeOAuthFlow'):
+            service = ClaudeAuthService(token_file=tmp_path / "tokens.json")
+        service.oauth_handler.access_token = "old_token"
+        service.oauth_handler.refresh_token = "old_refresh"
+        service.oauth_handler.expires_at = int(time.time()) + 3600
+        service.oauth_handler.get_valid_token = AsyncMock(
+            side_effect=lambda **kwargs: service.oauth_handler.access_token
+        )
+        return service
+    
+    @pytest.fixture
+    def new_tokens(self):
+        return {
+            "accessToken": "new_token",
+            "refreshToken": "new_refresh",
+            "expiresAt": int(time.time()) + 7200,
+        }
+    
+    @pytest.mark.asyncio
+    async def test_user_token_served_from_cache(self, auth_service):
+        """Repeat lookups for a user skip the handler."""
+        assert await auth_service.get_access_token(user_id="user-1") == "old_token"
+        assert await auth_service.get_access_token(user_id="user-1") == "old_token"
+        
+        assert auth_service.oauth_handler.get_valid_token.await_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_token_near_expiry_is_not_served_from_cache(self, auth_service):
+        """Cached tokens inside the refresh window go back to the handler."""
+        auth_service.oauth_handler.expires_at = int(time.time()) + 60
+        
+        await auth_service.get_access_token(user_id="user-1")
+        await auth_service.get_access_token(user_id="user-1")
+        
+        assert auth_service.oauth_handler.get_valid_token.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_cached_token_is_rechecked_after_ttl(self, auth_service, monkeypatch):
+        """Tokens revoked elsewhere stop being served once the cache TTL passes."""
+        await auth_service.get_access_token(user_id="user-1")
+        auth_service.oauth_handler.get_valid_token.side_effect = None
+        auth_service.oauth_handler.get_valid_token.return_value = None
+        auth_service.oauth_handler.refresh_token = None
+        
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + _TOKEN_CACHE_TTL_SECONDS + 1)
+        
+        assert await auth_service.get_access_token(user_id="user-1") is None
+    
+    @pytest.mark.asyncio
+    async def test_revoked_token_is_not_served_from_cache(self, auth_service):
+        """Invalidating a user's token sends the next lookup to the handler."""
+        await auth_service.get_access_token(user_id="user-1")
+        
+        with patch('litellm.proxy.auth.claude_auth_service._auth_service', auth_service):
+            invalidate_cached_token("user-1")
+        await auth_service.get_access_token(user_id="user-1")
+        
+        assert auth_service.oauth_handler.get_valid_token.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_complete_oauth_flow_resets_cache(self, auth_service, new_tokens):
+        """A new login replaces tokens cached from the previous one."""
+        await auth_service.get_access_token(user_id="user-1")
+        await auth_service.get_access_token(user_id="default")
+        auth_service.oauth_flow.complete_flow = AsyncMock(return_value=new_tokens)
+        
+        await auth_service.complete_oauth_flow("code", "state")
+        
+        assert await auth_service.get_access_token(user_id="default") == "new_token"
+        assert await auth_service.get_access_token(user_id="user-1") == "new_token"
+    
+    @pytest.mark.asyncio
+    async def test_refresh_tokens_resets_cache(self, auth_service, new_tokens):
+        """A manual refresh replaces cached tokens."""
+        await auth_service.get_access_token(user_id="user-1")
+        auth_service.oauth_handler.refresh_access_token = AsyncMock(return_value=new_tokens)
+        
+        await auth_service.refresh_tokens()
+        
+        assert await auth_service.get_access_token(user_id="default") == "new_token"
+        assert await auth_service.get_access_token(user_id="user-1") == "new_token"
+    
+    def test_token_file_rewrite_is_reread(self, sample_token_file):
+        """A same-size rewrite within one mtime tick is not served from the parse cache."""
+        path, first, second = sample_token_file
+        stat = os.stat(path)
+        assert _read_token_file(path) == first
+        
+        _write_token_file(path, json.dumps(second).encode())
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        
+        assert _read_token_file(path) == second
+    
+    @pytest.fixture
+    def sample_token_file(self, tmp_path):
+        path = tmp_path / "tokens.json"
+        first = {"accessToken": "token_a"}
+        second = {"accessToken": "token_b"}
+        _write_token_file(path, json.dumps(first).encode())
+        return path, first, second
+
+
 class TestAuthServiceHelpers:
     """Test helper functions for auth service."""
     
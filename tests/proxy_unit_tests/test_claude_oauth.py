@@ -441,6 +441,91 @@ class TestClaudeOAuthBearer:
             "error": {"message": "Server error"}
         }) == False
 
+    
+    def test_environment_token_read_per_call(self, monkeypatch):
+        """CLAUDE_ACCESS_TOKEN set after import is used."""
+        from litellm.llms.anthropic.oauth.bearer_auth import ClaudeOAuthBearer
+        
+        monkeypatch.delenv("CLAUDE_ACCESS_TOKEN", raising=False)
+        assert ClaudeOAuthBearer.is_oauth_request(api_key=None, metadata=None) == False
+        assert "Authorization" not in ClaudeOAuthBearer.prepare_oauth_headers({}, None, None)
+        
+        monkeypatch.setenv("CLAUDE_ACCESS_TOKEN", "env-oauth-token")
+        assert ClaudeOAuthBearer.is_oauth_request(api_key=None, metadata=None) == True
+        headers = ClaudeOAuthBearer.prepare_oauth_headers({"x-api-key": "old"}, None, None)
+        assert headers["Authorization"] == "Bearer env-oauth-token"
+        assert "x-api-key" not in headers
+    
+    def test_environment_token_file_takes_precedence(self, monkeypatch, tmp_path):
+        """A rewritten CLAUDE_ACCESS_TOKEN_FILE is picked up on the next call."""
+        from litellm.llms.anthropic.oauth.bearer_auth import ClaudeOAuthBearer
+        
+        token_file = tmp_path / "claude_access_token"
+        token_file.write_text("file-token-1")
+        monkeypatch.setenv("CLAUDE_ACCESS_TOKEN", "env-oauth-token")
+        monkeypatch.setenv("CLAUDE_ACCESS_TOKEN_FILE", str(token_file))
+        
+        headers = ClaudeOAuthBearer.prepare_oauth_headers({}, None, None)
+        assert headers["Authorization"] == "Bearer file-token-1"
+        
+        replacement = tmp_path / "replacement"
+        replacement.write_text("file-token-2")
+        os.replace(replacement, token_file)
+        headers = ClaudeOAuthBearer.prepare_oauth_headers({}, None, None)
+        assert headers["Authorization"] == "Bearer file-token-2"
+        
+        token_file.unlink()
+        headers = ClaudeOAuthBearer.prepare_oauth_headers({}, None, None)
+        assert headers["Authorization"] == "Bearer env-oauth-token"
+    
+    def test_prepare_oauth_headers_keeps_anthropic_api_key(self, monkeypatch):
+        """A real Anthropic API key is not replaced by the environment token."""
+        from litellm.llms.anthropic.oauth.bearer_auth import ClaudeOAuthBearer
+        
+        monkeypatch.setenv("CLAUDE_ACCESS_TOKEN", "env-oauth-token")
+        headers = ClaudeOAuthBearer.prepare_oauth_headers(
+            {"x-api-key": "sk-ant-api-key-123"}, "sk-ant-api-key-123", None
+        )
+        
+        assert headers == {"x-api-key": "sk-ant-api-key-123"}
+    
+    def test_prepare_oauth_headers_from_bearer_api_key(self):
+        """A Bearer api_key is moved into the Authorization header."""
+        from litellm.llms.anthropic.oauth.bearer_auth import ClaudeOAuthBearer
+        
+        headers = ClaudeOAuthBearer.prepare_oauth_headers({}, "Bearer oauth-token-123", None)
+        
+        assert headers["Authorization"] == "Bearer oauth-token-123"
+        assert headers["anthropic-beta"] == "oauth-2025-04-20"
+    
+    def test_handle_oauth_response_error(self):
+        """OAuth errors map to messages in priority order."""
+        from litellm.llms.anthropic.oauth.bearer_auth import ClaudeOAuthBearer
+        
+        assert ClaudeOAuthBearer.handle_oauth_response_error({
+            "error": {"type": "invalid_token", "message": "token_expired"}
+        }) == "OAuth token is invalid or expired: token_expired"
+        assert ClaudeOAuthBearer.handle_oauth_response_error({
+            "status_code": 401,
+            "error": {"message": "nope"}
+        }) == "OAuth authentication failed: nope"
+        assert ClaudeOAuthBearer.handle_oauth_response_error({
+            "error": {"type": "overloaded_error", "message": "busy"}
+        }) is None
+        assert ClaudeOAuthBearer.handle_oauth_response_error({}) is None
+    
+    def test_extract_token_from_headers(self):
+        """Tokens are read from the Authorization or custom header."""
+        from litellm.llms.anthropic.oauth.bearer_auth import ClaudeOAuthBearer
+        
+        assert ClaudeOAuthBearer.extract_token_from_headers(
+            {"Authorization": "Bearer abc"}
+        ) == "abc"
+        assert ClaudeOAuthBearer.extract_token_from_headers(
+            {"X-Claude-OAuth-Token": "xyz"}
+        ) == "xyz"
+        assert ClaudeOAuthBearer.extract_token_from_headers({}) is None
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Tests for the claude_oauth ClaudeOAuth client
+
+Covers the local callback listener and the waits built on it.
+"""
+
+import socket
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# The decompiled modules import their siblings by bare name
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "claude_oauth_decompiled" / "src" / "claude_oauth" / "auth"))
+
+import oauth  # noqa: E402
+from oauth import ClaudeOAuth, OAuthConfig  # noqa: E402
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def client():
+    port = _free_port()
+    return ClaudeOAuth(OAuthConfig(callback_port=port, callback_timeout=10))
+
+
+def _send_callback(port, query):
+    with socket.create_connection(("127.0.0.1", port)) as conn:
+        conn.sendall(f"GET /callback?{query} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        return conn.recv(65536)
+
+
+def _wait_until_port_released(port, timeout=2):
+    deadline = time.monotonic() + timeout
+    while port in oauth._busy_callback_ports:
+        assert time.monotonic() < deadline, "callback port was not released"
+        time.sleep(0.01)
+
+
+def test_wait_for_callback_raises_worker_timeout(client):
+    def timed_out():
+        raise socket.timeout("timed out")
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        callback = pool.submit(timed_out)
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            client._wait_for_callback(callback)
+
+    assert time.monotonic() - started < 2
+
+
+def test_start_callback_server_returns_code(client):
+    port = client.config.callback_port
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        result = pool.submit(client.start_callback_server)
+        while port not in oauth._busy_callback_ports:
+            time.sleep(0.01)
+        response = _send_callback(port, "code=abc&state=xyz")
+
+        assert result.result(timeout=5) == ("abc", "xyz", None)
+    assert response.startswith(b"HTTP/1.1 200 OK")
+
+
+def test_interrupted_wait_is_cancelled(client, monkeypatch):
+    def interrupted(callback):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(client, "_wait_for_callback", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        client.start_callback_server()
+
+    _wait_until_port_released(client.config.callback_port)
+
+
+def test_busy_port_closes_given_cancellation(client):
+    cancelled = oauth.CallbackCancellation()
+    first = client.start_callback_listener(cancelled)
+    other = oauth.CallbackCancellation()
+    try:
+        with pytest.raises(OSError):
+            client.start_callback_listener(other)
+        assert other._reader.fileno() == -1
+    finally:
+        cancelled.set()
+    assert first.result(timeout=5) == (None, None, "cancelled")
+
+
+def _reset_connection(port):
+    conn = socket.create_connection(("127.0.0.1", port))
+    conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    conn.close()
+
+
+@pytest.mark.parametrize("stray", ["idle", "reset"])
+def test_stray_connection_does_not_end_wait(client, monkeypatch, stray):
+    monkeypatch.setattr(oauth, "CALLBACK_CONNECTION_TIMEOUT", 0.2)
+    port = client.config.callback_port
+    callback = client.start_callback_listener()
+    if stray == "idle":
+        idle = socket.create_connection(("127.0.0.1", port))
+    else:
+        _reset_connection(port)
+    try:
+        response = _send_callback(port, "code=abc&state=xyz")
+        assert callback.result(timeout=5) == ("abc", "xyz", None)
+    finally:
+        if stray == "idle":
+            idle.close()
+    assert response.startswith(b"HTTP/1.1 200 OK")
@@ -0,0 +1,45 @@
+"""
+Tests for the Claude OAuth CLI status command
+"""
+
+import time
+
+import orjson
+import pytest
+from click.testing import CliRunner
+
+from litellm.proxy.auth import claude_oauth_cli
+
+
+@pytest.fixture
+def token_file(tmp_path, monkeypatch):
+    for var in ("CLAUDE_ACCESS_TOKEN", "CLAUDE_REFRESH_TOKEN", "CLAUDE_EXPIRES_AT"):
+        monkeypatch.delenv(var, raising=False)
+    path = tmp_path / "claude_tokens.json"
+    monkeypatch.setattr(claude_oauth_cli, "TOKEN_FILE", path)
+    return path
+
+
+def test_read_token_expiry_ignores_nested_keys(token_file):
+    expires_at = int(time.time()) + 3600
+    token_file.write_bytes(
+        orjson.dumps({"metadata": {"expiresAt": 1}, "accessToken": "access", "expiresAt": expires_at})
+    )
+
+    assert claude_oauth_cli._read_token_expiry(token_file) == expires_at
+
+
+def test_status_reports_expired_file_token(token_file):
+    token_file.write_bytes(orjson.dumps({"accessToken": "access", "expiresAt": int(time.time()) - 60}))
+
+    result = CliRunner().invoke(claude_oauth_cli.claude, ["status"])
+
+    assert result.exit_code == 0
+    assert "Expired" in result.output
+
+
+def test_status_without_tokens(token_file):
+    result = CliRunner().invoke(claude_oauth_cli.claude, ["status"])
+
+    assert result.exit_code == 0
+    assert "No tokens found" in result.output
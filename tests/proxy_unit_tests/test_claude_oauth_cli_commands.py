@@ -0,0 +1,78 @@
+"""
+Tests for the claude_oauth CLI command handlers
+"""
+
+import socket
+import struct
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+CLI_DIR = Path(__file__).resolve().parents[2] / "claude_oauth_decompiled" / "src" / "claude_oauth" / "cli"
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    """The commands module, with the sibling packages it imports by bare name stubbed."""
+    monkeypatch.setitem(
+        sys.modules,
+        "auth",
+        types.SimpleNamespace(OAuthClient=None, TokenManager=None),
+    )
+    monkeypatch.setitem(sys.modules, "storage", types.SimpleNamespace(SecureTokenStorage=None))
+    monkeypatch.syspath_prepend(str(CLI_DIR))
+    monkeypatch.delitem(sys.modules, "commands", raising=False)
+    import commands
+
+    return commands
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _connect(port):
+    deadline = time.monotonic() + 2
+    while True:
+        try:
+            return socket.create_connection(("127.0.0.1", port))
+        except ConnectionRefusedError:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+
+def test_wait_for_callback_times_out_cleanly(commands):
+    auth = commands.AuthCommands(None, None)
+
+    assert auth._wait_for_callback(_free_port(), timeout=0.2) is None
+
+
+@pytest.mark.parametrize("stray", ["idle", "reset"])
+def test_wait_for_callback_skips_stray_connections(commands, monkeypatch, stray):
+    monkeypatch.setattr(commands, "_CONNECTION_TIMEOUT", 0.2)
+    port = _free_port()
+
+    def client():
+        conn = _connect(port)
+        if stray == "reset":
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            conn.close()
+        with _connect(port) as callback:
+            callback.sendall(b"GET /callback?code=abc HTTP/1.1\r\n\r\n")
+            callback.recv(65536)
+        conn.close()
+
+    thread = threading.Thread(target=client)
+    thread.start()
+    started = time.monotonic()
+    url = commands.AuthCommands(None, None)._wait_for_callback(port, timeout=10)
+    thread.join()
+
+    assert url == f"http://localhost:{port}/callback?code=abc"
+    assert time.monotonic() - started < 5
@@ -0,0 +1,147 @@
+"""
+Tests for the claude_oauth ClaudeOAuth client
+
+Covers the authorization code and validation caches and the token endpoint retry policy.
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from urllib3.util.retry import RequestHistory
+
+# The decompiled modules import their siblings by bare name
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "claude_oauth_decompiled" / "src" / "claude_oauth" / "auth"))
+
+import oauth  # noqa: E402
+from oauth import ClaudeOAuth, JitteredRetry  # noqa: E402
+
+
+def _response(status_code=200, content=b'{"access_token": "access", "expires_in": 3600}'):
+    response = MagicMock(status_code=status_code, content=content)
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(f"{status_code} error")
+    return response
+
+
+@pytest.fixture
+def session():
+    return MagicMock()
+
+
+@pytest.fixture
+def client(session):
+    return ClaudeOAuth(session=session)
+
+
+def test_repeated_code_shares_one_exchange(client, session):
+    session.post.return_value = _response()
+
+    first = client.exchange_code("code-1", "verifier")
+    first["access_token"] = "mutated"
+    second = client.exchange_code("code-1", "verifier")
+
+    assert session.post.call_count == 1
+    assert second["access_token"] == "access"
+
+
+def test_concurrent_exchanges_of_one_code_share_the_request(client, session):
+    release = threading.Event()
+
+    def slow_post(*args, **kwargs):
+        release.wait(5)
+        return _response()
+
+    session.post.side_effect = slow_post
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = [pool.submit(client.exchange_code, "code-1", "verifier") for _ in range(2)]
+        time.sleep(0.1)
+        release.set()
+        tokens = [result.result(timeout=5) for result in results]
+
+    assert session.post.call_count == 1
+    assert tokens[0] == tokens[1]
+
+
+def test_failed_exchange_is_not_cached(client, session):
+    session.post.side_effect = [_response(status_code=400), _response()]
+
+    with pytest.raises(requests.HTTPError):
+        client.exchange_code("code-1", "verifier")
+
+    assert client.exchange_code("code-1", "verifier")["access_token"] == "access"
+    assert session.post.call_count == 2
+
+
+def test_exchange_cache_expires(client, session, monkeypatch):
+    session.post.return_value = _response()
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    client.exchange_code("code-1", "verifier")
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + oauth.CODE_EXCHANGE_CACHE_TTL)
+    client.exchange_code("code-1", "verifier")
+
+    assert session.post.call_count == 2
+
+
+def test_validate_token_is_cached(client, session):
+    session.get.return_value = _response(status_code=401)
+
+    assert client.validate_token("access") is False
+    assert client.validate_token("access") is False
+    assert session.get.call_count == 1
+
+
+def test_validate_cache_expires(client, session, monkeypatch):
+    session.get.return_value = _response()
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    assert client.validate_token("access") is True
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + oauth.VALIDATE_CACHE_TTL)
+    assert client.validate_token("access") is True
+
+    assert session.get.call_count == 2
+
+
+def test_validate_network_error_is_not_cached(client, session):
+    session.get.side_effect = [requests.ConnectionError("down"), _response()]
+
+    assert client.validate_token("access") is False
+    assert client.validate_token("access") is True
+
+
+def test_validate_cache_is_bounded(client, session, monkeypatch):
+    monkeypatch.setattr(oauth, "VALIDATE_CACHE_MAX_SIZE", 2)
+    session.get.return_value = _response()
+
+    for token in ("a", "b", "c"):
+        client.validate_token(token)
+
+    assert list(client._validate_cache) == ["b", "c"]
+
+
+def _retry_with_errors(errors):
+    history = tuple(RequestHistory("POST", "/v1/oauth/token", None, 503, None) for _ in range(errors))
+    return JitteredRetry(total=20, backoff_factor=1, history=history)
+
+
+@pytest.mark.parametrize("errors,expected", [(1, 0), (3, 6), (20, oauth.RETRY_BACKOFF_MAX * 1.5)])
+def test_jittered_backoff(monkeypatch, errors, expected):
+    monkeypatch.setattr(oauth.random, "random", lambda: 1.0)
+
+    assert _retry_with_errors(errors).get_backoff_time() == expected
+
+
+def test_jittered_retry_after_header(monkeypatch):
+    monkeypatch.setattr(oauth.random, "random", lambda: 0.5)
+    response = MagicMock(headers={"Retry-After": "10"})
+
+    assert JitteredRetry().get_retry_after(response) == 12.5
+    assert JitteredRetry().get_retry_after(MagicMock(headers={})) is None
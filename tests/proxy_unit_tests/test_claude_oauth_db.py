@@ -0,0 +1,351 @@
+"""
+Tests for Claude OAuth database token storage
+
+Covers the in-process and shared token caches, ciphertext formats and the
+batched last_used writes of ClaudeOAuthDatabase.
+"""
+
+import asyncio
+import base64
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from cryptography.fernet import Fernet
+
+from litellm.caching.dual_cache import DualCache
+from litellm.caching.in_memory_cache import InMemoryCache
+from litellm.proxy.auth import claude_oauth_db
+from litellm.proxy.auth.claude_oauth_db import ClaudeOAuthDatabase
+
+
+def _make_prisma():
+    """Prisma client mock with the calls ClaudeOAuthDatabase makes."""
+    prisma = MagicMock()
+    table = prisma.db.litellm_claudeoauthtokens
+    table.find_unique = AsyncMock(return_value=None)
+    table.update = AsyncMock()
+    table.update_many = AsyncMock()
+    prisma.db.batch_.return_value.__aenter__.return_value = MagicMock()
+    return prisma
+
+
+def _make_row(db, user_id, access_token="access", refresh_token="refresh"):
+    """Token row as stored by store_tokens."""
+    return SimpleNamespace(
+        access_token_encrypted=db._encrypt(access_token, user_id, "access_token_encrypted"),
+        refresh_token_encrypted=db._encrypt(refresh_token, user_id, "refresh_token_encrypted"),
+        expires_at=datetime.fromtimestamp(int(time.time()) + 3600, timezone.utc),
+        scopes=["user:inference"],
+        refresh_count=0,
+        updated_at=datetime.now(timezone.utc),
+    )
+
+
+@pytest.fixture
+def encryption_key():
+    return Fernet.generate_key().decode()
+
+
+@pytest.fixture
+def prisma():
+    return _make_prisma()
+
+
+@pytest.fixture
+def db(prisma, encryption_key):
+    return ClaudeOAuthDatabase(prisma, encryption_key)
+
+
+class TestTokenCache:
+    """In-process token cache, generation guard and negative cache."""
+
+    @pytest.mark.asyncio
+    async def test_get_tokens_reuses_cached_record(self, db, prisma):
+        prisma.db.litellm_claudeoauthtokens.find_unique.return_value = _make_row(db, "user-1")
+
+        first = await db.get_tokens("user-1")
+        second = await db.get_tokens("user-1")
+        await db.close()
+
+        assert first == second
+        assert first["accessToken"] == "access"
+        assert first["refreshToken"] == "refresh"
+        assert prisma.db.litellm_claudeoauthtokens.find_unique.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_store_tokens_invalidates_cached_record(self, db, prisma):
+        find_unique = prisma.db.litellm_claudeoauthtokens.find_unique
+        find_unique.return_value = _make_row(db, "user-1")
+        await db.get_tokens("user-1")
+
+        assert await db.store_tokens("user-1", "new-access", "new-refresh", int(time.time()) + 3600, [])
+        find_unique.return_value = _make_row(db, "user-1", access_token="new-access")
+        token_data = await db.get_tokens("user-1")
+        await db.close()
+
+        assert token_data["accessToken"] == "new-access"
+        assert find_unique.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_read_racing_a_write_is_not_cached(self, db, prisma):
+        row = _make_row(db, "user-1")
+
+        async def find_unique_during_write(**kwargs):
+            # A write for the same user lands while the read is in flight
+            db._invalidate_cached_tokens("user-1")
+            return row
+
+        find_unique = prisma.db.litellm_claudeoauthtokens.find_unique
+        find_unique.side_effect = find_unique_during_write
+
+        assert (await db.get_tokens("user-1"))["accessToken"] == "access"
+        assert db._token_cache.get_cache("user-1") is None
+        await db.get_tokens("user-1")
+        await db.close()
+
+        assert find_unique.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_cached_record_near_expiry_is_reread(self, db, prisma):
+        row = _make_row(db, "user-1")
+        row.expires_at = datetime.fromtimestamp(
+            int(time.time()) + claude_oauth_db.TOKEN_CACHE_EXPIRY_SKEW_SECONDS // 2, timezone.utc
+        )
+        find_unique = prisma.db.litellm_claudeoauthtokens.find_unique
+        find_unique.return_value = row
+
+        await db.get_tokens("user-1")
+        await db.get_tokens("user-1")
+        await db.close()
+
+        assert find_unique.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_missing_user_is_remembered_until_stored(self, db, prisma):
+        find_unique = prisma.db.litellm_claudeoauthtokens.find_unique
+
+        assert await db.get_tokens("user-1") is None
+        assert await db.get_tokens("user-1") is None
+        assert find_unique.await_count == 1
+
+        await db.store_tokens("user-1", "access", "refresh", int(time.time()) + 3600, [])
+        find_unique.return_value = _make_row(db, "user-1")
+        assert (await db.get_tokens("user-1"))["accessToken"] == "access"
+        await db.close()
+
+        assert find_unique.await_count == 2
+
+
+class TestSharedTokenCache:
+    """Encrypted token rows shared across workers through the proxy cache."""
+
+    @pytest.fixture
+    def shared_cache(self):
+        return DualCache(in_memory_cache=InMemoryCache())
+
+    @pytest.mark.asyncio
+    async def test_second_worker_reads_shared_record(self, prisma, encryption_key, shared_cache):
+        worker_a = ClaudeOAuthDatabase(prisma, encryption_key, cache=shared_cache)
+        worker_b = ClaudeOAuthDatabase(prisma, encryption_key, cache=shared_cache)
+        prisma.db.litellm_claudeoauthtokens.find_unique.return_value = _make_row(worker_a, "user-1")
+
+        await worker_a.get_tokens("user-1")
+        token_data = await worker_b.get_tokens("user-1")
+        await worker_a.close()
+        await worker_b.close()
+
+        assert token_data["accessToken"] == "access"
+        assert prisma.db.litellm_claudeoauthtokens.find_unique.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_shared_record_holds_only_ciphertext(self, prisma, encryption_key, shared_cache):
+        db = ClaudeOAuthDatabase(prisma, encryption_key, cache=shared_cache)
+        prisma.db.litellm_claudeoauthtokens.find_unique.return_value = _make_row(db, "user-1")
+
+        await db.get_tokens("user-1")
+        await db.close()
+        record = await shared_cache.async_get_cache(
+            claude_oauth_db.SHARED_TOKEN_CACHE_KEY_PREFIX + "user-1"
+        )
+
+        assert record is not None
+        assert "access" not in record.values()
+        assert "refresh" not in record.values()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("write", ["store", "delete", "update_expiry"])
+    async def test_writes_replace_shared_record(self, prisma, encryption_key, shared_cache, write):
+        db = ClaudeOAuthDatabase(prisma, encryption_key, cache=shared_cache)
+        prisma.db.litellm_claudeoauthtokens.find_unique.return_value = _make_row(db, "user-1")
+        await db.get_tokens("user-1")
+
+        expires_at = int(time.time()) + 3600
+        if write == "store":
+            assert await db.store_tokens("user-1", "new-access", None, expires_at, [])
+        elif write == "delete":
+            assert await db.delete_tokens("user-1")
+        else:
+            assert await db.update_token_expiry("user-1", "new-access", expires_at)
+        await db.close()
+        record = await shared_cache.async_get_cache(
+            claude_oauth_db.SHARED_TOKEN_CACHE_KEY_PREFIX + "user-1"
+        )
+
+        assert "access_token_encrypted" not in record
+        assert record["invalidated_at"] <= time.time()
+
+    @pytest.mark.asyncio
+    async def test_read_racing_another_workers_write_is_not_shared(self, prisma, encryption_key, shared_cache):
+        worker_a = ClaudeOAuthDatabase(prisma, encryption_key, cache=shared_cache)
+        worker_b = ClaudeOAuthDatabase(prisma, encryption_key, cache=shared_cache)
+        stale_row = _make_row(worker_a, "user-1")
+
+        async def find_unique_during_write(**kwargs):
+            # Worker B stores new tokens while worker A's read is in flight
+            await worker_b.store_tokens("user-1", "new-access", "new-refresh", int(time.time()) + 3600, [])
+            return stale_row
+
+        find_unique = prisma.db.litellm_claudeoauthtokens.find_unique
+        find_unique.side_effect = find_unique_during_write
+        assert (await worker_a.get_tokens("user-1"))["accessToken"] == "access"
+
+        find_unique.side_effect = None
+        find_unique.return_value = _make_row(worker_b, "user-1", access_token="new-access")
+        token_data = await worker_b.get_tokens("user-1")
+        await worker_a.close()
+        await worker_b.close()
+
+        assert token_data["accessToken"] == "new-access"
+
+    @pytest.mark.asyncio
+    async def test_older_row_does_not_replace_newer_shared_record(self, prisma, encryption_key, shared_cache):
+        worker_a = ClaudeOAuthDatabase(prisma, encryption_key, cache=shared_cache)
+        worker_b = ClaudeOAuthDatabase(prisma, encryption_key, cache=shared_cache)
+        newer_row = _make_row(worker_b, "user-1", access_token="new-access")
+        older_row = _make_row(worker_a, "user-1")
+        older_row.updated_at = newer_row.updated_at - timedelta(seconds=5)
+        find_unique = prisma.db.litellm_claudeoauthtokens.find_unique
+
+        find_unique.return_value = newer_row
+        await worker_b.get_tokens("user-1")
+        record = {
+            "access_token_encrypted": older_row.access_token_encrypted,
+            "refresh_token_encrypted": older_row.refresh_token_encrypted,
+            "expires_at": int(older_row.expires_at.timestamp()),
+            "scopes": older_row.scopes,
+            "refresh_count": older_row.refresh_count,
+            "updated_at": older_row.updated_at.timestamp(),
+        }
+        await worker_a._publish_shared_record("user-1", record, time.time())
+        shared = await shared_cache.async_get_cache(
+            claude_oauth_db.SHARED_TOKEN_CACHE_KEY_PREFIX + "user-1"
+        )
+        await worker_a.close()
+        await worker_b.close()
+
+        assert shared["updated_at"] == newer_row.updated_at.timestamp()
+
+    @pytest.mark.asyncio
+    async def test_shared_record_near_expiry_is_reread(self, prisma, encryption_key, shared_cache):
+        worker_a = ClaudeOAuthDatabase(prisma, encryption_key, cache=shared_cache)
+        worker_b = ClaudeOAuthDatabase(prisma, encryption_key, cache=shared_cache)
+        row = _make_row(worker_a, "user-1")
+        row.expires_at = datetime.fromtimestamp(
+            int(time.time()) + claude_oauth_db.TOKEN_CACHE_EXPIRY_SKEW_SECONDS // 2, timezone.utc
+        )
+        find_unique = prisma.db.litellm_claudeoauthtokens.find_unique
+        find_unique.return_value = row
+
+        await worker_a.get_tokens("user-1")
+        await worker_b.get_tokens("user-1")
+        await worker_a.close()
+        await worker_b.close()
+
+        assert find_unique.await_count == 2
+
+
+class TestTokenEncryption:
+    """AES-GCM ciphertexts and the Fernet format they replaced."""
+
+    def test_round_trip(self, db):
+        ciphertext = db._encrypt("secret", "user-1", "access_token_encrypted")
+
+        assert ciphertext != "secret"
+        assert base64.urlsafe_b64decode(ciphertext)[0] == claude_oauth_db._AESGCM_VERSION
+        assert db._decrypt(ciphertext, "user-1", "access_token_encrypted") == "secret"
+
+    @pytest.mark.parametrize(
+        "user_id, column",
+        [("user-2", "access_token_encrypted"), ("user-1", "refresh_token_encrypted")],
+    )
+    def test_ciphertext_is_bound_to_user_and_column(self, db, user_id, column):
+        ciphertext = db._encrypt("secret", "user-1", "access_token_encrypted")
+
+        # Failed decryption returns the input unchanged
+        assert db._decrypt(ciphertext, user_id, column) == ciphertext
+
+    def test_decrypts_legacy_fernet(self, db):
+        ciphertext = db.fernet.encrypt(b"secret").decode()
+
+        assert db._decrypt(ciphertext, "user-1", "access_token_encrypted") == "secret"
+
+    def test_unknown_version_is_not_decrypted(self, db):
+        blob = bytearray(base64.urlsafe_b64decode(db._encrypt("secret", "user-1", "access_token_encrypted")))
+        blob[0] = 0x02
+        ciphertext = base64.urlsafe_b64encode(bytes(blob)).decode()
+
+        assert db._decrypt(ciphertext, "user-1", "access_token_encrypted") == ciphertext
+
+    def test_other_keys_cannot_decrypt(self, db, prisma):
+        other = ClaudeOAuthDatabase(prisma, Fernet.generate_key().decode())
+        ciphertext = db._encrypt("secret", "user-1", "access_token_encrypted")
+
+        assert other._decrypt(ciphertext, "user-1", "access_token_encrypted") == ciphertext
+
+
+class TestLastUsedFlush:
+    """Batched last_used writes."""
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending_users_once(self, db, prisma):
+        db._record_last_used("user-1")
+        db._record_last_used("user-2")
+        await db.close()
+
+        update_many = prisma.db.litellm_claudeoauthtokens.update_many
+        assert update_many.await_count == 1
+        assert sorted(update_many.await_args.kwargs["where"]["user_id"]["in"]) == ["user-1", "user-2"]
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_pending_users(self, db, prisma):
+        update_many = prisma.db.litellm_claudeoauthtokens.update_many
+        update_many.side_effect = [Exception("db down"), None]
+        db._pending_last_used.add("user-1")
+
+        await db.flush_last_used()
+        assert db._pending_last_used == {"user-1"}
+
+        await db.flush_last_used()
+        assert db._pending_last_used == set()
+
+    @pytest.mark.asyncio
+    async def test_close_keeps_updates_from_interrupted_flush(self, db, prisma, monkeypatch):
+        monkeypatch.setattr(claude_oauth_db, "LAST_USED_FLUSH_INTERVAL_SECONDS", 0)
+        flushed = []
+
+        async def slow_then_fast_update_many(**kwargs):
+            flushed.append(sorted(kwargs["where"]["user_id"]["in"]))
+            if len(flushed) == 1:
+                await asyncio.sleep(10)
+
+        prisma.db.litellm_claudeoauthtokens.update_many.side_effect = slow_then_fast_update_many
+        db._record_last_used("user-1")
+        # Let the background loop start its first update
+        await asyncio.sleep(0.01)
+        await db.close()
+
+        assert flushed == [["user-1"], ["user-1"]]
+        assert db._pending_last_used == set()
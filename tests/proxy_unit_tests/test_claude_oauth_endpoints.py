@@ -0,0 +1,73 @@
+"""
+Tests for the Claude OAuth proxy endpoints
+"""
+
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from litellm.proxy._types import UserAPIKeyAuth
+from litellm.proxy.auth import claude_oauth_endpoints
+from litellm.proxy.auth.user_api_key_auth import user_api_key_auth
+
+
+@pytest.fixture
+def token_manager(monkeypatch):
+    manager = MagicMock()
+    manager.get_token_stats = AsyncMock(return_value={"active_tokens": 1})
+    manager.revoke_token = AsyncMock(return_value=True)
+    monkeypatch.setattr(claude_oauth_endpoints, "oauth_handler", MagicMock())
+    monkeypatch.setattr(claude_oauth_endpoints, "token_manager", manager)
+    monkeypatch.setattr(claude_oauth_endpoints, "_token_stats_cache", None)
+    return manager
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(claude_oauth_endpoints.router)
+    app.dependency_overrides[user_api_key_auth] = lambda: UserAPIKeyAuth(user_id="user-1")
+    return TestClient(app)
+
+
+def test_health_reuses_token_stats(client, token_manager):
+    for _ in range(3):
+        response = client.get("/auth/claude/health")
+        assert response.status_code == 200
+        assert response.json() == {"status": "healthy", "oauth_configured": True, "token_stats": {"active_tokens": 1}}
+
+    token_manager.get_token_stats.assert_awaited_once()
+
+
+def test_health_recomputes_stale_token_stats(client, token_manager, monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    client.get("/auth/claude/health")
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + claude_oauth_endpoints.TOKEN_STATS_CACHE_TTL_SECONDS)
+    client.get("/auth/claude/health")
+
+    assert token_manager.get_token_stats.await_count == 2
+
+
+def test_health_without_configuration(client, monkeypatch):
+    monkeypatch.setattr(claude_oauth_endpoints, "token_manager", None)
+
+    response = client.get("/auth/claude/health")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "unhealthy"
+
+
+def test_revoke_invalidates_cached_token(client, token_manager, monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(claude_oauth_endpoints, "invalidate_cached_token", invalidated.append)
+
+    response = client.delete("/auth/claude/revoke")
+
+    assert response.json() == {"success": True, "message": "OAuth token revoked successfully"}
+    token_manager.revoke_token.assert_awaited_once_with("user-1")
+    assert invalidated == ["user-1"]
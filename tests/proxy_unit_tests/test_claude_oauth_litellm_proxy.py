@@ -0,0 +1,80 @@
+"""
+Tests for the claude_oauth LiteLLMProxy supervisor
+"""
+
+import asyncio
+import os
+import sys
+import types
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+LITELLM_DIR = Path(__file__).resolve().parents[2] / "claude_oauth_decompiled" / "src" / "claude_oauth" / "litellm"
+
+
+@pytest.fixture
+def proxy_module(monkeypatch):
+    """The proxy module, with the auth package it imports by bare name stubbed."""
+    monkeypatch.setitem(sys.modules, "auth", types.SimpleNamespace())
+    monkeypatch.setitem(sys.modules, "auth.oauth", types.SimpleNamespace(json_loads=None))
+    monkeypatch.setitem(sys.modules, "auth.token_manager", types.SimpleNamespace(TokenManager=None))
+    monkeypatch.syspath_prepend(str(LITELLM_DIR))
+    monkeypatch.delitem(sys.modules, "config", raising=False)
+    monkeypatch.delitem(sys.modules, "proxy", raising=False)
+    import proxy
+
+    return proxy
+
+
+@pytest.fixture
+def token_manager():
+    return MagicMock()
+
+
+@pytest.fixture
+def litellm_proxy(proxy_module, token_manager, tmp_path, monkeypatch):
+    # update_token exports these; setting them first lets monkeypatch restore them
+    monkeypatch.setenv("CLAUDE_ACCESS_TOKEN", "")
+    monkeypatch.setenv("CLAUDE_ACCESS_TOKEN_FILE", "")
+    litellm_proxy = proxy_module.LiteLLMProxy(token_manager=token_manager, config_path=tmp_path / "config.json")
+    # A stand-in for the LiteLLM server that exits on its own
+    monkeypatch.setattr(litellm_proxy, "_build_command", lambda: [sys.executable, "-c", "import time; time.sleep(0.5)"])
+    return litellm_proxy
+
+
+def test_update_token_writes_private_token_file(litellm_proxy, token_manager):
+    token_manager.get_access_token.return_value = "token-1"
+
+    litellm_proxy.update_token()
+
+    assert litellm_proxy.token_file.read_text() == "token-1"
+    assert litellm_proxy.token_file.stat().st_mode & 0o777 == 0o600
+    assert os.environ["CLAUDE_ACCESS_TOKEN_FILE"] == str(litellm_proxy.token_file)
+
+
+def test_run_with_token_refresh_survives_failed_refresh(proxy_module, litellm_proxy, token_manager, monkeypatch):
+    monkeypatch.setattr(proxy_module, "REFRESH_RETRY_INTERVAL", 0.05)
+    tokens = iter(["token-1", RuntimeError("refresh failed"), "token-2"])
+
+    def get_access_token():
+        token = next(tokens, "token-2")
+        if isinstance(token, Exception):
+            raise token
+        return token
+
+    token_manager.get_access_token.side_effect = get_access_token
+    starts = []
+    start_async = litellm_proxy.start_async
+
+    async def counting_start_async():
+        starts.append(True)
+        return await start_async()
+
+    monkeypatch.setattr(litellm_proxy, "start_async", counting_start_async)
+
+    assert asyncio.run(litellm_proxy.run_with_token_refresh(refresh_interval=0.05)) == 0
+    # The new token reached the running proxy through the token file, without a restart
+    assert len(starts) == 1
+    assert litellm_proxy.token_file.read_text() == "token-2"
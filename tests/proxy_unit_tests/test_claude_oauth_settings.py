@@ -0,0 +1,71 @@
+"""
+Tests for the claude_oauth Settings
+"""
+
+import json
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+import pytest
+
+# The decompiled modules import their siblings by bare name
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "claude_oauth_decompiled" / "src" / "claude_oauth" / "config"))
+
+from settings import Settings  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    for name in ("CLAUDE_CLIENT_ID", "CLAUDE_CLIENT_SECRET", "CLAUDE_PROXY_PORT", "CLAUDE_LOG_LEVEL"):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_missing_config_file_is_created_with_defaults(tmp_path):
+    config_path = tmp_path / "config.json"
+
+    settings = Settings(config_path)
+
+    assert json.loads(config_path.read_bytes()) == settings.to_dict()
+    assert settings.proxy.default_port == 8000
+
+
+def test_to_dict_matches_dataclass_fields(tmp_path):
+    settings = Settings(tmp_path / "config.json")
+    exported = settings.to_dict()
+
+    assert exported == {section: asdict(getattr(settings, section)) for section in exported}
+    # The copies are detached from the live settings
+    exported["proxy"]["default_port"] = 1
+    assert settings.proxy.default_port == 8000
+
+
+def test_environment_overrides_config_file(tmp_path, monkeypatch):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"oauth": {"client_id": "from-file"}, "proxy": {"default_port": 9000}}))
+    monkeypatch.setenv("CLAUDE_CLIENT_ID", "from-env")
+    monkeypatch.setenv("CLAUDE_PROXY_PORT", "9100")
+
+    settings = Settings(config_path)
+
+    assert settings.oauth.client_id == "from-env"
+    assert settings.proxy.default_port == 9100
+
+
+def test_validate_reports_missing_client_credentials(tmp_path):
+    settings = Settings(tmp_path / "config.json")
+
+    assert settings.validate() == ["OAuth client_id is required", "OAuth client_secret is required"]
+
+    settings.oauth.client_id = "client"
+    settings.oauth.client_secret = "secret"
+    assert settings.validate() == []
+
+
+def test_get_expanded_path_follows_environment_changes(tmp_path, monkeypatch):
+    settings = Settings(tmp_path / "config.json")
+
+    monkeypatch.setenv("CLAUDE_TEST_DIR", "/first")
+    assert settings.get_expanded_path("$CLAUDE_TEST_DIR/key") == Path("/first/key")
+    monkeypatch.setenv("CLAUDE_TEST_DIR", "/second")
+    assert settings.get_expanded_path("$CLAUDE_TEST_DIR/key") == Path("/second/key")
@@ -0,0 +1,64 @@
+"""
+Tests for the claude_oauth TokenManager
+
+Covers the refresh deadline checks and token validation.
+"""
+
+import sys
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# The decompiled modules import their siblings by bare name
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "claude_oauth_decompiled" / "src" / "claude_oauth" / "auth"))
+
+from token_manager import TokenManager  # noqa: E402
+
+
+@pytest.fixture
+def oauth_client():
+    client = MagicMock()
+    client.refresh_token.return_value = {
+        "access_token": "new-access",
+        "refresh_token": "new-refresh",
+        "expires_at": time.time() + 7200,
+    }
+    return client
+
+
+@pytest.fixture
+def manager(tmp_path, oauth_client):
+    return TokenManager(oauth_client=oauth_client, token_file=str(tmp_path / "tokens.json"))
+
+
+def test_valid_token_is_not_refreshed(manager, oauth_client):
+    manager.save_tokens({"access_token": "access", "refresh_token": "refresh", "expires_at": time.time() + 3600})
+
+    assert manager.get_access_token() == "access"
+    oauth_client.refresh_token.assert_not_called()
+
+
+def test_token_is_refreshed_after_suspend(manager, oauth_client, monkeypatch):
+    now = time.time()
+    manager.save_tokens({"access_token": "access", "refresh_token": "refresh", "expires_at": now + 3600})
+
+    # The monotonic clock stands still while the system is suspended
+    monkeypatch.setattr(time, "time", lambda: now + 3600)
+
+    assert manager.get_access_token() == "new-access"
+    oauth_client.refresh_token.assert_called_once_with("refresh")
+
+
+def test_validate_token_without_tokens(manager, oauth_client):
+    assert manager.validate_token() is False
+    oauth_client.validate_token.assert_not_called()
+
+
+def test_validate_token_checks_access_token(manager, oauth_client):
+    oauth_client.validate_token.return_value = True
+    manager.save_tokens({"access_token": "access", "expires_at": time.time() + 3600})
+
+    assert manager.validate_token() is True
+    oauth_client.validate_token.assert_called_once_with("access")
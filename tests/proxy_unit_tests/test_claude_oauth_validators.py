@@ -0,0 +1,38 @@
+"""
+Tests for the claude_oauth TokenValidator
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parents[2] / "claude_oauth_decompiled" / "src" / "claude_oauth"
+
+
+@pytest.fixture
+def validators(monkeypatch):
+    """The validators module; its config package imports settings by bare name."""
+    monkeypatch.syspath_prepend(str(SRC_DIR / "config"))
+    monkeypatch.syspath_prepend(str(SRC_DIR))
+    monkeypatch.syspath_prepend(str(SRC_DIR / "utils"))
+    for name in ("config", "config.settings", "validators"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    import validators
+
+    return validators
+
+
+@pytest.mark.parametrize(
+    "token_info, valid",
+    [
+        ({"access_token": "access", "token_type": "Bearer"}, True),
+        ({"access_token": "access", "token_type": "Bearer", "expires_at": "2030-01-01"}, True),
+        ({"access_token": "access"}, False),
+        ({"token_type": "Bearer"}, False),
+    ],
+)
+def test_validate_token_format_checks_required_fields(validators, token_info, valid):
+    validator = validators.TokenValidator(settings=None)
+
+    assert validator._validate_token_format(token_info) is valid
@@ -0,0 +1,210 @@
+"""
+Tests for SecureTokenStore key rotation and user index
+"""
+
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# The decompiled modules import their siblings by bare name
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "claude_oauth_decompiled" / "src" / "claude_oauth" / "storage"))
+
+from secure_store import SecureTokenStore  # noqa: E402
+
+USERS = ["alice", "bob", "carol", "dave"]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A store keyed by a generated .key file, holding tokens for USERS."""
+    monkeypatch.delenv("CLAUDE_OAUTH_ENCRYPTION_KEY", raising=False)
+    store = SecureTokenStore(storage_dir=str(tmp_path))
+    for user_id in USERS:
+        store.store_tokens({"access_token": f"at-{user_id}"}, user_id=user_id)
+    return store
+
+
+def _assert_readable(store):
+    for user_id in USERS:
+        assert store.retrieve_tokens(user_id) == {"access_token": f"at-{user_id}"}
+
+
+def test_retrieve_tokens_sees_same_size_rewrite(tmp_path, monkeypatch):
+    # A fixed stored_at keeps both payloads the same length
+    monkeypatch.setattr(time, "time", lambda: 1700000000.0)
+    store = SecureTokenStore(storage_dir=str(tmp_path))
+    store.store_tokens({"access_token": "at-alice"}, user_id="alice")
+    assert store.retrieve_tokens("alice") == {"access_token": "at-alice"}
+    token_file = store._get_token_file("alice")
+    before = token_file.stat()
+
+    # Another process replaces the file with same-size content and mtime
+    SecureTokenStore(storage_dir=str(tmp_path)).store_tokens({"access_token": "at-alicf"}, user_id="alice")
+    os.utime(token_file, ns=(before.st_atime_ns, before.st_mtime_ns))
+    assert token_file.stat().st_size == before.st_size
+
+    assert store.retrieve_tokens("alice") == {"access_token": "at-alicf"}
+
+
+def test_rotate_encryption_key_reencrypts_all_files(store, tmp_path):
+    old_key = (tmp_path / ".key").read_bytes()
+
+    store.rotate_encryption_key()
+
+    assert (tmp_path / ".key").read_bytes() != old_key
+    _assert_readable(store)
+    _assert_readable(SecureTokenStore(storage_dir=str(tmp_path)))
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_rotate_encryption_key_with_password(store, tmp_path):
+    store.rotate_encryption_key("new-password")
+
+    _assert_readable(store)
+    _assert_readable(SecureTokenStore(storage_dir=str(tmp_path), encryption_key="new-password"))
+
+
+def test_rotate_encryption_key_write_failure_keeps_old_key(store, tmp_path, monkeypatch):
+    old_key = (tmp_path / ".key").read_bytes()
+    old_files = {path.name: path.read_bytes() for path in tmp_path.glob("*.enc")}
+    real_write_temp = SecureTokenStore._write_temp
+    lock = threading.Lock()
+    calls = []
+
+    def failing_write_temp(self, path, data, durable=True):
+        with lock:
+            calls.append(path)
+            fail = len(calls) == len(USERS) // 2 + 1
+        if fail:
+            raise OSError("disk full")
+        return real_write_temp(self, path, data, durable)
+
+    monkeypatch.setattr(SecureTokenStore, "_write_temp", failing_write_temp)
+    with pytest.raises(OSError):
+        store.rotate_encryption_key()
+    monkeypatch.setattr(SecureTokenStore, "_write_temp", real_write_temp)
+
+    assert (tmp_path / ".key").read_bytes() == old_key
+    assert {path.name: path.read_bytes() for path in tmp_path.glob("*.enc")} == old_files
+    assert not list(tmp_path.glob(".*.tmp"))
+    _assert_readable(store)
+    _assert_readable(SecureTokenStore(storage_dir=str(tmp_path)))
+
+    store.rotate_encryption_key()
+    _assert_readable(SecureTokenStore(storage_dir=str(tmp_path)))
+
+
+def test_rotate_encryption_key_writes_key_after_replacing_files(store, tmp_path, monkeypatch):
+    events = []
+    real_replace = os.replace
+    real_write_private = SecureTokenStore._write_private
+
+    def recording_replace(src, dst):
+        events.append(Path(dst).name)
+        return real_replace(src, dst)
+
+    def recording_write_private(self, path, data, durable=True):
+        events.append(Path(path).name)
+        return real_write_private(self, path, data, durable)
+
+    monkeypatch.setattr(os, "replace", recording_replace)
+    monkeypatch.setattr(SecureTokenStore, "_write_private", recording_write_private)
+    store.rotate_encryption_key()
+
+    key_write = events.index(".key")
+    assert sorted(events[:key_write]) == sorted(f"default_{user_id}.enc" for user_id in USERS)
+    _assert_readable(store)
+
+
+def test_rotate_encryption_key_replace_failure_removes_temp_files(store, tmp_path, monkeypatch):
+    old_key = (tmp_path / ".key").read_bytes()
+    real_replace = os.replace
+    calls = []
+
+    def failing_replace(src, dst):
+        calls.append(dst)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        store.rotate_encryption_key()
+
+    assert (tmp_path / ".key").read_bytes() == old_key
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_list_users_reads_index(store, tmp_path):
+    assert store.list_users() == sorted(USERS)
+    assert (tmp_path / ".index" / "default.idx").exists()
+
+    store.delete_tokens("bob")
+    store.store_tokens({"access_token": "at-erin"}, user_id="erin")
+
+    assert store.list_users() == ["alice", "carol", "dave", "erin"]
+
+
+def test_list_users_rebuilds_missing_or_corrupt_index(store, tmp_path):
+    index_path = tmp_path / ".index" / "default.idx"
+
+    index_path.unlink()
+    assert store.list_users() == sorted(USERS)
+    assert index_path.exists()
+
+    index_path.write_bytes(b"not json")
+    assert store.list_users() == sorted(USERS)
+
+
+def test_list_users_is_per_namespace(store, tmp_path):
+    other = SecureTokenStore(storage_dir=str(tmp_path), namespace="other")
+    other.store_tokens({"access_token": "at-zed"}, user_id="zed")
+
+    assert other.list_users() == ["zed"]
+    assert store.list_users() == sorted(USERS)
+
+
+def test_cleanup_expired_tokens_refreshes_index(store):
+    store.store_tokens({"access_token": "at-old", "expires_at": 1}, user_id="old")
+    assert "old" in store.list_users()
+
+    assert store.cleanup_expired_tokens() == 1
+
+    assert store.list_users() == sorted(USERS)
+
+
+def test_list_users_sees_token_files_changed_outside_the_store(store, tmp_path):
+    assert store.list_users() == sorted(USERS)
+
+    os.unlink(tmp_path / "default_bob.enc")
+    shutil.copy(tmp_path / "default_alice.enc", tmp_path / "default_erin.enc")
+
+    assert store.list_users() == ["alice", "carol", "dave", "erin"]
+
+
+def test_list_users_keeps_concurrent_writes_from_other_stores(tmp_path, monkeypatch):
+    monkeypatch.delenv("CLAUDE_OAUTH_ENCRYPTION_KEY", raising=False)
+    SecureTokenStore(storage_dir=str(tmp_path))
+    # Separate instances share no in-process lock, like separate processes
+    stores = [SecureTokenStore(storage_dir=str(tmp_path)) for _ in range(4)]
+    expected = []
+
+    def store_users(worker, store):
+        for i in range(25):
+            store.store_tokens({"access_token": "at"}, user_id=f"user-{worker}-{i}", durable=False)
+
+    threads = [threading.Thread(target=store_users, args=(worker, store)) for worker, store in enumerate(stores)]
+    for worker, thread in enumerate(threads):
+        expected += [f"user-{worker}-{i}" for i in range(25)]
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert json.loads((tmp_path / ".index" / "default.idx").read_bytes())["users"] == sorted(expected)
+    assert stores[0].list_users() == sorted(expected)